@@ -0,0 +1,209 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from html_pruning import estimate_tokens
+from llm_cache import total_cost
+
+"""
+Adaptive multi-record batching for LLM extraction.
+
+Sending every review in one request risks running past the model's output-token
+limit (the answer is cut off and the JSON is lost), while one request per review
+pays the prompt overhead N times. `AdaptiveBatcher` packs N record fragments per
+request and tunes N while it runs:
+
+- the output tokens per record and the latency per record are measured from each
+  finished batch (ScrapeGraphAI execution info and wall time), and N is capped so
+  a batch stays within the output-token budget, the input-token budget and the
+  target latency;
+- a clean batch grows N additively; a failed or truncated batch (an exception,
+  fewer complete records than fragments, or an answer close to the output limit)
+  halves N and is split in two and retried, down to single records.
+
+Results are returned in fragment order, with the combined execution info.
+"""
+
+# gpt-4o-mini's completion limit; a batch's answer must fit well inside it.
+MAX_OUTPUT_TOKENS = 16_384
+# Fraction of MAX_OUTPUT_TOKENS a batch is sized to use; answers above
+# TRUNCATION_RATIO of the limit are treated as cut off.
+OUTPUT_HEADROOM = 0.6
+TRUNCATION_RATIO = 0.95
+# Input budget per batch (fragments only; the prompt is added on top).
+MAX_INPUT_TOKENS = 24_000
+# Weight of the newest measurement in the running per-record averages.
+EMA_WEIGHT = 0.3
+
+
+def exec_tokens(exec_info, key: str) -> int:
+    """Token count (`prompt_tokens` / `completion_tokens`) from ScrapeGraphAI execution info."""
+    nodes = exec_info or []
+    totals = [n for n in nodes if n.get("node_name") == "TOTAL RESULT"]
+    return int(sum(n.get(key) or 0 for n in (totals or nodes)))
+
+
+@dataclass
+class BatchStats:
+    """Measurements of an AdaptiveBatcher run."""
+    batches: int = 0
+    retries: int = 0
+    failed_records: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    records: int = 0
+    sizes: list = field(default_factory=list)
+
+    def summary(self) -> str:
+        per_record = self.cost / self.records if self.records else 0.0
+        sizes = f"{min(self.sizes)}–{max(self.sizes)}" if self.sizes else "-"
+        return (f"{self.records} records in {self.batches} batches (sizes {sizes}, {self.retries} split/retried, "
+                f"{self.failed_records} failed) • {self.input_tokens:,} in / {self.output_tokens:,} out tokens "
+                f"• ${self.cost:.4f} (${per_record:.5f}/record)")
+
+
+class AdaptiveBatcher:
+    """
+    Extracts record fragments in adaptively sized multi-record batches.
+
+    Args:
+        extract_batch (Callable[[str], tuple]): Extracts one HTML source holding
+            several records and returns (records, exec_info).
+        initial_size (int): Records in the first batches.
+        min_size (int): Smallest batch size; at size 1 a failing record is given up.
+        max_size (int): Largest batch size.
+        max_workers (int): Batches in flight at the same time.
+        target_latency (float): Seconds a batch should take at most.
+        complete (Callable[[dict], bool] | None): Whether a returned record is complete
+            (e.g. has its likes/dislikes); incomplete records count as truncation.
+        max_output_tokens (int): The model's completion-token limit.
+    """
+
+    def __init__(self, extract_batch: Callable[[str], tuple], initial_size: int = 10, min_size: int = 1,
+                 max_size: int = 60, max_workers: int = 4, target_latency: float = 45.0,
+                 complete: Callable[[dict], bool] | None = None, max_output_tokens: int = MAX_OUTPUT_TOKENS):
+        self.extract_batch = extract_batch
+        self.size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_workers = max_workers
+        self.target_latency = target_latency
+        self.complete = complete
+        self.max_output_tokens = max_output_tokens
+        self.out_per_record = None      # running average of completion tokens per record
+        self.seconds_per_record = None  # running average of latency per record
+        self.stats = BatchStats()
+
+    # ── Batch sizing ──────────────────────────────────────────────────────────────
+
+    def _cap(self) -> int:
+        """Largest batch size the measured output tokens and latency allow."""
+        cap = self.max_size
+        if self.out_per_record:
+            cap = min(cap, int(self.max_output_tokens * OUTPUT_HEADROOM / self.out_per_record))
+        if self.seconds_per_record:
+            cap = min(cap, int(self.target_latency / self.seconds_per_record))
+        return max(self.min_size, cap)
+
+    def _measure(self, n: int, output_tokens: int, seconds: float) -> None:
+        for name, value in (("out_per_record", output_tokens / n), ("seconds_per_record", seconds / n)):
+            if value <= 0:
+                continue
+            old = getattr(self, name)
+            setattr(self, name, value if old is None else (1 - EMA_WEIGHT) * old + EMA_WEIGHT * value)
+
+    def _next_batch(self, pending: deque) -> list:
+        """Takes the next batch of (index, fragment) pairs within size and input-token budget."""
+        size = min(self.size, self._cap())
+        batch, tokens = [], 0
+        while pending and len(batch) < size:
+            fragment_tokens = estimate_tokens(pending[0][1])
+            if batch and tokens + fragment_tokens > MAX_INPUT_TOKENS:
+                break
+            batch.append(pending.popleft())
+            tokens += fragment_tokens
+        return batch
+
+    # ── Execution ─────────────────────────────────────────────────────────────────
+
+    def _run_batch(self, batch: list) -> tuple:
+        source = "<div>\n" + "\n".join(fragment for _, fragment in batch) + "\n</div>"
+        start = time.perf_counter()
+        try:
+            records, exec_info = self.extract_batch(source)
+            error = None
+        except Exception as exc:  # Any failure of the call is handled by splitting the batch.
+            records, exec_info, error = [], [], exc
+        return batch, list(records or []), list(exec_info or []), time.perf_counter() - start, error
+
+    def _truncated(self, batch: list, records: list, exec_info: list) -> bool:
+        usable = [r for r in records if isinstance(r, dict) and (self.complete is None or self.complete(r))]
+        output_tokens = exec_tokens(exec_info, "completion_tokens")
+        return len(usable) < len(batch) or output_tokens >= TRUNCATION_RATIO * self.max_output_tokens
+
+    def run(self, fragments: list[str]) -> tuple[list, list]:
+        """
+        Extracts all fragments.
+
+        Args:
+            fragments (list[str]): One HTML fragment per record.
+
+        Returns:
+            tuple[list, list]: Records in fragment order and the combined execution info.
+        """
+        pending = deque(enumerate(fragments))
+        retry = deque()         # split halves of failed batches, retried first
+        results = {}            # first fragment index → records
+        exec_info = []
+        in_flight = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or retry or in_flight:
+                while (pending or retry) and len(in_flight) < self.max_workers:
+                    if retry:
+                        # Re-cut a retried half that is still above the (reduced) batch size.
+                        batch, limit = retry.popleft(), min(self.size, self._cap())
+                        if len(batch) > limit:
+                            retry.appendleft(batch[limit:])
+                            batch = batch[:limit]
+                    else:
+                        batch = self._next_batch(pending)
+                    self.stats.sizes.append(len(batch))
+                    in_flight.add(pool.submit(self._run_batch, batch))
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, records, info, seconds, error = future.result()
+                    self.stats.batches += 1
+                    exec_info.extend(info)
+                    self.stats.input_tokens += exec_tokens(info, "prompt_tokens")
+                    self.stats.output_tokens += exec_tokens(info, "completion_tokens")
+
+                    if error is None and not self._truncated(batch, records, info):
+                        self._measure(len(batch), exec_tokens(info, "completion_tokens"), seconds)
+                        results[batch[0][0]] = records
+                        self.size = min(self.max_size, self._cap(), self.size + max(1, self.size // 4))
+                        continue
+
+                    reason = f"error: {error}" if error is not None else "truncated/incomplete answer"
+                    # Halve relative to the failed batch, so concurrent failures do not compound.
+                    self.size = max(self.min_size, min(self.size, len(batch) // 2))
+                    if len(batch) <= self.min_size:
+                        # Nothing left to split: keep what came back (if anything) and move on.
+                        print(f"Giving up on {len(batch)} record(s) after {reason}")
+                        self.stats.failed_records += len(batch) - len(records)
+                        results[batch[0][0]] = records
+                        continue
+                    half = len(batch) // 2
+                    retry.extend([batch[:half], batch[half:]])
+                    self.stats.retries += 1
+                    print(f"Batch of {len(batch)} failed ({reason}); retrying as {half} + {len(batch) - half}, "
+                          f"batch size now {self.size}")
+
+        records = [r for index in sorted(results) for r in results[index]]
+        self.stats.records = len(records)
+        self.stats.cost = total_cost(exec_info)
+        print(f"Adaptive batching • {self.stats.summary()}")
+        return records, exec_info
@@ -1,23 +1,53 @@
 import os, json, time
+from itertools import islice
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
-from scrapegraphai.graphs import SmartScraperGraph
+from llm_cache import CachedSmartScraperGraph, LLMCache
 from scrapegraphai.utils import prettify_exec_info
+from html_pruning import prune_html
+from segmentation import segment_records
+from structured_data import harvest_reviews, missing_fields
+from resource_blocking import DEFAULT_PROFILE
+from readiness import count, wait_until_ready
+from incremental_extraction import PipelinedExtractor, render_incrementally
+from chunking import chunk_html, extract_chunks, merge_records, record_key
+from jsonl_sink import JsonlWriter, iter_jsonl, jsonl_to_json
+from columnar_export import REVIEW_SCHEMA, jsonl_to_parquet
+from result_store import ResultStore
+from seen_records import SeenRecords, numeric_id, record_id
+from near_duplicates import RecordDeduper, review_deduper
+from adaptive_batching import AdaptiveBatcher
+from llm_scheduler import ScheduledExtractor
+from review_enrichment import ENRICH_PROMPT, LIKES_GUIDELINES, enrich_reviews, parse_reviews
+from snapshot_store import SnapshotStore
+from network_archive import NetworkArchive
+from pagination_capture import render_via_api
 
 """
 This script scrapes customer reviews for AutoNation from the ConsumerAffairs website.
 
 It performs the following steps:
 1.  Uses Playwright to fully render the webpage, clicking "Load more" until all
-    reviews are visible on the page, and saves the final HTML content.
-2.  Uses ScrapeGraphAI with an OpenAI LLM (gpt-4o-mini) to parse the saved HTML.
-3.  Instructs the LLM to extract specific fields for each review (name, location,
-    date, rating, tags, text, derived likes/dislikes) into a structured JSON format.
-4.  Saves the extracted review data as a JSON file.
-5.  Prints a preview of the first two extracted reviews.
-6.  Calculates the cost of the ScrapeGraphAI run based on token usage reported
+    reviews are visible on the page, and saves the final HTML content. In
+    pipelined mode (PIPELINED = True), each batch of newly loaded reviews is
+    extracted on a worker thread (steps 2-4) while the next pages are loading;
+    otherwise the rendered page is split on review boundaries into token-budgeted
+    chunks (or adaptively sized batches, ADAPTIVE_BATCHING) that are extracted
+    concurrently.
+2.  Harvests schema.org Review data (JSON-LD / microdata) from the page; those
+    fields are read locally and never requested from the LLM.
+3.  Prunes scripts, styles, SVGs, comments, tracking attributes and hidden nodes
+    from the HTML to cut the number of tokens sent to the LLM.
+4.  Uses ScrapeGraphAI with an OpenAI LLM (gpt-4o-mini) to extract the remaining
+    review fields (location, date, tags, text, derived likes/dislikes, ...) into a
+    structured JSON format, merged with the structured-data fields. Answers are
+    cached by (source, prompt, model), so re-runs on an unchanged page are free.
+5.  Streams the extracted reviews to a JSONL file as they are produced (resumable,
+    duplicates skipped), then writes the JSON file from it.
+6.  Prints a preview of the first two extracted reviews.
+7.  Calculates the cost of the ScrapeGraphAI run based on token usage reported
     in the execution info.
-7.  Projects the estimated cost for scraping larger numbers of reviews based on
+8.  Projects the estimated cost for scraping larger numbers of reviews based on
     the calculated cost per review.
 """
 
@@ -31,14 +61,45 @@ OUTPUT_DIR = "/Users/crees/PycharmProjects/dsproject_web_scrape/outputs"
 URL = "https://www.consumeraffairs.com/automotive/autonation.htm"
 # Path where the fully rendered HTML content will be saved.
 OUT_HTML = os.path.join(OUTPUT_DIR, "ca_autonation_rendered.html")
+# Path where the pipelined mode saves the review containers it extracted, batch by batch
+# (it empties them in the browser as it goes, so it never has the full page).
+OUT_FRAGMENTS = os.path.join(OUTPUT_DIR, "ca_autonation_review_fragments.html")
 # Path where the extracted review data (JSON) will be saved.
 OUT_JSON = os.path.join(OUTPUT_DIR, "ca_autonation_reviews.json")
+# Path of the streaming, resumable record log (one review per line).
+OUT_JSONL = os.path.join(OUTPUT_DIR, "ca_autonation_reviews.jsonl")
+# Path of the typed, zstd-compressed columnar copy for pandas/DuckDB.
+OUT_PARQUET = os.path.join(OUTPUT_DIR, "ca_autonation_reviews.parquet")
+
+# CSS selector matching one review container on the page.
+REVIEW_SELECTOR = "div.js-rvw"
+
+# Extract each batch of newly loaded reviews while "Load more" keeps loading the next ones.
+PIPELINED = True
+# Number of review batches / chunks extracted concurrently.
+PIPELINE_WORKERS = 4
+# Pack reviews into LLM requests of adaptively tuned size (from the measured output
+# tokens, latency and truncations) instead of fixed token-budget chunks. Opt-in: only
+# the full-page path uses it (PIPELINED = False, or API_PAGINATION = True); the
+# pipelined mode extracts each "Load more" batch as the page delivers it.
+ADAPTIVE_BATCHING = True
+# Only extract reviews posted since the last run: pagination stops at known reviews.
+SINCE_LAST_RUN = True
+# Instead of clicking "Load more" in the browser, capture the request behind it and
+# fetch the remaining review pages directly (the pipelined mode is not used then).
+API_PAGINATION = False
+# Fields identifying a review when merging chunk results (duplicates are dropped).
+REVIEW_KEY_FIELDS = ("reviewer_name", "review_date", "review_text")
 
 # List of review quantities for cost projection calculations.
 PROJECTIONS = [100, 1_000, 100_000, 1_000_000]
 
 # ── Playwright: Render Full Page with All Reviews ───────────────────────────────────
-def render_full_page(url: str) -> str:
+# Opening tags of the review containers from index `start` on (cheap: no children are serialized).
+_OPENING_TAGS_JS = "(els, start) => els.slice(start).map(e => e.cloneNode(false).outerHTML)"
+
+
+def render_full_page(url: str, seen: SeenRecords | None = None) -> str:
 	"""
     Uses Playwright to navigate to a URL, repeatedly click the "Load more" button
     until it disappears, ensuring all dynamic content (reviews) is loaded.
@@ -46,6 +107,8 @@ def render_full_page(url: str) -> str:
 
     Args:
         url (str): The URL of the page to render.
+        seen (SeenRecords | None): Reviews extracted by earlier runs; clicking stops
+            as soon as the loaded reviews reach them.
 
     Returns:
         str: The fully rendered HTML content of the page.
@@ -58,33 +121,53 @@ def render_full_page(url: str) -> str:
 	with sync_playwright() as p:
 		# Launch Chromium browser. headless=False shows the browser window.
 		browser = p.chromium.launch(headless=False)
+		# NETWORK_ARCHIVE=record/replay records this render to a HAR archive or serves it from one.
+		archive = NetworkArchive.for_url(url)
 		page = browser.new_page(
+			**archive.context_options(),
 			# Set a common user agent to mimic a real browser.
 			user_agent=("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
 			            "AppleWebKit/537.36 (KHTML, like Gecko) "
 			            "Chrome/119.0.0.0 Safari/537.36")
 		)
+		# Abort image, font, media and analytics requests; only the DOM is needed.
+		block_stats = DEFAULT_PROFILE.apply(page)
+		archive.attach(page)
 		# Navigate to the URL, increasing the default timeout.
 		page.goto(url, timeout=60_000)
 		print("Page loaded. Searching for 'Load more' button...")
 
 		# Loop to click the "Load more" button until it's no longer found.
+		n_observed = 0
 		while True:
+			if seen is not None:
+				# Stop once the newly loaded reviews reach those extracted by an earlier run.
+				tags = page.eval_on_selector_all(REVIEW_SELECTOR, _OPENING_TAGS_JS, n_observed)
+				n_observed += len(tags)
+				seen.observe([record_id(tag) for tag in tags])
+				if seen.done:
+					print("Reached reviews extracted by an earlier run. Stopping.")
+					break
 			load_more = page.query_selector('button:has-text("Load more")')
 			if not load_more:
 				print("'Load more' button not found. Assuming all reviews are loaded.")
 				break  # Exit the loop if the button doesn't exist.
 
 			print("Clicking 'Load more'...")
+			n_before = count(page, REVIEW_SELECTOR)
 			load_more.click()
-			# Wait briefly for new content to potentially load after the click.
-			page.wait_for_timeout(1500)
+			# Wait until the new reviews have been appended and the DOM has settled.
+			ready = wait_until_ready(page, selector=REVIEW_SELECTOR, min_count=n_before + 1,
+			                         quiet_ms=300, timeout_ms=15_000)
+			if not ready.ready and count(page, REVIEW_SELECTOR) == n_before:
+				print(f"No new reviews after clicking 'Load more' ({ready.summary()}). Stopping.")
+				break
 			# Scroll down to potentially trigger lazy-loading or ensure button visibility.
 			page.keyboard.press("End")
 
 		# Final scroll down after the loop finishes.
 		page.keyboard.press("End")
-		time.sleep(1)  # Short pause to allow final rendering.
+		wait_until_ready(page, quiet_ms=300, timeout_ms=5_000)  # Let the final render settle.
 
 		# Get the complete HTML content of the page.
 		html = page.content()
@@ -93,9 +176,15 @@ def render_full_page(url: str) -> str:
 		# Save the HTML content to the specified file.
 		with open(OUT_HTML, "w", encoding="utf-8") as f:
 			f.write(html)
-		# Close the browser instance.
+		# Also keep this render in the snapshot store (OUT_HTML is overwritten next run).
+		snapshot = SnapshotStore().put(url, html)
+		print(f"Snapshot {snapshot.sha256[:12]} stored ({snapshot.raw_bytes:,} → {snapshot.stored_bytes:,} bytes)")
+		# Close the browser instance (writing the network archive first when recording).
+		archive.finish(page)
 		browser.close()
 		print(f"All reviews loaded and HTML saved → {OUT_HTML}")
+		if archive.mode != "replay":   # in replay the archive answers before the blocking profile
+			print(block_stats.summary())
 		return html
 
 
@@ -115,94 +204,312 @@ graph_cfg = {
 	"headless": False,
 }
 
-# The detailed prompt instructing the LLM on how to extract review data.
-PROMPT = """
-You are a smart web-scraping assistant tasked with extracting customer review data.
-The provided HTML source contains multiple customer reviews about AutoNation from ConsumerAffairs.
-
-Your goal is to identify each individual review and extract the following fields precisely:
-- reviewer_name: The name of the person who wrote the review.
-- reviewer_location: The city and state (or country) of the reviewer, if available.
-- review_date: The date the review was posted (extract only the date part, e.g., "YYYY-MM-DD" or "Month Day, Year").
-- star_rating: The numerical star rating given by the reviewer (integer from 1 to 5).
-- tags: A list of strings representing the short descriptive tags associated with the review 
-(often shown as grey chips/pills). If none, use an empty list [].
-- review_text: The full text content of the customer's review paragraph.
-- likes: A list of strings containing up to 3 very brief positive points or phrases mentioned by the reviewer. Infer 
+# Stage-two enrichment (likes/dislikes from rating + text) calls the chat-completions API
+# directly through the rate-limited scheduler, with the same persistent answer cache.
+enricher = ScheduledExtractor(ENRICH_PROMPT, model=graph_cfg["llm"]["model"].split("/")[-1], cache=LLMCache())
+
+# Descriptions of every review field the LLM may be asked to extract.
+FIELD_SPECS = {
+	"review_id": 'The id attribute of the review\'s container element (e.g. "review-13735777"). Copy it exactly.',
+	"reviewer_name": "The name of the person who wrote the review.",
+	"reviewer_location": "The city and state (or country) of the reviewer, if available.",
+	"review_date": 'The date the review was posted (extract only the date part, e.g., "YYYY-MM-DD" or "Month Day, Year").',
+	"star_rating": "The numerical star rating given by the reviewer (integer from 1 to 5).",
+	"tags": """A list of strings representing the short descriptive tags associated with the review 
+(often shown as grey chips/pills). If none, use an empty list [].""",
+	"review_text": "The full text content of the customer's review paragraph.",
+	"likes": """A list of strings containing up to 3 very brief positive points or phrases mentioned by the reviewer. Infer 
     these from the review_text. If the review is mostly negative or neutral, or no specific positive points are mentioned, 
-    use an empty list [].
-- dislikes: A list of strings containing up to 3 very brief negative points or phrases mentioned by the reviewer. Infer 
+    use an empty list [].""",
+	"dislikes": """A list of strings containing up to 3 very brief negative points or phrases mentioned by the reviewer. Infer 
     these from the review_text. If the review is mostly positive or neutral, or no specific negative points are mentioned, 
-    use an empty list [].
+    use an empty list [].""",
+}
 
-Guidelines for deriving 'likes' and 'dislikes':
-- Consider the 'star_rating':
-    - 4 or 5 stars: Focus primarily on extracting 'likes'. 'Dislikes' should likely be empty unless explicitly negative points are made.
-    - 1 or 2 stars: Focus primarily on extracting 'dislikes'. 'Likes' should likely be empty unless explicitly positive points are made.
-    - 3 stars: Both 'likes' and 'dislikes' might be present; extract relevant brief phrases for both if applicable.
-- Keep the phrases very short and directly related to the review content.
+# The review fields written to OUT_JSON, in output order. review_id (the container id)
+# is the review's stable identity in the result store.
+REVIEW_FIELDS = list(FIELD_SPECS)
+
+# Example review object shown to the LLM (filtered to the requested keys).
+EXAMPLE_REVIEW = {
+	"review_id": "review-13735777",
+	"reviewer_name": "Jane D.",
+	"reviewer_location": "Anytown, CA",
+	"review_date": "2023-10-26",
+	"star_rating": 5,
+	"tags": ["Customer Service", "Easy Process"],
+	"review_text": "The entire process was smooth and the staff were very helpful...",
+	"likes": ["Smooth process", "Helpful staff"],
+	"dislikes": ["Sales person had bad breath."],
+}
+
+# The detailed prompt template instructing the LLM on how to extract review data.
+PROMPT_TEMPLATE = """
+You are a smart web-scraping assistant tasked with extracting customer review data.
+The provided HTML source contains multiple customer reviews about AutoNation from ConsumerAffairs.
 
+Your goal is to identify each individual review and extract the following fields precisely:
+{fields}
+{guidelines}
 Output Format:
 Return ONLY a valid JSON array where each element is an object representing a single review, containing exactly the keys specified above.
 Do NOT include any introductory text, markdown formatting (like ```json ... ```), or any keys not listed in the requirements.
 Example of one review object in the array:
-{
-  "reviewer_name": "Jane D.",
-  "reviewer_location": "Anytown, CA",
-  "review_date": "2023-10-26",
-  "star_rating": 5,
-  "tags": ["Customer Service", "Easy Process"],
-  "review_text": "The entire process was smooth and the staff were very helpful...",
-  "likes": ["Smooth process", "Helpful staff"],
-  "dislikes": ["Sales person had bad breath."]
-}
+{example}
 """
 
-# ─────────────────── Run the Scraper ───────────────────────────────────────────────
-# Step 1: Render the full page using Playwright to get the complete HTML.
-html_content = render_full_page(URL)
-
-# Step 2: Initialize the SmartScraperGraph with the prompt, HTML source, and config.
-# The source is the HTML string obtained from Playwright.
-scraper = SmartScraperGraph(
-	prompt=PROMPT,
-	source=html_content,  # Use the rendered HTML, not the URL
-	config=graph_cfg
-)
 
-# Step 3: Run the scraping process. ScrapeGraphAI handles the LLM call and parsing.
-# The result should ideally be the Python list of review dictionaries directly.
-print("Starting ScrapeGraphAI extraction...")
-reviews_data = scraper.run()
-print("ScrapeGraphAI finished.")
+def build_prompt(fields: list) -> str:
+	"""
+    Builds the extraction prompt for a subset of the review fields.
 
-# ─────────────────── Save Extracted Data to JSON & Preview ────────────────────────
-# Ensure the output directory exists.
-os.makedirs(os.path.dirname(OUT_JSON), exist_ok=True)
+    Args:
+        fields (list): Keys of FIELD_SPECS the LLM should return for each review.
+
+    Returns:
+        str: The prompt text.
+    """
+	return PROMPT_TEMPLATE.format(
+		fields="\n".join(f"- {name}: {FIELD_SPECS[name]}" for name in fields),
+		guidelines=LIKES_GUIDELINES if {"likes", "dislikes"} & set(fields) else "",
+		example=json.dumps({k: v for k, v in EXAMPLE_REVIEW.items() if k in fields}, indent=2),
+	)
+
+
+# Full prompt used when the page exposes no schema.org review data.
+PROMPT = build_prompt(REVIEW_FIELDS)
+
+# ─────────────────── Extraction ────────────────────────────────────────────────────
+def extract_reviews(html_content: str) -> tuple:
+	"""
+    Extracts reviews from rendered HTML (a full page or a batch of review containers).
+
+    Two stages: the structural fields are read locally with the ConsumerAffairs
+    selectors, and only each review's rating and text go to the LLM for likes and
+    dislikes. If the selectors find no reviews (layout change), schema.org Review
+    data is read locally and only the fields it lacks are requested from the LLM;
+    without structured data, the whole pruned page is sent with the full prompt.
+
+    Args:
+        html_content (str): The rendered HTML.
+
+    Returns:
+        tuple: (list of review dicts, ScrapeGraphAI execution info).
+    """
+	# Stage 1: structural fields (name, location, date, rating, tags, text) from the DOM.
+	reviews = parse_reviews(html_content)
+	if reviews:
+		# Stage 2: only star_rating + review_text reach the LLM, for likes/dislikes.
+		exec_info = enrich_reviews(reviews, enricher)
+		print(f"Structural pass: {len(reviews)} reviews • LLM enrichment: likes, dislikes")
+		return [{name: review.get(name) for name in REVIEW_FIELDS} for review in reviews], exec_info
+
+	# Harvest schema.org Review data. Reviews backed by a page element can be matched
+	# to the LLM output by their id, so only the missing fields are requested.
+	structured_reviews = [r for r in harvest_reviews(html_content) if r.get("review_id")]
+	llm_fields = missing_fields(structured_reviews, REVIEW_FIELDS) if structured_reviews else REVIEW_FIELDS
+	print(f"Structured data: {len(structured_reviews)} reviews • "
+	      f"LLM fields: {', '.join(llm_fields)}")
+
+	# Prune the HTML so only content-bearing markup reaches the LLM. With structured
+	# data available, only the review containers themselves are sent.
+	if structured_reviews:
+		pruned_html = "\n".join(segment_records(html_content, container_selector='[itemtype$="schema.org/Review"]'))
+		prompt = build_prompt(["review_id"] + llm_fields)
+	else:
+		pruned_html, prune_stats = prune_html(html_content)
+		print(prune_stats.summary())
+		prompt = PROMPT
+
+	# Initialize the (cached) SmartScraperGraph with the prompt, HTML source, and config.
+	scraper = CachedSmartScraperGraph(
+		prompt=prompt,
+		source=pruned_html,  # Use the pruned rendered HTML, not the URL
+		config=graph_cfg
+	)
+
+	# Run the scraping process. ScrapeGraphAI handles the LLM call and parsing.
+	print("Starting ScrapeGraphAI extraction...")
+	reviews_data = scraper.run()
+	print("ScrapeGraphAI finished.")
+	llm_reviews = reviews_data if isinstance(reviews_data, list) else reviews_data.get("content", [])
+	if not structured_reviews:
+		return llm_reviews, scraper.execution_info
+
+	# Merge the LLM fields into the structured-data reviews by review id.
+	by_id = {r.get("review_id"): r for r in llm_reviews if isinstance(r, dict)}
+	merged_reviews = []
+	for review in structured_reviews:
+		merged = {**by_id.get(review["review_id"], {}), **review}
+		merged_reviews.append({name: merged.get(name) for name in REVIEW_FIELDS})
+	return merged_reviews, scraper.execution_info
+
+
+# ── Playwright: Render and Extract Incrementally ───────────────────────────────────
+def render_and_extract_incrementally(url: str, on_records, seen: SeenRecords | None = None,
+                                     dedup: RecordDeduper | None = None) -> list:
+	"""
+    Renders the review page and extracts each batch of newly loaded reviews on a
+    worker thread while Playwright keeps clicking "Load more".
+
+    Args:
+        url (str): The URL of the page to render.
+        on_records (Callable[[list], None]): Receives each batch of extracted reviews
+            as it finishes.
+        seen (SeenRecords | None): Reviews extracted by earlier runs; they are skipped
+            and "Load more" stops once they are reached.
+        dedup (RecordDeduper | None): Drops review containers that nearly duplicate
+            earlier ones (e.g. a truncated "More" teaser) before extraction.
 
-# Save the extracted reviews data to the specified JSON file.
-with open(OUT_JSON, "w", encoding="utf-8") as f:
-	# Use json.dump for pretty printing with indentation.
-	json.dump(reviews_data, f, indent=4)
-	print(f"Saved extracted reviews JSON → {OUT_JSON}")
+    Returns:
+        list: The combined ScrapeGraphAI execution info.
+
+    Side Effects:
+        - Writes the review containers, batch by batch, to OUT_FRAGMENTS and stores
+          that document in the snapshot store. Captured containers are emptied in
+          the browser to keep its memory flat, so there is no full page to save.
+    """
+	print(f"Starting Playwright to render and extract incrementally: {url}")
+	os.makedirs(os.path.dirname(OUT_FRAGMENTS), exist_ok=True)
+	pipeline = PipelinedExtractor(extract_reviews, max_workers=PIPELINE_WORKERS, on_records=on_records)
+	with sync_playwright() as p, open(OUT_FRAGMENTS, "w", encoding="utf-8") as html_file:
+		html_file.write("<div>\n")
+		browser = p.chromium.launch(headless=False)
+		archive = NetworkArchive.for_url(url)
+		page = browser.new_page(
+			**archive.context_options(),
+			user_agent=("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+			            "AppleWebKit/537.36 (KHTML, like Gecko) "
+			            "Chrome/119.0.0.0 Safari/537.36")
+		)
+		block_stats = DEFAULT_PROFILE.apply(page)
+		archive.attach(page)
+		page.goto(url, timeout=60_000)
+		wait_until_ready(page, selector=REVIEW_SELECTOR, quiet_ms=300, timeout_ms=15_000)
+
+		def on_batch(fragments: list) -> None:
+			# Save the new review containers, then queue them for extraction.
+			if dedup is not None:
+				fragments = dedup.filter_fragments(fragments)
+				if not fragments:
+					return
+			html_file.write("\n".join(fragments) + "\n")
+			pipeline.submit(fragments)
+
+		n_submitted = render_incrementally(page, REVIEW_SELECTOR, on_batch, release=True, seen=seen)
+		html_file.write("</div>\n")
+		archive.finish(page)
+		browser.close()
+		print(f"All {n_submitted} reviews loaded; review containers saved → {OUT_FRAGMENTS}")
+		if archive.mode != "replay":   # in replay the archive answers before the blocking profile
+			print(block_stats.summary())
+	# Keep this render in the snapshot store: the captured review containers, as saved.
+	with open(OUT_FRAGMENTS, "r", encoding="utf-8") as f:
+		snapshot = SnapshotStore().put(url, f.read())
+	print(f"Snapshot {snapshot.sha256[:12]} stored ({snapshot.raw_bytes:,} → {snapshot.stored_bytes:,} bytes)")
+	_, exec_info = pipeline.drain()
+	if pipeline.failed:
+		print(f"{len(pipeline.failed)} of {pipeline.n_batches} batches failed "
+		      f"({sum(n for _, n, _ in pipeline.failed)} reviews not extracted; they are retried next run)")
+	return exec_info
+
+
+# ─────────────────── Run the Scraper ───────────────────────────────────────────────
+# Reviews are appended to OUT_JSONL as they are extracted. Re-running resumes the
+# file: reviews already in it (same name, date and text) are skipped. Every extracted
+# review is also upserted into the result store, which records when it was first and
+# last seen, so the reviews new to this run can be queried afterwards.
+store = ResultStore()
+run_started = time.time()
+seen = SeenRecords(URL) if SINCE_LAST_RUN else None
+# Near-duplicate reviews are dropped twice: as HTML before the LLM, and as records before output.
+dedup = review_deduper()
+# Ids of the reviews saved this run; only these are remembered as seen.
+saved_ids = set()
+# Reviews whose extraction or enrichment failed; they are not saved, so the next run retries them.
+held_back = []
+
+
+def review_complete(review: dict) -> bool:
+	"""Whether a review was fully extracted (text present, likes/dislikes not left unset)."""
+	return bool(review.get("review_text")) and review.get("likes") is not None and review.get("dislikes") is not None
+
+
+with JsonlWriter(OUT_JSONL, key=lambda r: record_key(r, REVIEW_KEY_FIELDS)) as sink:
+
+	def keep_new(fragments: list) -> list:
+		# Drop reviews extracted by an earlier run, then near-duplicate review containers.
+		if seen is not None:
+			fragments = seen.filter(fragments)
+		return dedup.filter_fragments(fragments)
+
+	def save_reviews(reviews: list) -> None:
+		reviews = dedup.filter(reviews)
+		held_back.extend(r for r in reviews if not review_complete(r))
+		reviews = [r for r in reviews if review_complete(r)]
+		store.upsert("reviews", reviews, seen_at=run_started)
+		sink.write_many(reviews)
+		saved_ids.update(numeric_id(r.get("review_id")) for r in reviews)
+
+	if PIPELINED and not API_PAGINATION:
+		# Render and extract in one pass: LLM calls overlap with "Load more" page loads.
+		exec_info = render_and_extract_incrementally(URL, save_reviews, seen=seen, dedup=dedup)
+	else:
+		# Render the full page first (or fetch every review page through the captured
+		# pagination API), then extract it in concurrent record-aligned chunks.
+		if API_PAGINATION:
+			fragments, api_records = render_via_api(URL, REVIEW_SELECTOR)
+			html_content = "<div>\n" + "\n".join(fragments) + "\n</div>"
+			# Pages served as JSON records are already structured: keep the review fields as they
+			# are and only derive likes/dislikes the JSON does not carry.
+			api_reviews = [{name: r.get(name) for name in REVIEW_FIELDS} for r in api_records
+			               if any(r.get(name) for name in REVIEW_FIELDS)]
+			unenriched = [r for r in api_reviews if r["likes"] is None or r["dislikes"] is None]
+			api_exec_info = enrich_reviews(unenriched, enricher)
+			if api_reviews:
+				save_reviews(api_reviews)
+			print(f"Pagination API: {len(fragments)} review containers, {len(api_reviews)} JSON reviews")
+		else:
+			html_content = render_full_page(URL, seen=seen)
+		if ADAPTIVE_BATCHING:
+			# A review without likes/dislikes in the answer marks a truncated batch.
+			batcher = AdaptiveBatcher(extract_reviews, max_workers=PIPELINE_WORKERS, complete=review_complete)
+			batch_reviews, exec_info = batcher.run(keep_new(segment_records(html_content, REVIEW_SELECTOR)))
+			save_reviews(merge_records([batch_reviews], key_fields=REVIEW_KEY_FIELDS))
+		else:
+			review_chunks = chunk_html(html_content, record_selector=REVIEW_SELECTOR, keep=keep_new)
+			chunk_reviews, exec_info, _ = extract_chunks(review_chunks, extract_reviews, max_workers=PIPELINE_WORKERS)
+			save_reviews(merge_records(chunk_reviews, key_fields=REVIEW_KEY_FIELDS))
+		if API_PAGINATION:
+			exec_info = api_exec_info + exec_info
+	print(f"Streamed {sink.written} new reviews → {OUT_JSONL} "
+	      f"({sink.existing} from earlier runs, {sink.skipped} duplicates skipped, "
+	      f"{dedup.skipped} near-duplicates dropped)")
+if held_back:
+	print(f"{len(held_back)} reviews incompletely extracted (no text or likes/dislikes); "
+	      f"not saved, they are extracted again next run")
+enricher.close()
+if seen is not None:
+	# Remember only the reviews that were saved, so a crash or a failed extraction re-extracts them.
+	print(f"Since last run: {seen.summary()}")
+	seen.commit(saved_ids)
+print(f"Result store: {len(store.new_since('reviews', run_started))} reviews first seen this run, "
+      f"{store.count('reviews')} total → {store.path}")
+
+# ─────────────────── Save Extracted Data to JSON & Preview ────────────────────────
+# Stream the JSONL records into the indented JSON array file.
+n_saved = jsonl_to_json(OUT_JSONL, OUT_JSON)
+print(f"Saved {n_saved} extracted reviews JSON → {OUT_JSON}")
+# Same records as typed Parquet (dates, integer ratings, list columns for tags/likes/dislikes).
+n_rows = jsonl_to_parquet(OUT_JSONL, OUT_PARQUET, REVIEW_SCHEMA)
+print(f"Saved {n_rows} extracted reviews Parquet → {OUT_PARQUET}")
 
 # Print the first two extracted reviews for a quick sanity check.
 print("\nPreview of first 2 extracted reviews:")
-# Check if the result is a list (expected) or potentially a dict (fallback).
-if isinstance(reviews_data, list):
-	# If it's a list, print the first 2 items.
-	print(json.dumps(reviews_data[:2], indent=2))
-elif isinstance(reviews_data, dict) and "content" in reviews_data:
-	# If it's a dict with a 'content' key (sometimes happens), print from there.
-	print(json.dumps(reviews_data.get("content", [])[:2], indent=2))
-else:
-	# If the structure is unexpected, print a message.
-	print("Unexpected data structure returned by scraper. Cannot preview.")
-	print(f"Raw data type: {type(reviews_data)}")
+print(json.dumps(list(islice(iter_jsonl(OUT_JSONL), 2)), indent=2))
 
 # ─────────────────── Cost Calculation and Projections ─────────────────────────────
-# Retrieve the execution information which contains cost details per node.
-exec_info = scraper.execution_info
+# The execution information (exec_info) contains cost details per node.
 
 
 def _to_float(x) -> float:
@@ -235,15 +542,9 @@ total_cost = sum(
 	if "cost" in k.lower()  # Check if the key contains 'cost' (case-insensitive)
 )
 
-# Determine the number of successfully extracted reviews.
-# Handle both list and dict return types from the scraper.
-review_list = []
-if isinstance(reviews_data, list):
-	review_list = reviews_data
-elif isinstance(reviews_data, dict):
-	review_list = reviews_data.get("content", [])  # Safely get 'content' or empty list
-
-n_reviews = len(review_list)
+# Count the reviews extracted in this run (new ones and those the sink already had);
+# OUT_JSONL also holds every earlier run's reviews, whose cost this run did not pay.
+n_reviews = sink.written + sink.skipped
 
 # Print the detailed execution information (timing, costs per node).
 print("Execution Info:")
@@ -1,10 +1,15 @@
 import os
 import json
-import time
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
-from scrapegraphai.graphs import SmartScraperGraph
+from llm_cache import CachedSmartScraperGraph
 from scrapegraphai.utils import prettify_exec_info
+from selector_extraction import AUTONATION_TILE
+from resource_blocking import DEFAULT_PROFILE
+from readiness import wait_until_ready
+from near_duplicates import listing_deduper
+from snapshot_store import SnapshotStore
+from network_archive import NetworkArchive
 
 # Load .env environment variables
 load_dotenv()
@@ -16,7 +21,10 @@ target_url = "https://www.autonation.com/cars-for-sale?mk=chrysler"
 def fetch_rendered_html(url: str) -> str:
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
+        # NETWORK_ARCHIVE=record/replay records this render to a HAR archive or serves it from one
+        archive = NetworkArchive.for_url(url)
         context = browser.new_context(
+            **archive.context_options(),
             user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
             locale="en-US",
             extra_http_headers={
@@ -26,6 +34,9 @@ def fetch_rendered_html(url: str) -> str:
             }
         )
         page = context.new_page()
+        # Skip images, fonts, media and analytics; the LLM only needs the DOM
+        block_stats = DEFAULT_PROFILE.apply(page)
+        archive.attach(page)
         page.goto(url, timeout=60000)
 
         try:
@@ -36,9 +47,17 @@ def fetch_rendered_html(url: str) -> str:
             raise e
 
         page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(10)  # Let lazy-loaded content hydrate
+        # Let lazy-loaded content hydrate: tile count stable and DOM quiet, at most 10 s
+        ready = wait_until_ready(page, selector="ansrp-srp-tile-v3", quiet_ms=1000, timeout_ms=10_000)
+        print(f"⏱️ {ready.summary()}")
 
         html = page.content()
+        # Keep every render for re-extraction and audits (deduplicated, zstd-compressed)
+        snapshot = SnapshotStore().put(url, html)
+        print(f"📦 Snapshot {snapshot.sha256[:12]} • {snapshot.raw_bytes:,} → {snapshot.stored_bytes:,} bytes")
+        if archive.mode != "replay":  # in replay the archive answers before the blocking profile
+            print(f"🚫 {block_stats.summary()}")
+        archive.finish(page)
         browser.close()
         return html
 
@@ -63,6 +82,7 @@ Each car listing is inside a <ansrp-srp-tile-v3> tag.
 
 Extract the following:
 
+- **vin**: From the tile's id attribute, which reads "vehicle_<VIN>"; return only the VIN.
 - **car_name**: From the <h3> tag inside `.tile-info`, including nested <span>.
 - **car_status**: From the <span class="tile-status"> element (e.g., "In Stock").
 - **car_price**: From <div class="price-Value">. If missing, return "N/A".
@@ -71,6 +91,7 @@ Extract the following:
 Only return a JSON array like:
 [
   {
+    "vin": "19UDE4H69PA012345",
     "car_name": "2023 Acura Integra CVT w/A-Spec Technology Package",
     "car_status": "In Stock",
     "car_price": "$27,584",
@@ -81,18 +102,25 @@ Only JSON. No explanation or markdown.
 """
 
 
-# Run SmartScraperGraph with rendered HTML
-smart_scraper_graph = SmartScraperGraph(
-    prompt=prompt,
-    source=rendered_html,
-    config=graph_config
-)
+# LLM fallback: run SmartScraperGraph on a batch of tiles the selectors could not complete
+def llm_extract(batch_html: str) -> list:
+    smart_scraper_graph = CachedSmartScraperGraph(
+        prompt=prompt,
+        source=batch_html,
+        config=graph_config
+    )
+    batch_result = smart_scraper_graph.run()
+
+    # Execution stats
+    print("\n📊 Execution Info (LLM fallback batch):")
+    print(prettify_exec_info(smart_scraper_graph.get_execution_info()))
+    return batch_result if isinstance(batch_result, list) else batch_result.get("content", [])
+
+
+# Read every tile with the compiled selectors; only incomplete tiles reach the LLM
+result = AUTONATION_TILE.extract_with_fallback(rendered_html, llm_extract)
+# Drop repeated listings (same VIN, cosmetic name differences)
+result = listing_deduper().filter(result)
 
-# Execute the scraping pipeline
-result = smart_scraper_graph.run()
 print("✅ Extracted JSON result:")
 print(json.dumps(result, indent=4))
-
-# Execution stats
-print("\n📊 Execution Info:")
-print(prettify_exec_info(smart_scraper_graph.get_execution_info()))
@@ -1,14 +1,23 @@
-import os, json, time, re
+import os, json, re
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
-from scrapegraphai.graphs import SmartScraperGraph
+from llm_cache import CachedSmartScraperGraph
 from scrapegraphai.utils import prettify_exec_info
+from html_pruning import prune_html
+from resource_blocking import DEFAULT_PROFILE
+from readiness import wait_until_ready
+from columnar_export import CAR_SCHEMA, write_parquet
+from result_store import ResultStore
+from near_duplicates import listing_deduper
+from snapshot_store import SnapshotStore
+from network_archive import NetworkArchive
 
 load_dotenv()
 
 target_url        = "https://www.autonation.com/cars-for-sale?mk=chrysler"
 output_html_path  = "outputs/autonation_rendered.html"
 output_json_path  = "outputs/autonation_results.json"
+output_parquet_path = "outputs/autonation_results.parquet"
 projection_sizes  = [100, 1_000, 100_000, 1_000_000]
 
 graph_config = {
@@ -24,6 +33,7 @@ prompt = """
 You are a smart web-scraping assistant. The HTML is from a car-listing site.
 
 For every car extract:
+- vin (the 17-character VIN from the tile's id attribute, id="vehicle_<VIN>")
 - car_name
 - car_status
 - car_price
@@ -38,22 +48,33 @@ Return ONLY a JSON array of car objects. No markdown, no commentary.
 def fetch_rendered_html(url: str) -> str:
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
-        page    = browser.new_page()
+        archive = NetworkArchive.for_url(url)       # NETWORK_ARCHIVE=record/replay: HAR archive
+        page    = browser.new_page(**archive.context_options())
+        block_stats = DEFAULT_PROFILE.apply(page)   # skip images/fonts/media/analytics
+        archive.attach(page)                        # after blocking, so replay answers first
         page.goto(url, timeout=60_000)
-        time.sleep(10)
+        # wait for the tiles instead of sleeping a fixed 10 s (upper bound 20 s)
+        wait_until_ready(page, selector="ansrp-srp-tile-v3", quiet_ms=1000, timeout_ms=20_000)
         page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(10)
+        ready = wait_until_ready(page, selector="ansrp-srp-tile-v3", quiet_ms=1000, timeout_ms=10_000)
+        print(f"⏱️ {ready.summary()}")
         html = page.content()
         os.makedirs(os.path.dirname(output_html_path), exist_ok=True)
         with open(output_html_path, "w", encoding="utf-8") as f:
             f.write(html)
+        snapshot = SnapshotStore().put(url, html)   # keep every render, deduplicated and compressed
+        archive.finish(page)                        # record: writes the HAR
         browser.close()
-        print("✅ HTML rendered & saved.")
+        print(f"✅ HTML rendered & saved (snapshot {snapshot.sha256[:12]}).")
+        if archive.mode != "replay":                # replay: the archive answers before blocking
+            print(f"🚫 {block_stats.summary()}")
         return html
 # ────────────────────────────────────────────────────────────────────────
 html_content = fetch_rendered_html(target_url)
+pruned_html, prune_stats = prune_html(html_content)
+print(prune_stats.summary())
 
-scraper = SmartScraperGraph(prompt=prompt, source=html_content, config=graph_config)
+scraper = CachedSmartScraperGraph(prompt=prompt, source=pruned_html, config=graph_config)
 result  = scraper.run()
 
 print("\n✅ Extracted JSON:")
@@ -63,6 +84,17 @@ os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
 with open(output_json_path, "w", encoding="utf-8") as f:
     json.dump(result, f, indent=4)
 
+# Typed copy for pandas/DuckDB: price and mileage as numeric columns
+cars = result if isinstance(result, list) else result.get("content", [])
+cars = listing_deduper().filter(cars)   # the same car can be listed twice
+n_rows = write_parquet(cars, output_parquet_path, CAR_SCHEMA)
+print(f"💾 Saved {n_rows} listings → {output_parquet_path}")
+
+# Upsert into the result store: only new or changed listings are rewritten
+store = ResultStore()
+delta = store.upsert("listings", cars)
+print(f"🗄️  Result store: {delta.summary()} • {store.count('listings')} listings total")
+
 # ── Execution info & cost extraction ─────────────────────────────────────
 exec_info_list = scraper.execution_info          # list[dict]
 print("\n📊 Execution Info:")
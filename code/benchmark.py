@@ -0,0 +1,389 @@
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from columnar_export import CAR_SCHEMA, REVIEW_SCHEMA, write_parquet
+from html_pruning import estimate_tokens, prune_html
+from jsonl_sink import JsonlWriter
+from llm_scheduler import ScheduledExtractor
+from mock_llm_server import LatencyModel, MockLLMServer
+from segmentation import batch_fragments, segment_records
+
+"""
+End-to-end benchmark over the saved pages in outputs/*.html.
+
+Each fixture runs through the stages of our extraction scripts:
+
+    load       read the rendered HTML from disk
+    prune      html_pruning.prune_html
+    segment    segmentation.segment_records (one fragment per record)
+    extract    batched LLM extraction through llm_scheduler, against the local mock
+               server (mock_llm_server), so no API calls are made and the LLM latency
+               is a fixed, configurable model
+    serialize  JSONL sink and typed Parquet export
+
+Per stage the harness runs one untimed warm-up and `--iterations` timed runs and
+reports the fastest wall time (the least disturbed run) with the interquartile spread
+of the runs, the memory the stage itself added on top of the RSS it started from, the
+process peak RSS (informational: it includes the interpreter and imports), input/output
+tokens and records per second. Results are written as JSON to outputs/benchmarks/; with
+`--baseline` every metric is compared against an earlier result and the run fails
+(exit code 1) when one regresses past its threshold in REGRESSION_THRESHOLDS and past
+the noise floor: time differences within NOISE_SPREADS × the measured spread, or
+memory differences below MIN_RSS_DELTA_MB, never count. Every timed run is paired
+with a run of a fixed CPU workload (`calibration_s`, fastest of the stage's runs);
+baseline timings are scaled by the ratio of the two stages' calibrations, so a machine
+that runs slower for a while (CPU throttling, a busy host) does not read as a
+regression.
+
+    python benchmark.py --save-baseline
+    python benchmark.py --baseline ../outputs/benchmarks/baseline.json
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+BENCHMARK_DIR = os.path.join(OUTPUT_DIR, "benchmarks")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+STAGES = ("load", "prune", "segment", "extract", "serialize")
+
+# Record container and Parquet schema per fixture kind.
+KINDS = {
+    "listings": {"selector": "ansrp-srp-tile-v3", "schema": CAR_SCHEMA},
+    "reviews": {"selector": "div.js-rvw", "schema": REVIEW_SCHEMA},
+}
+FIXTURE_KINDS = {"autonation_rendered.html": "listings", "ca_autonation_rendered.html": "reviews"}
+
+EXTRACT_PROMPT = """
+Extract every record in the HTML below (car listings or customer reviews) as a JSON
+object {"content": [...]} with one object per record. Only JSON.
+"""
+
+# Relative change past which a metric counts as a regression: higher is worse for all
+# of them except records_per_s, where a drop is.
+REGRESSION_THRESHOLDS = {"wall_s": 0.20, "rss_delta_mb": 0.25, "input_tokens": 0.05, "output_tokens": 0.05,
+                         "records_per_s": 0.20}
+# Noise floors: a wall-time change (and so a records_per_s change) must also exceed
+# MIN_WALL_DELTA_S and NOISE_SPREADS times the smaller interquartile spread of the two
+# runs (one disturbed run must not widen the floor past real regressions); a memory
+# change must exceed MIN_RSS_DELTA_MB.
+MIN_WALL_DELTA_S = 0.005
+NOISE_SPREADS = 3.0
+MIN_RSS_DELTA_MB = 10.0
+
+DEFAULT_ITERATIONS = 10
+
+RSS_POLL_SECONDS = 0.002
+
+
+# ─────────────────── Measurement ───────────────────────────────────────────────────
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs (macOS): the lifetime peak is the best available figure (bytes on macOS).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class PeakRSS:
+    """Samples the process RSS on a background thread while a stage runs."""
+
+    def __init__(self, interval: float = RSS_POLL_SECONDS):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        self.start = self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    @property
+    def delta(self) -> int:
+        """Bytes the process grew by while the stage ran (peak over the starting RSS)."""
+        return self.peak - self.start
+
+
+def calibrate() -> float:
+    """Time of a fixed CPU-bound workload (~5 ms): how fast this machine is right now."""
+    start = time.perf_counter()
+    sorted(str(i * 7919 % 100_003) for i in range(15_000))
+    return time.perf_counter() - start
+
+
+@dataclass
+class Timing:
+    """Wall time and memory of a stage over its timed runs."""
+    wall_s: float           # fastest run
+    wall_spread_s: float    # interquartile range of the runs (max - min below 4 runs)
+    calibration_s: float    # fastest calibrate() run, each taken right before a timed run
+    rss_delta_mb: float     # largest growth over the starting RSS in any run
+    peak_rss_mb: float      # process peak RSS, interpreter and imports included
+
+
+@dataclass
+class StageResult:
+    """Measurements of one stage on one fixture."""
+    wall_s: float
+    wall_spread_s: float
+    calibration_s: float
+    rss_delta_mb: float
+    peak_rss_mb: float
+    input_tokens: int = 0
+    output_tokens: int = 0
+    records: int = 0
+
+    @classmethod
+    def of(cls, timing: Timing, **counts) -> "StageResult":
+        return cls(timing.wall_s, timing.wall_spread_s, timing.calibration_s, timing.rss_delta_mb,
+                   timing.peak_rss_mb, **counts)
+
+    @property
+    def records_per_s(self) -> float:
+        return self.records / self.wall_s if self.wall_s and self.records else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "wall_s": round(self.wall_s, 5), "wall_spread_s": round(self.wall_spread_s, 5),
+                "calibration_s": round(self.calibration_s, 6), "rss_delta_mb": round(self.rss_delta_mb, 1), "peak_rss_mb": round(self.peak_rss_mb, 1),
+                "records_per_s": round(self.records_per_s, 1)}
+
+
+def _spread(times: list[float]) -> float:
+    if len(times) >= 4:
+        q1, _, q3 = statistics.quantiles(times, n=4)
+        return q3 - q1
+    return max(times) - min(times)
+
+
+def _measure(func, iterations: int) -> tuple:
+    """Runs `func` once untimed, then `iterations` times; returns (last result, Timing)."""
+    func()  # warm-up: caches, lazy imports, connection pools
+    times, calibrations, delta, peak = [], [], 0, 0
+    for _ in range(max(iterations, 1)):
+        gc.collect()
+        calibrations.append(calibrate())
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        delta, peak = max(delta, rss.delta), max(peak, rss.peak)
+    return result, Timing(min(times), _spread(times), min(calibrations), delta / 1e6, peak / 1e6)
+
+
+# ─────────────────── Pipeline ──────────────────────────────────────────────────────
+
+def fixture_kind(path: str) -> str:
+    """"listings" or "reviews": from FIXTURE_KINDS, else by which record container the page holds."""
+    name = os.path.basename(path)
+    if name in FIXTURE_KINDS:
+        return FIXTURE_KINDS[name]
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    return "reviews" if "js-rvw" in html else "listings"
+
+
+def benchmark_fixture(path: str, extractor: ScheduledExtractor, iterations: int = DEFAULT_ITERATIONS) -> dict:
+    """
+    Runs one saved page through every stage.
+
+    Args:
+        path (str): Rendered HTML fixture.
+        extractor (ScheduledExtractor): LLM extraction callable (pointed at the mock server).
+        iterations (int): Timed repetitions per stage; the fastest wall time is reported.
+
+    Returns:
+        dict: Stage name → StageResult.
+    """
+    kind = KINDS[fixture_kind(path)]
+    results = {}
+
+    def load() -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    html, timing = _measure(load, iterations)
+    results["load"] = StageResult.of(timing, input_tokens=estimate_tokens(html))
+
+    (pruned, stats), timing = _measure(lambda: prune_html(html), iterations)
+    results["prune"] = StageResult.of(timing, input_tokens=stats.tokens_before, output_tokens=stats.tokens_after)
+
+    fragments, timing = _measure(lambda: segment_records(html, kind["selector"]), iterations)
+    results["segment"] = StageResult.of(timing, input_tokens=estimate_tokens(html),
+                                        output_tokens=sum(estimate_tokens(f) for f in fragments),
+                                        records=len(fragments))
+
+    def extract() -> tuple:
+        records, exec_info = [], []
+        for batch in batch_fragments(fragments):
+            batch_records, info = extractor(batch)
+            records.extend(batch_records)
+            exec_info.extend(info)
+        return records, exec_info
+
+    (records, exec_info), timing = _measure(extract, iterations)
+    results["extract"] = StageResult.of(timing, records=len(records),
+                                        input_tokens=sum(n.get("prompt_tokens", 0) for n in exec_info),
+                                        output_tokens=sum(n.get("completion_tokens", 0) for n in exec_info))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def serialize() -> int:
+            with JsonlWriter(os.path.join(tmp, "records.jsonl"), resume=False) as sink:
+                sink.write_many(records)
+            return write_parquet(records, os.path.join(tmp, "records.parquet"), kind["schema"])
+
+        written, timing = _measure(serialize, iterations)
+    results["serialize"] = StageResult.of(timing, records=written)
+    return results
+
+
+def run_benchmark(fixtures: list[str], iterations: int = DEFAULT_ITERATIONS,
+                  latency: LatencyModel | None = None) -> dict:
+    """
+    Benchmarks every fixture and returns the machine-readable report.
+
+    Args:
+        fixtures (list[str]): Rendered HTML files.
+        iterations (int): Timed repetitions per stage.
+        latency (LatencyModel | None): Mock LLM latency (default: fixed 0 ms, so the
+            extract stage measures our own overhead only).
+
+    Returns:
+        dict: {"meta": {...}, "results": {fixture: {stage: metrics}}}.
+    """
+    latency = latency or LatencyModel("fixed", 0.0, ms_per_output_token=0.0)
+    report = {"meta": _meta(iterations, latency), "results": {}}
+    with MockLLMServer(latency=latency, port=0) as server:
+        extractor = ScheduledExtractor(EXTRACT_PROMPT, base_url=server.base_url, api_key="benchmark")
+        try:
+            for path in fixtures:
+                stages = benchmark_fixture(path, extractor, iterations)
+                report["results"][os.path.basename(path)] = {s: r.as_dict() for s, r in stages.items()}
+        finally:
+            extractor.close()
+    return report
+
+
+def _meta(iterations: int, latency: LatencyModel) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "iterations": iterations, "llm_latency": asdict(latency)}
+
+
+# ─────────────────── Regression check ──────────────────────────────────────────────
+
+def _scaled(base: dict, scale: float) -> dict:
+    """Baseline stage metrics as they would read on a machine `scale` times slower."""
+    base = dict(base)
+    for key in ("wall_s", "wall_spread_s"):
+        if base.get(key) is not None:
+            base[key] *= scale
+    if base.get("records_per_s"):
+        base["records_per_s"] /= scale
+    return base
+
+
+def _within_noise(metric: str, base: dict, metrics: dict) -> bool:
+    """Whether a change of `metric` is inside the noise floor of the two measurements."""
+    if metric in ("wall_s", "records_per_s"):
+        # records_per_s is derived from wall_s, so it shares its noise floor.
+        floor = max(MIN_WALL_DELTA_S,
+                    NOISE_SPREADS * min(base.get("wall_spread_s") or 0.0, metrics.get("wall_spread_s") or 0.0))
+        return abs(metrics["wall_s"] - base["wall_s"]) <= floor
+    if metric == "rss_delta_mb":
+        return metrics[metric] - base[metric] < MIN_RSS_DELTA_MB
+    return False
+
+
+def compare(report: dict, baseline: dict, thresholds: dict = REGRESSION_THRESHOLDS) -> list[str]:
+    """
+    Compares a report against a baseline report.
+
+    Returns:
+        list[str]: One line per regressed metric (empty when nothing regressed).
+    """
+    regressions = []
+    for fixture, stages in report["results"].items():
+        for stage, metrics in stages.items():
+            base = baseline.get("results", {}).get(fixture, {}).get(stage)
+            if base is None:
+                continue
+            if base.get("calibration_s") and metrics.get("calibration_s"):
+                base = _scaled(base, metrics["calibration_s"] / base["calibration_s"])
+            for metric, limit in thresholds.items():
+                old, new = base.get(metric), metrics.get(metric)
+                if not old or new is None or _within_noise(metric, base, metrics):
+                    continue
+                change = (old - new) / old if metric == "records_per_s" else (new - old) / old
+                if change > limit:
+                    regressions.append(f"{fixture} • {stage} • {metric}: {old:.5g} → {new:.5g} "
+                                       f"({change:+.0%} worse, limit {limit:.0%})")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    for fixture, stages in report["results"].items():
+        print(f"\n{fixture}")
+        print(f"  {'stage':<10} {'wall ms':>9} {'± IQR ms':>9} {'+RSS MB':>8} {'peak RSS MB':>12} "
+              f"{'in tokens':>10} {'out tokens':>11} {'rec/s':>10}")
+        for stage, m in stages.items():
+            print(f"  {stage:<10} {m['wall_s'] * 1000:>9.1f} {m['wall_spread_s'] * 1000:>9.1f} "
+                  f"{m['rss_delta_mb']:>8.1f} {m['peak_rss_mb']:>12.1f} {m['input_tokens']:>10,} "
+                  f"{m['output_tokens']:>11,} {m['records_per_s']:>10,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline on saved pages.")
+    parser.add_argument("fixtures", nargs="*", help="HTML files (default: outputs/*.html)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="fixed mock LLM latency per request")
+    parser.add_argument("--out", default=None, help="report path (default outputs/benchmarks/benchmark_<time>.json)")
+    parser.add_argument("--baseline", default=None, help="report to compare against; exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the report to {BASELINE_PATH}")
+    args = parser.parse_args()
+
+    paths = args.fixtures or sorted(glob.glob(os.path.join(OUTPUT_DIR, "*.html")))
+    result = run_benchmark(paths, args.iterations, LatencyModel("fixed", args.llm_latency_ms, ms_per_output_token=0.0))
+    print_report(result)
+
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    out_path = args.out or os.path.join(BENCHMARK_DIR, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    for target in [out_path] + ([BASELINE_PATH] if args.save_baseline else []):
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    print(f"\nReport → {out_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failed = compare(result, json.load(f))
+        for line in failed:
+            print(f"REGRESSION {line}")
+        print("No regressions against the baseline." if not failed else f"{len(failed)} regression(s).")
+        sys.exit(1 if failed else 0)
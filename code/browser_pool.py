@@ -0,0 +1,187 @@
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from readiness import wait_until_ready_async
+from resource_blocking import DEFAULT_PROFILE, BlockingProfile
+
+"""
+Long-lived async Playwright browser pool for concurrent rendering.
+
+The scripts launch a fresh Chromium through sync_playwright() for every URL and
+close it afterwards, so browser start-up is paid once per page and pages are
+rendered one after another. `BrowserPool` launches Chromium once, keeps a fixed
+set of browser contexts and pages alive, and hands them out to up to
+`concurrency` render jobs at a time. Hundreds of AutoNation search URLs can then
+be rendered in parallel from one process:
+
+    async with BrowserPool(concurrency=8) as pool:
+        pages = await pool.render_many(urls, wait_selector="ansrp-srp-tile-v3")
+"""
+
+# Same desktop Chrome identity the scripts use.
+USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/119.0.0.0 Safari/537.36")
+
+CONTEXT_OPTIONS = {
+    "user_agent": USER_AGENT,
+    "locale": "en-US",
+    "extra_http_headers": {
+        "Accept-Language": "en-US,en;q=0.9",
+        "Cache-Control": "no-cache",
+        "Pragma": "no-cache",
+    },
+}
+
+# AutoNation inventory search, one URL per make.
+AUTONATION_SEARCH_URL = "https://www.autonation.com/cars-for-sale?mk={make}"
+
+
+class BrowserPool:
+    """
+    A pool of reusable Playwright pages backed by a single Chromium process.
+
+    Pages are spread over `contexts` browser contexts (separate cookie jars);
+    `concurrency` pages exist in total, so at most that many renders run at once.
+
+    Args:
+        concurrency (int): Maximum number of pages rendering at the same time.
+        contexts (int): Number of browser contexts the pages are spread over.
+        headless (bool): Launch Chromium without a window.
+        context_options (dict | None): Options for browser.new_context().
+        setup_page: Optional async callable (page) -> None run once per new page,
+            e.g. to install request routing.
+    """
+
+    def __init__(self, concurrency: int = 8, contexts: int = 2, headless: bool = True,
+                 context_options: dict | None = None, setup_page=None):
+        self.concurrency = concurrency
+        self.n_contexts = max(1, min(contexts, concurrency))
+        self.headless = headless
+        self.context_options = context_options or CONTEXT_OPTIONS
+        self.setup_page = setup_page
+        self._playwright = None
+        self.browser = None
+        self.contexts = []
+        self._pages = None
+
+    async def start(self) -> "BrowserPool":
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(headless=self.headless)
+        self.contexts = [await self.browser.new_context(**self.context_options)
+                         for _ in range(self.n_contexts)]
+        self._pages = asyncio.Queue()
+        for i in range(self.concurrency):
+            self._pages.put_nowait(await self._new_page(self.contexts[i % self.n_contexts]))
+        return self
+
+    async def close(self) -> None:
+        if self.browser is not None:
+            await self.browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self.browser = self._playwright = None
+
+    async def __aenter__(self) -> "BrowserPool":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _new_page(self, context):
+        page = await context.new_page()
+        if self.setup_page is not None:
+            await self.setup_page(page)
+        return page
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Borrows a page from the pool, waiting while all pages are busy.
+
+        A page that crashed or was closed during use is replaced by a fresh page in
+        the same context before it goes back to the pool.
+        """
+        page = await self._pages.get()
+        try:
+            yield page
+        finally:
+            if page.is_closed():
+                page = await self._new_page(page.context)
+            self._pages.put_nowait(page)
+
+    async def render(self, url: str, wait_selector: str | None = None, ready=None,
+                     timeout: int = 60_000) -> str:
+        """
+        Renders one URL on a pooled page and returns its HTML.
+
+        Args:
+            url (str): The page to render.
+            wait_selector (str | None): Wait until this selector is attached.
+            ready: Optional async callable (page) -> None awaited before the HTML
+                is read (scrolling, "Load more" clicks, readiness checks, ...).
+            timeout (int): Navigation / selector timeout in milliseconds.
+
+        Returns:
+            str: The rendered HTML content.
+        """
+        async with self.page() as page:
+            await page.goto(url, timeout=timeout)
+            if wait_selector:
+                await page.wait_for_selector(wait_selector, timeout=timeout)
+            if ready is not None:
+                await ready(page)
+            return await page.content()
+
+    async def render_many(self, urls: list[str], **render_kwargs) -> dict[str, str | Exception]:
+        """
+        Renders many URLs concurrently (bounded by the pool size).
+
+        Args:
+            urls (list[str]): The pages to render.
+            **render_kwargs: Passed to render().
+
+        Returns:
+            dict[str, str | Exception]: HTML per URL, or the exception that URL raised,
+            so one failing page does not cancel the batch.
+        """
+        async def one(url):
+            start = time.perf_counter()
+            try:
+                html = await self.render(url, **render_kwargs)
+                print(f"✅ Rendered {url} in {time.perf_counter() - start:.1f}s ({len(html):,} bytes)")
+                return html
+            except Exception as e:
+                print(f"⚠️ Failed to render {url}: {e}")
+                return e
+
+        results = await asyncio.gather(*(one(url) for url in urls))
+        return dict(zip(urls, results))
+
+
+async def render_urls(urls: list[str], concurrency: int = 8, blocking: BlockingProfile | None = DEFAULT_PROFILE,
+                      **render_kwargs) -> dict[str, str | Exception]:
+    """Starts a pool (with `blocking` installed on every page), renders every URL and shuts it down."""
+    setup_page = blocking.apply_async if blocking is not None else None
+    async with BrowserPool(concurrency=concurrency, setup_page=setup_page) as pool:
+        return await pool.render_many(urls, **render_kwargs)
+
+
+async def _scroll_to_bottom(page) -> None:
+    # AutoNation lazy-loads tile details once they scroll into view.
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+    await wait_until_ready_async(page, selector="ansrp-srp-tile-v3", quiet_ms=1000, timeout_ms=10_000)
+
+
+if __name__ == "__main__":
+    # Usage: python browser_pool.py chrysler jeep dodge ram ...
+    makes = sys.argv[1:] or ["chrysler", "jeep", "dodge", "ram"]
+    search_urls = [AUTONATION_SEARCH_URL.format(make=make) for make in makes]
+    started = time.perf_counter()
+    rendered = asyncio.run(render_urls(search_urls, wait_selector="ansrp-srp-tile-v3", ready=_scroll_to_bottom))
+    ok = sum(1 for v in rendered.values() if isinstance(v, str))
+    print(f"\nRendered {ok}/{len(search_urls)} pages in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,121 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+
+from html_pruning import estimate_tokens
+from segmentation import batch_fragments, segment_records
+
+"""
+Chunked parallel extraction with record-boundary-aware splitting.
+
+A ConsumerAffairs page with thousands of reviews does not fit in one model
+context, and one huge completion is slow even when it does. `chunk_html` cuts the
+page on record boundaries (review blocks, listing tiles) into chunks that fit a
+token budget, so no record is ever split between two chunks. `extract_chunks`
+runs the chunks through a bounded worker pool (a failing chunk is reported and the
+others are kept), and `merge_records` concatenates the partial JSON arrays in page
+order and drops duplicates.
+"""
+
+# Estimated input tokens per chunk; leaves room for the prompt and the JSON answer.
+CHUNK_TOKENS = 12_000
+
+
+def chunk_html(html: str, record_selector: str | None = None, max_tokens: int = CHUNK_TOKENS,
+               keep: Callable[[list[str]], list[str]] | None = None) -> list[str]:
+    """
+    Splits rendered HTML into token-budgeted chunks of whole records.
+
+    Args:
+        html (str): The rendered HTML content.
+        record_selector (str | None): CSS selector matching one record; if None,
+            repeated sibling structures are detected automatically.
+        max_tokens (int): Estimated input-token budget per chunk.
+        keep (Callable[[list[str]], list[str]] | None): Filters the record fragments
+            before they are chunked (e.g. SeenRecords.filter).
+
+    Returns:
+        list[str]: HTML chunks, each holding one or more complete records.
+    """
+    fragments = segment_records(html, container_selector=record_selector)
+    if keep is not None:
+        fragments = keep(fragments)
+    chunks = batch_fragments(fragments, max_tokens=max_tokens)
+    print(f"Chunked {len(fragments)} records into {len(chunks)} chunks "
+          f"(≤ ~{max_tokens:,} tokens each, ~{sum(map(estimate_tokens, chunks)):,} total)")
+    return chunks
+
+
+def extract_chunks(chunks: list[str], extract_chunk: Callable[[str], tuple],
+                   max_workers: int = 8) -> tuple[list[list], list, list]:
+    """
+    Extracts chunks concurrently with a bounded thread pool.
+
+    Args:
+        chunks (list[str]): HTML chunks from chunk_html.
+        extract_chunk (Callable[[str], tuple]): Extracts one chunk and returns
+            (records, exec_info).
+        max_workers (int): Maximum number of extraction calls in flight.
+
+    Returns:
+        tuple[list[list], list, list]: The record list of every chunk (in chunk
+        order; empty for a failed chunk), the combined execution info, and
+        (chunk index, error) for every chunk whose extraction raised.
+    """
+    start = time.perf_counter()
+    record_lists, infos, failed = [[] for _ in chunks], [[] for _ in chunks], []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(extract_chunk, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                record_lists[i], infos[i] = future.result()
+            except Exception as exc:
+                failed.append((i, f"{type(exc).__name__}: {exc}"))
+    exec_info = [node for info in infos for node in (info or [])]
+    failed.sort()
+    print(f"Extracted {len(chunks) - len(failed)} of {len(chunks)} chunks with {max_workers} workers "
+          f"in {time.perf_counter() - start:.1f}s")
+    for i, error in failed:
+        print(f"  chunk {i} failed: {error}")
+    return record_lists, exec_info, failed
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).lower()
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def record_key(record: dict, key_fields: tuple | None = None) -> str:
+    """Identity of a record: the normalized key fields, or the whole normalized record."""
+    if key_fields:
+        record = {k: record.get(k) for k in key_fields}
+    return json.dumps({k: _normalize(v) for k, v in record.items()}, sort_keys=True, default=str)
+
+
+def merge_records(record_lists: list[list], key_fields: tuple | None = None) -> list[dict]:
+    """
+    Concatenates partial JSON arrays and drops duplicate records (first one wins).
+
+    Args:
+        record_lists (list[list]): Record lists in page order.
+        key_fields (tuple | None): Fields that identify a record; all fields if None.
+
+    Returns:
+        list[dict]: The merged, de-duplicated records.
+    """
+    seen, merged = set(), []
+    for records in record_lists:
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            key = record_key(record, key_fields)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(record)
+    return merged
@@ -0,0 +1,172 @@
+import re
+import sys
+from datetime import date, datetime
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from jsonl_sink import iter_jsonl
+
+"""
+Columnar Parquet export for reviews and car listings.
+
+Large indented JSON is slow to load into pandas/DuckDB and stores every value as
+text. `ParquetRecordWriter` converts our review and car records to typed Arrow
+columns (prices and mileage become numbers, review dates become dates, tags and
+likes/dislikes become string lists) and writes them as zstd-compressed Parquet,
+one row group at a time as records stream in.
+
+    python columnar_export.py reviews outputs/ca_autonation_reviews.jsonl outputs/ca_autonation_reviews.parquet
+"""
+
+REVIEW_SCHEMA = pa.schema([
+    ("review_id", pa.string()),
+    ("reviewer_name", pa.string()),
+    ("reviewer_location", pa.string()),
+    ("review_date", pa.date32()),
+    ("star_rating", pa.int8()),
+    ("tags", pa.list_(pa.string())),
+    ("review_text", pa.string()),
+    ("likes", pa.list_(pa.string())),
+    ("dislikes", pa.list_(pa.string())),
+])
+
+CAR_SCHEMA = pa.schema([
+    ("vin", pa.string()),
+    ("car_name", pa.string()),
+    ("car_status", pa.string()),
+    ("car_price", pa.float64()),    # USD, null when the listing shows no price ("N/A")
+    ("car_mileage", pa.int64()),    # miles
+])
+
+SCHEMAS = {"reviews": REVIEW_SCHEMA, "cars": CAR_SCHEMA}
+
+_NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+_DATE_FORMATS = ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%b. %d, %Y", "%m/%d/%Y", "%d %B %Y")
+
+
+# ─────────────────── Value Parsers ─────────────────────────────────────────────────
+
+
+def parse_number(value) -> float | None:
+    """Parses "$27,584", "53,390 miles" or 27584 into a number; None if there is none."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _NUMBER.search(str(value or ""))
+    return float(match.group().replace(",", "")) if match else None
+
+
+def parse_int(value) -> int | None:
+    number = parse_number(value)
+    return int(round(number)) if number is not None else None
+
+
+def parse_date(value) -> date | None:
+    """Parses "2025-05-03", "May 3, 2025" or "Reviewed May 3, 2025"; None if unparseable."""
+    if isinstance(value, date):
+        return value
+    text = re.sub(r"^(reviewed|posted|updated)\s+", "", " ".join(str(value or "").split()), flags=re.I)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_str_list(value) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value]
+
+
+def _parse_str(value) -> str | None:
+    return None if value is None else str(value)
+
+
+_PARSERS = {
+    pa.string(): _parse_str,
+    pa.date32(): parse_date,
+    pa.int8(): parse_int,
+    pa.int64(): parse_int,
+    pa.float64(): parse_number,
+    pa.list_(pa.string()): parse_str_list,
+}
+
+
+# ─────────────────── Writer ────────────────────────────────────────────────────────
+
+
+class ParquetRecordWriter:
+    """
+    Writes dict records to a Parquet file in row groups as they arrive.
+
+    Args:
+        path (str): Output Parquet file.
+        schema (pa.Schema): REVIEW_SCHEMA, CAR_SCHEMA or another flat schema.
+        row_group_size (int): Records buffered per row group.
+        compression (str): Parquet compression codec.
+    """
+
+    def __init__(self, path: str, schema: pa.Schema, row_group_size: int = 10_000, compression: str = "zstd"):
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self._parsers = [(f.name, _PARSERS[f.type]) for f in schema]
+        self._columns = {name: [] for name, _ in self._parsers}
+        self._buffered = 0
+        self.written = 0
+        self._writer = pq.ParquetWriter(path, schema, compression=compression)
+
+    def write(self, record: dict) -> None:
+        for name, parse in self._parsers:
+            self._columns[name].append(parse(record.get(name)))
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[dict]) -> None:
+        for record in records:
+            if isinstance(record, dict):
+                self.write(record)
+
+    def flush(self) -> None:
+        """Writes the buffered records as one row group."""
+        if not self._buffered:
+            return
+        table = pa.Table.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_table(table)
+        self.written += self._buffered
+        self._columns = {name: [] for name in self._columns}
+        self._buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetRecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_parquet(records: Iterable[dict], path: str, schema: pa.Schema, row_group_size: int = 10_000) -> int:
+    """Writes records (any iterable, e.g. iter_jsonl(...)) to Parquet; returns the row count."""
+    with ParquetRecordWriter(path, schema, row_group_size=row_group_size) as writer:
+        writer.write_many(records)
+    return writer.written
+
+
+def jsonl_to_parquet(jsonl_path: str, parquet_path: str, schema: pa.Schema, row_group_size: int = 10_000) -> int:
+    """Streams a JSONL file into Parquet without loading it into memory."""
+    return write_parquet(iter_jsonl(jsonl_path), parquet_path, schema, row_group_size)
+
+
+if __name__ == "__main__":
+    # Usage: python columnar_export.py {reviews|cars} input.jsonl output.parquet
+    kind, src, dst = sys.argv[1:4]
+    n = jsonl_to_parquet(src, dst, SCHEMAS[kind])
+    print(f"Wrote {n:,} {kind} rows → {dst}")
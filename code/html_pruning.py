@@ -0,0 +1,147 @@
+import re
+from dataclasses import dataclass
+
+import lxml.html
+from lxml import etree
+
+"""
+DOM pruning stage that runs before SmartScraperGraph.
+
+Rendered pages are dominated by markup the LLM never needs: inline scripts,
+stylesheets, SVG icon paths, comments, analytics attributes and hidden nodes.
+`prune_html` removes all of that while keeping the text, the structural tags
+and the attributes our prompts and selectors rely on (class, id, itemprop, ...),
+and reports the size and estimated token count before and after pruning.
+"""
+
+# ─────────────────── Pruning Rules ──────────────────────────────────────────────────
+# Elements removed together with everything inside them.
+DROP_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "object", "embed",
+    "svg", "canvas", "video", "audio", "source", "track", "picture", "link",
+)
+
+# Attributes kept on every element; everything else is dropped.
+# class/id are needed by CSS selectors, itemprop/itemtype/content by microdata,
+# href/datetime/aria-label carry data the LLM can use.
+KEEP_ATTRS = frozenset({
+    "class", "id", "href", "title", "alt", "datetime", "aria-label",
+    "itemprop", "itemscope", "itemtype", "content", "data-id", "value",
+})
+
+# Inline styles that hide an element from the visitor.
+_HIDDEN_STYLE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+# Rough OpenAI tokenizer ratio for English prose and markup.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of LLM tokens in a string (≈ 4 characters per token).
+
+    Args:
+        text (str): The text or HTML that would be sent to the model.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PruneStats:
+    """Size of the HTML before and after pruning."""
+    bytes_before: int
+    bytes_after: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of bytes removed (0.0 – 1.0)."""
+        if not self.bytes_before:
+            return 0.0
+        return 1 - self.bytes_after / self.bytes_before
+
+    def summary(self) -> str:
+        return (f"Pruned HTML • {self.bytes_before:,} → {self.bytes_after:,} bytes "
+                f"• ~{self.tokens_before:,} → ~{self.tokens_after:,} tokens "
+                f"• {self.reduction:.1%} smaller")
+
+
+def _is_hidden(el) -> bool:
+    if el.get("hidden") is not None or el.get("aria-hidden") == "true":
+        return True
+    if el.tag == "input" and (el.get("type") or "").lower() == "hidden":
+        return True
+    return bool(_HIDDEN_STYLE.search(el.get("style") or ""))
+
+
+def prune_tree(root, keep_attrs=KEEP_ATTRS, drop_tags=DROP_TAGS) -> None:
+    """
+    Prunes an lxml tree in place.
+
+    Args:
+        root: The lxml element to prune (usually the document root).
+        keep_attrs: Attribute names to preserve; all others are removed.
+        drop_tags: Tag names removed together with their subtree.
+    """
+    doomed = []
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            # Comments and processing instructions.
+            doomed.append(el)
+            continue
+        tag = etree.QName(el).localname.lower()
+        if tag in drop_tags or (tag == "meta" and el.get("itemprop") is None) or _is_hidden(el):
+            doomed.append(el)
+            continue
+        for name in list(el.attrib):
+            if name not in keep_attrs:
+                del el.attrib[name]
+        # Collapse whitespace runs so indentation does not cost tokens.
+        if el.text:
+            el.text = _WHITESPACE.sub(" ", el.text)
+        if el.tail:
+            el.tail = _WHITESPACE.sub(" ", el.tail)
+
+    for el in doomed:
+        parent = el.getparent()
+        if parent is None:
+            continue
+        # Keep the tail text of removed nodes, it belongs to the parent.
+        if el.tail and el.tail.strip():
+            prev = el.getprevious()
+            if prev is not None:
+                prev.tail = (prev.tail or "") + el.tail
+            else:
+                parent.text = (parent.text or "") + el.tail
+        parent.remove(el)
+
+
+def prune_html(html: str, keep_attrs=KEEP_ATTRS, drop_tags=DROP_TAGS) -> tuple[str, PruneStats]:
+    """
+    Removes scripts, styles, SVGs, comments, tracking attributes and hidden nodes
+    from an HTML document.
+
+    Args:
+        html (str): The rendered HTML content.
+        keep_attrs: Attribute names to preserve (defaults to KEEP_ATTRS).
+        drop_tags: Tag names to remove with their subtree (defaults to DROP_TAGS).
+
+    Returns:
+        tuple[str, PruneStats]: The pruned HTML and the before/after statistics.
+    """
+    root = lxml.html.document_fromstring(html)
+    prune_tree(root, keep_attrs=keep_attrs, drop_tags=drop_tags)
+    pruned = lxml.html.tostring(root, encoding="unicode")
+
+    stats = PruneStats(
+        bytes_before=len(html.encode("utf-8")),
+        bytes_after=len(pruned.encode("utf-8")),
+        tokens_before=estimate_tokens(html),
+        tokens_after=estimate_tokens(pruned),
+    )
+    return pruned, stats
@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from readiness import count, wait_until_ready
+
+"""
+Incremental extraction while "Load more" pages are still loading.
+
+Instead of loading every review and then making one giant extraction call, the
+renderer takes the record nodes that appeared since the previous snapshot after
+each "Load more" click and hands them to a `PipelinedExtractor`, which extracts
+them on a worker thread while the browser keeps clicking. Rendering and LLM calls
+overlap, and only the in-flight batches are held in Python memory; with `release`
+the captured nodes are emptied in the page, so the browser's memory stays flat too.
+A batch whose extraction fails is recorded in `PipelinedExtractor.failed` and the
+render carries on.
+
+Records are diffed by marking every captured node with a `data-extracted`
+attribute inside the page, so each snapshot costs O(new records). The marker is set
+after the node's HTML is read, so the returned fragments do not carry it.
+"""
+
+LOAD_MORE_SELECTOR = 'button:has-text("Load more")'
+
+# Returns the outerHTML of record nodes not captured yet and marks them as captured.
+# With `release`, the captured node is emptied so the browser's memory stays flat too.
+_TAKE_NEW_JS = """
+({selector, release}) => {
+  const out = [];
+  for (const el of document.querySelectorAll(selector + ':not([data-extracted])')) {
+    out.push(el.outerHTML);
+    el.setAttribute('data-extracted', '1');
+    if (release) el.innerHTML = '';
+  }
+  return out;
+}
+"""
+
+
+def take_new_records(page, selector: str, release: bool = False) -> list[str]:
+    """Returns the HTML of records that appeared since the previous call (sync API)."""
+    return page.evaluate(_TAKE_NEW_JS, {"selector": selector, "release": release})
+
+
+class PipelinedExtractor:
+    """
+    Extracts record batches on worker threads as they are submitted.
+
+    Args:
+        extract_batch (Callable[[str], tuple[list, list]]): Extracts one HTML source
+            and returns (records, exec_info).
+        max_workers (int): Batches extracted at the same time.
+        on_records (Callable[[list], None] | None): Called with each batch's records
+            as soon as it finishes (e.g. a streaming writer). When set, records are
+            not kept in memory.
+
+    A batch whose extraction raises is not retried; it is listed in `failed` as
+    (batch number, number of fragments, error) and yields no records.
+    """
+
+    def __init__(self, extract_batch: Callable[[str], tuple], max_workers: int = 4, on_records=None):
+        self.extract_batch = extract_batch
+        self.on_records = on_records
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+        self.records = []
+        self.exec_info = []
+        self.n_records = 0
+        self.n_batches = 0
+        self.failed = []
+
+    def submit(self, fragments: list[str]) -> None:
+        """Queues one batch of record fragments for extraction."""
+        source = "<div>\n" + "\n".join(fragments) + "\n</div>"
+        self.n_batches += 1
+        self._futures.append((self.n_batches, len(fragments), self._pool.submit(self.extract_batch, source)))
+        self._collect(block=False)
+
+    def _collect(self, block: bool) -> None:
+        # Consume finished batches from the front of the queue so records keep
+        # submission order even when a later batch finishes first.
+        while self._futures and (block or self._futures[0][2].done()):
+            batch, n_fragments, future = self._futures.pop(0)
+            try:
+                batch_records, batch_info = future.result()
+            except Exception as exc:
+                self.failed.append((batch, n_fragments, f"{type(exc).__name__}: {exc}"))
+                print(f"Batch {batch} ({n_fragments} records) failed: {type(exc).__name__}: {exc}")
+                continue
+            self.exec_info.extend(batch_info or [])
+            self.n_records += len(batch_records)
+            if self.on_records is not None:
+                self.on_records(batch_records)
+            else:
+                self.records.extend(batch_records)
+
+    def drain(self) -> tuple[list, list]:
+        """Waits for every batch; returns (records in submission order, combined exec_info)."""
+        self._collect(block=True)
+        self._pool.shutdown()
+        return self.records, self.exec_info
+
+
+def render_incrementally(page, record_selector: str, on_batch: Callable[[list[str]], None],
+                         load_more_selector: str = LOAD_MORE_SELECTOR, release: bool = False,
+                         timeout_ms: int = 15_000, seen=None) -> int:
+    """
+    Clicks "Load more" until it disappears, handing each new batch of records to
+    `on_batch` as soon as it has rendered (sync API).
+
+    Args:
+        page: A Playwright sync-API page, already navigated to the first page.
+        record_selector (str): CSS selector matching one record.
+        on_batch (Callable[[list[str]], None]): Receives each batch of new record
+            fragments, typically PipelinedExtractor.submit.
+        load_more_selector (str): Selector of the "Load more" button.
+        release (bool): Empty captured nodes in the page to keep browser memory flat.
+        timeout_ms (int): Upper bound for each click's readiness wait.
+        seen (SeenRecords | None): Records extracted by earlier runs. They are not
+            handed to `on_batch`, and pagination stops once the crawl reaches them.
+
+    Returns:
+        int: Number of records handed to `on_batch`.
+    """
+    submitted = 0
+    while True:
+        fragments = take_new_records(page, record_selector, release=release)
+        if seen is not None:
+            fragments = seen.filter(fragments)
+        if fragments:
+            on_batch(fragments)
+            submitted += len(fragments)
+            print(f"Submitted {len(fragments)} new records for extraction ({submitted} total)")
+
+        if seen is not None and seen.done:
+            print(f"Reached {seen.streak} records extracted by an earlier run. Stopping.")
+            break
+        load_more = page.query_selector(load_more_selector)
+        if not load_more:
+            break
+        n_before = count(page, record_selector)
+        started = time.perf_counter()
+        load_more.click()
+        ready = wait_until_ready(page, selector=record_selector, min_count=n_before + 1,
+                                 quiet_ms=300, timeout_ms=timeout_ms)
+        if not ready.ready and count(page, record_selector) == n_before:
+            print(f"No new records after clicking 'Load more' ({ready.summary()}). Stopping.")
+            break
+        print(f"Loaded more records in {time.perf_counter() - started:.1f}s")
+        page.keyboard.press("End")
+    return submitted
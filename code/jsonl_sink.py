@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+"""
+Streaming JSONL output for extracted records.
+
+`JsonlWriter` appends one JSON record per line as records are produced, flushes
+every write and fsyncs at checkpoints (every N records or T seconds), so a crash
+loses at most the records since the last checkpoint instead of the whole run.
+Re-opening an existing file resumes it: a partially written last line is cut off
+and, when a `key` function is given, records already in the file are skipped.
+
+`iter_jsonl` reads records back lazily, one line at a time, and `jsonl_to_json`
+streams a JSONL file into the indented JSON array our scripts have always written,
+without materialising the records in memory.
+"""
+
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    """
+    Yields the records of a JSONL file one at a time.
+
+    Blank lines and a truncated last line (from a crash mid-write) are skipped.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _repair_tail(path: str) -> None:
+    """Truncates the file after its last complete line."""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the previous newline (chunked, so huge files are cheap).
+        pos = size
+        while pos > 0:
+            step = min(65_536, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx != -1:
+                f.truncate(pos + idx + 1)
+                return
+        f.truncate(0)
+
+
+class JsonlWriter:
+    """
+    Append-only, resumable JSONL writer.
+
+    Args:
+        path (str): Output file; created if missing.
+        key (Callable[[dict], str] | None): Record identity. Records whose key was
+            already written (in this run or a previous one) are skipped.
+        resume (bool): Keep and continue an existing file instead of truncating it.
+        fsync_every (int): Checkpoint after this many records.
+        fsync_seconds (float): Checkpoint when this much time passed since the last one.
+    """
+
+    def __init__(self, path: str, key: Callable[[dict], str] | None = None, resume: bool = True,
+                 fsync_every: int = 100, fsync_seconds: float = 5.0):
+        self.path = path
+        self.key = key
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.existing = 0   # records found in the file when it was opened
+        self.written = 0    # records written by this writer
+        self.skipped = 0    # duplicates skipped by this writer
+        self._keys = set()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if resume and os.path.exists(path):
+            _repair_tail(path)
+            for record in iter_jsonl(path):
+                self.existing += 1
+                if key is not None:
+                    self._keys.add(key(record))
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a record with this key was already written (in this run or a previous one)."""
+        return key in self._keys
+
+    def write(self, record: dict) -> bool:
+        """Appends one record. Returns False if it was skipped as a duplicate."""
+        with self._lock:
+            if self.key is not None:
+                k = self.key(record)
+                if k in self._keys:
+                    self.skipped += 1
+                    return False
+                self._keys.add(k)
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+            self.written += 1
+            self._since_checkpoint += 1
+            if (self._since_checkpoint >= self.fsync_every
+                    or time.monotonic() - self._last_checkpoint >= self.fsync_seconds):
+                self._checkpoint()
+            return True
+
+    def write_many(self, records: Iterable[dict]) -> int:
+        """Appends several records; returns how many were written (not skipped)."""
+        return sum(self.write(r) for r in records if isinstance(r, dict))
+
+    def _checkpoint(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """Forces written records to disk."""
+        with self._lock:
+            self._checkpoint()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.checkpoint()
+            self._file.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def jsonl_to_json(jsonl_path: str, json_path: str, indent: int = 4) -> int:
+    """
+    Streams a JSONL file into a JSON array file, one record at a time.
+
+    Returns:
+        int: The number of records written.
+    """
+    n = 0
+    pad = " " * indent
+    tmp = json_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write("[")
+        for record in iter_jsonl(jsonl_path):
+            body = json.dumps(record, indent=indent, default=str).replace("\n", "\n" + pad)
+            out.write(("," if n else "") + "\n" + pad + body)
+            n += 1
+        out.write("\n]\n" if n else "]\n")
+    os.replace(tmp, json_path)
+    return n
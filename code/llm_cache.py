@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+"""
+Persistent content-hash cache for SmartScraperGraph runs.
+
+Re-running a script on the same HTML with the same prompt, model and schema returns
+the stored answer instead of paying OpenAI again. Entries are keyed on the hash of
+the whitespace-normalised source, the prompt hash, the model and the output schema,
+and keep the execution info (tokens and cost) of the original run for the saved-cost
+statistics; a hit itself reports zero tokens and cost. Empty or failed answers are
+not cached. The SQLite file is bounded in size; the least recently used entries are
+evicted first.
+
+`CachedSmartScraperGraph` is a drop-in replacement for SmartScraperGraph in our
+scripts: it exposes the same run(), execution_info and get_execution_info().
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+LLM_CACHE_PATH = os.path.join(OUTPUT_DIR, "llm_cache.sqlite")
+
+# Default upper bound for the cache file contents (bytes of stored JSON).
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_hash(source: str) -> str:
+    """Hash of the source with whitespace runs collapsed, so re-indented HTML still hits."""
+    return _sha256(" ".join(source.split()))
+
+
+def schema_fingerprint(schema) -> str:
+    """Stable text form of an output schema (pydantic model, dict or None)."""
+    if schema is None:
+        return ""
+    if hasattr(schema, "model_json_schema"):
+        schema = schema.model_json_schema()
+    return json.dumps(schema, sort_keys=True, default=str)
+
+
+def cache_key(prompt: str, source: str, model: str, schema=None) -> str:
+    """Cache key for one extraction: (source hash, prompt hash, model, schema)."""
+    parts = [source_hash(source), _sha256(prompt), model, _sha256(schema_fingerprint(schema))]
+    return _sha256("\n".join(parts))
+
+
+class LLMCache:
+    """
+    SQLite-backed, size-bounded LRU store of extraction results.
+
+    Args:
+        path (str): Location of the SQLite file.
+        max_bytes (int): Evict least recently used entries above this total size.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, model TEXT, result TEXT, exec_info TEXT,"
+                " cost REAL, size INTEGER, created REAL, last_used REAL, hits INTEGER DEFAULT 0)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the cache usable from threads.
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key: str) -> tuple | None:
+        """Returns (result, exec_info) for a key and marks it as recently used, or None."""
+        with self._connect() as db:
+            row = db.execute("SELECT result, exec_info FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, key: str, model: str, result, exec_info, cost: float = 0.0) -> None:
+        """Stores a result and its execution info, then enforces the size bound."""
+        result_json = json.dumps(result, default=str)
+        info_json = json.dumps(exec_info, default=str)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, model, result, exec_info, cost, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, result_json, info_json, cost, len(result_json) + len(info_json), now, now),
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """Deletes least recently used entries until the cache fits max_bytes. Returns the count."""
+        removed = 0
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes, hits served and the LLM cost those hits avoided."""
+        with self._connect() as db:
+            entries, size, hits, saved = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0),"
+                " COALESCE(SUM(hits * cost), 0) FROM entries"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": hits, "saved_cost": saved}
+
+
+def total_cost(exec_info) -> float:
+    """Sums every '*cost*' value in ScrapeGraphAI execution info ('$0.0012' strings included)."""
+    cost = 0.0
+    for node in exec_info or []:
+        for k, v in node.items():
+            if "cost" in k.lower():
+                try:
+                    cost += float(str(v).replace("$", "").strip())
+                except ValueError:
+                    pass
+    return cost
+
+
+def hit_exec_info(exec_info) -> list:
+    """
+    Execution info to report for a cache hit: the stored nodes with every token and
+    cost value zeroed and `cache_hit` set, so cost totals only count money spent now.
+    """
+    nodes = []
+    for node in exec_info or []:
+        node = dict(node)
+        for k in node:
+            if "cost" in k.lower() or "tokens" in k.lower() or k == "successful_requests":
+                node[k] = 0
+        node["cache_hit"] = True
+        nodes.append(node)
+    return nodes
+
+
+def has_records(result) -> bool:
+    """Whether an answer is worth caching: no error and at least one non-empty value."""
+    if isinstance(result, dict):
+        if result.get("error"):
+            return False
+        return any(v not in (None, "", [], {}, "NA", "N/A") for v in result.values())
+    return bool(result)
+
+
+class CachedSmartScraperGraph:
+    """
+    SmartScraperGraph with a persistent response cache in front of it.
+
+    Args:
+        prompt (str): The extraction prompt.
+        source (str): The HTML source (or URL) to extract from.
+        config (dict): ScrapeGraphAI graph configuration.
+        schema: Optional output schema passed through to SmartScraperGraph.
+        cache (LLMCache | None): Cache to use (defaults to LLM_CACHE_PATH).
+    """
+
+    def __init__(self, prompt: str, source: str, config: dict, schema=None, cache: LLMCache | None = None):
+        self.prompt = prompt
+        self.source = source
+        self.config = config
+        self.schema = schema
+        self.cache = cache or LLMCache()
+        self.model = config.get("llm", {}).get("model", "")
+        self.key = cache_key(prompt, source, self.model, schema)
+        self.execution_info = []
+        self.cache_hit = False
+
+    def run(self):
+        cached = self.cache.get(self.key)
+        if cached is not None:
+            result, stored_info = cached
+            self.execution_info = hit_exec_info(stored_info)
+            self.cache_hit = True
+            print(f"LLM cache hit • {self.key[:12]} • saved ${total_cost(stored_info):.4f}")
+            return result
+
+        from scrapegraphai.graphs import SmartScraperGraph
+
+        graph = SmartScraperGraph(prompt=self.prompt, source=self.source, config=self.config, schema=self.schema)
+        result = graph.run()
+        self.execution_info = graph.get_execution_info()
+        # Empty or failed answers are not cached, so the next run asks again.
+        if has_records(result):
+            self.cache.put(self.key, self.model, result, self.execution_info, cost=total_cost(self.execution_info))
+        return result
+
+    def get_execution_info(self):
+        return self.execution_info
@@ -0,0 +1,452 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from html_pruning import estimate_tokens
+from llm_cache import LLMCache, cache_key, has_records, hit_exec_info, total_cost
+
+"""
+Rate-limit-aware asyncio scheduler for OpenAI-compatible chat completions.
+
+Every extraction used to be one blocking `scraper.run()`, so throughput was bounded
+by serial round trips. `LLMScheduler` keeps many chat-completion requests in flight
+at once and bounds them by the account's limits instead:
+
+- two token buckets, requests per minute and tokens per minute; a request reserves
+  its estimated tokens (prompt + max_tokens) and the difference to the measured
+  usage is settled when the response arrives;
+- a priority queue, so e.g. retries of truncated batches or the first page of a
+  crawl go before bulk work (lower number = sooner);
+- on 429/5xx the scheduler honours `Retry-After` (seconds or HTTP date) and the
+  `x-ratelimit-reset-*` headers, pausing all workers until then; without a hint it
+  backs off exponentially with full jitter.
+
+The endpoint is taken from OPENAI_BASE_URL (default https://api.openai.com/v1), so
+the scheduler can be pointed at a local mock server. `ScheduledExtractor` wraps it
+in a blocking `(records, exec_info)` callable for our thread-pool based executors
+(PipelinedExtractor, AdaptiveBatcher, extract_chunks).
+"""
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# gpt-4o-mini tier-1 style limits; override per account.
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 200_000
+
+# USD per 1M (input, output) tokens.
+MODEL_PRICES = {"gpt-4o-mini": (0.15, 0.60), "gpt-4o": (2.50, 10.00)}
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `per_minute / 60` units per second.
+
+    Args:
+        per_minute (float): Refill rate, and the bucket capacity.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> None:
+        """Waits until `amount` units are available and takes them."""
+        amount = min(amount, self.capacity)  # a request larger than the bucket waits for a full one
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) / self.rate)
+
+    def settle(self, delta: float) -> None:
+        """Corrects an earlier reservation: positive `delta` takes more, negative returns units."""
+        self._refill()
+        self.level = min(self.capacity, self.level - delta)
+
+
+def _duration_seconds(text: str) -> float | None:
+    """Parses OpenAI reset durations such as "1s", "20ms" or "6m0s"."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", text or "")
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(value) * scale[unit] for value, unit in parts)
+
+
+def retry_after(headers) -> float | None:
+    """Seconds to wait according to `Retry-After` / `x-ratelimit-reset-*` headers, or None."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [_duration_seconds(headers.get(h, "")) for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    payload: dict = field(compare=False)
+    reserve: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+@dataclass
+class SchedulerStats:
+    """Counters of an LLMScheduler."""
+    requests: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    failed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (f"{self.requests} requests ({self.retries} retries, {self.rate_limited} rate-limited, "
+                f"{self.failed} failed) • {self.prompt_tokens:,} in / {self.completion_tokens:,} out tokens "
+                f"• {self.requests / elapsed * 60 if elapsed else 0:.0f} req/min")
+
+
+class LLMScheduler:
+    """
+    Drives many chat-completion requests concurrently within RPM/TPM limits.
+
+    Args:
+        model (str): Model name sent with every request.
+        rpm (int): Requests-per-minute limit.
+        tpm (int): Tokens-per-minute limit.
+        concurrency (int): Maximum requests in flight.
+        base_url (str | None): OpenAI-compatible API root; defaults to OPENAI_BASE_URL.
+        api_key (str | None): Bearer token; defaults to OPENAI_API_KEY.
+        max_retries (int): Attempts after the first one for retryable failures.
+        timeout (float): Per-request timeout in seconds.
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, rpm: int = REQUESTS_PER_MINUTE, tpm: int = TOKENS_PER_MINUTE,
+                 concurrency: int = 16, base_url: str | None = None, api_key: str | None = None,
+                 max_retries: int = MAX_RETRIES, timeout: float = 120.0):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = SchedulerStats()
+        self._heap = []
+        self._seq = itertools.count()
+        self._session = None
+        self._workers = []
+
+    async def start(self) -> "LLMScheduler":
+        self._requests = TokenBucket(self.rpm)
+        self._tokens = TokenBucket(self.tpm)
+        self._ready = asyncio.Condition()
+        self._paused_until = 0.0
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+        )
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self) -> "LLMScheduler":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def complete(self, messages: list[dict], priority: int = PRIORITY_NORMAL, max_tokens: int = 4_096,
+                       **params) -> dict:
+        """
+        Queues one chat completion and waits for its response body.
+
+        Args:
+            messages (list[dict]): Chat messages.
+            priority (int): Lower numbers are sent first.
+            max_tokens (int): Completion limit; also reserved from the TPM bucket.
+            **params: Extra request fields (temperature, response_format, ...).
+
+        Returns:
+            dict: The parsed response JSON (choices, usage, ...).
+        """
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens, **params}
+        reserve = sum(estimate_tokens(m.get("content") or "") for m in messages) + max_tokens
+        future = asyncio.get_running_loop().create_future()
+        async with self._ready:
+            heapq.heappush(self._heap, _Job(priority, next(self._seq), payload, reserve, future))
+            self._ready.notify()
+        return await future
+
+    async def extract_json(self, prompt: str, source: str, priority: int = PRIORITY_NORMAL,
+                           max_tokens: int = 4_096) -> tuple:
+        """
+        Runs an extraction prompt over an HTML source and parses the JSON answer.
+
+        Returns:
+            tuple: (parsed JSON, exec_info) with exec_info in ScrapeGraphAI's shape,
+            so total_cost() and the cost reports keep working.
+        """
+        started = time.perf_counter()
+        body = await self.complete(
+            [{"role": "system", "content": prompt}, {"role": "user", "content": source}],
+            priority=priority, max_tokens=max_tokens, temperature=0,
+            response_format={"type": "json_object"},
+        )
+        content = body["choices"][0]["message"]["content"] or ""
+        try:
+            result = json.loads(content)
+        except ValueError:
+            result = {"content": [], "error": "unparseable answer", "raw": content}
+        usage = body.get("usage") or {}
+        price_in, price_out = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        exec_info = [{
+            "node_name": "TOTAL RESULT",
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+            "successful_requests": 1,
+            "total_cost_USD": (usage.get("prompt_tokens", 0) * price_in
+                               + usage.get("completion_tokens", 0) * price_out) / 1_000_000,
+            "exec_time": time.perf_counter() - started,
+        }]
+        return result, exec_info
+
+    # ── Workers ───────────────────────────────────────────────────────────────────
+
+    async def _next_job(self) -> _Job:
+        async with self._ready:
+            await self._ready.wait_for(lambda: self._heap)
+            return heapq.heappop(self._heap)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._next_job()
+            if job.future.cancelled():
+                continue
+            try:
+                job.future.set_result(await self._send(job))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(exc)
+
+    async def _send(self, job: _Job) -> dict:
+        url = f"{self.base_url}/chat/completions"
+        for attempt in range(self.max_retries + 1):
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self._requests.acquire(1)
+            await self._tokens.acquire(job.reserve)
+            self.stats.requests += 1
+            try:
+                async with self._session.post(url, json=job.payload) as response:
+                    if response.status == 200:
+                        body = await response.json(content_type=None)
+                        usage = body.get("usage") or {}
+                        self.stats.prompt_tokens += usage.get("prompt_tokens", 0)
+                        self.stats.completion_tokens += usage.get("completion_tokens", 0)
+                        if usage.get("total_tokens"):
+                            self._tokens.settle(usage["total_tokens"] - job.reserve)
+                        return body
+                    text = await response.text()
+                    if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        self._tokens.settle(-job.reserve)
+                        raise RuntimeError(f"HTTP {response.status} from {url}: {text[:200]}")
+                    hint = retry_after(response.headers)
+                    if response.status == 429:
+                        self.stats.rate_limited += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"Request to {url} failed: {exc!r}") from exc
+                hint = None
+            # The reservation was not used; give the tokens back before waiting.
+            self._tokens.settle(-job.reserve)
+            delay = hint + random.uniform(0, 0.25 * (hint or 1)) if hint is not None else backoff_delay(attempt)
+            # A rate-limit hint applies to the whole account, so every worker pauses.
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+
+def records_of(result, records_key: str = "content") -> list:
+    """
+    Returns the records list from a parsed JSON answer.
+
+    With response_format json_object the model must answer with an object, and it
+    does not always name the list "content" ({"reviews": [...]}). `records_key` is
+    used when present, otherwise the first list value in the object.
+
+    Args:
+        result: Parsed JSON answer (list or dict).
+        records_key (str): Key that normally holds the records.
+
+    Returns:
+        list: The records; empty if the answer has none.
+    """
+    if isinstance(result, list):
+        return result
+    if not isinstance(result, dict):
+        return []
+    if isinstance(result.get(records_key), list):
+        return result[records_key]
+    return next((value for value in result.values() if isinstance(value, list)), [])
+
+
+async def extract_many(prompt: str, sources: list[str], priorities: list[int] | None = None,
+                       **scheduler_options) -> list[tuple]:
+    """
+    Extracts many HTML sources concurrently through one scheduler.
+
+    Returns:
+        list[tuple]: (parsed JSON, exec_info) per source, in source order; a source
+        whose request failed gets (None, []).
+    """
+    priorities = priorities or [PRIORITY_NORMAL] * len(sources)
+    async with LLMScheduler(**scheduler_options) as scheduler:
+        results = await asyncio.gather(
+            *(scheduler.extract_json(prompt, src, priority=p) for src, p in zip(sources, priorities)),
+            return_exceptions=True,
+        )
+        print(f"LLM scheduler • {scheduler.stats.summary()}")
+    return [(None, []) if isinstance(r, Exception) else r for r in results]
+
+
+class ScheduledExtractor:
+    """
+    Blocking `(records, exec_info)` callable backed by an LLMScheduler on a background loop.
+
+    Thread-pool executors can call it from many threads at once; all calls share one
+    scheduler and therefore one set of rate limits.
+
+    Args:
+        prompt (str): The extraction prompt.
+        priority (int): Queue priority of this extractor's requests.
+        cache (LLMCache | None): Persistent answer cache; answers for an identical
+            (prompt, source, model) are returned without a request and with zero-cost
+            exec_info marked cache_hit. Only answers with records are stored.
+        records_key (str): Key of the records list in the JSON answer; the first list
+            value is used if the answer names it differently.
+        **scheduler_options: Passed to LLMScheduler (model, rpm, tpm, concurrency, ...).
+    """
+
+    def __init__(self, prompt: str, priority: int = PRIORITY_NORMAL, cache: LLMCache | None = None,
+                 records_key: str = "content", **scheduler_options):
+        self.prompt = prompt
+        self.priority = priority
+        self.cache = cache
+        self.records_key = records_key
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.scheduler = LLMScheduler(**scheduler_options)
+        asyncio.run_coroutine_threadsafe(self.scheduler.start(), self._loop).result()
+
+    def __call__(self, source: str) -> tuple[list, list]:
+        key = cache_key(self.prompt, source, self.scheduler.model)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            result, stored_info = cached
+            # Nothing was spent on this call; the stored cost would be counted twice.
+            exec_info = hit_exec_info(stored_info)
+        else:
+            result, exec_info = asyncio.run_coroutine_threadsafe(
+                self.scheduler.extract_json(self.prompt, source, priority=self.priority), self._loop).result()
+        records = records_of(result, self.records_key)
+        if cached is None and self.cache is not None and records and has_records(result):
+            self.cache.put(key, self.scheduler.model, result, exec_info, cost=total_cost(exec_info))
+        if not records:
+            reason = result.get("error") if isinstance(result, dict) else None
+            print(f"⚠️ No records in LLM answer ({reason or 'no list of records'}) for a {len(source):,}-char source")
+        return records, exec_info
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.scheduler.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self) -> "ScheduledExtractor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    # Usage: python llm_scheduler.py [rendered.html] [record_selector]
+    # Point OPENAI_BASE_URL at a local mock server to try it without an API key.
+    from chunking import chunk_html
+
+    html_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs", "ca_autonation_rendered.html")
+    selector = sys.argv[2] if len(sys.argv) > 2 else "div.js-rvw"
+    with open(html_path, "r", encoding="utf-8") as f:
+        chunks = chunk_html(f.read(), record_selector=selector, max_tokens=2_000)
+    prompt = ('Extract every customer review as {"content": [{"reviewer_name", "review_date", '
+              '"star_rating", "review_text"}]}. Only JSON.')
+    outputs = asyncio.run(extract_many(prompt, chunks))
+    print(f"{sum(len(records_of(r)) for r, _ in outputs)} records from {len(chunks)} chunks")
@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+from aiohttp import web
+
+from html_pruning import estimate_tokens
+from llm_scheduler import DEFAULT_MODEL, MODEL_PRICES
+from review_enrichment import parse_reviews
+from selector_extraction import AUTONATION_TILE
+
+"""
+Local OpenAI-compatible chat-completions server for benchmarks and load tests.
+
+Every extraction goes to gpt-4o-mini, so pipeline overhead can't be measured apart
+from API latency and every benchmark costs money. `MockLLMServer` stands in for the
+API on localhost:
+
+- POST /v1/chat/completions answers in OpenAI's response shape, with `usage` token
+  counts (estimated like html_pruning.estimate_tokens) and the cost they would have had;
+- latency = a sample from a fixed / uniform / exponential / lognormal distribution
+  plus a per-output-token decode time, so larger answers take longer, as they do;
+- requests-per-minute and tokens-per-minute windows answer 429 with `retry-after-ms`
+  and `x-ratelimit-*` headers once exceeded, and an error rate injects 500/503s;
+- answers are derived from the prompt's HTML with the local selector extractors
+  (listings, reviews, likes/dislikes enrichment) or served from a canned JSON file;
+- GET /v1/mock/stats reports requests, 429s, errors, tokens and cost so far.
+
+llm_scheduler and the OpenAI client both read OPENAI_BASE_URL:
+
+    python mock_llm_server.py --port 8765 --latency lognormal --mean-ms 800 --rpm 500
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python llm_scheduler.py
+"""
+
+DEFAULT_PORT = 8765
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+@dataclass
+class LatencyModel:
+    """
+    Response latency: a sampled base delay plus decode time per output token.
+
+    Args:
+        distribution (str): "fixed", "uniform" (0–2× mean), "exponential" or "lognormal".
+        mean_ms (float): Mean of the base delay.
+        sigma (float): Shape of the lognormal distribution (its tail weight).
+        ms_per_output_token (float): Decode time per completion token.
+    """
+    distribution: str = "lognormal"
+    mean_ms: float = 600.0
+    sigma: float = 0.5
+    ms_per_output_token: float = 8.0
+
+    def __post_init__(self):
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {self.distribution!r}; expected one of {DISTRIBUTIONS}.")
+
+    def sample(self, output_tokens: int) -> float:
+        """Seconds to wait before answering a request with `output_tokens` completion tokens."""
+        if self.distribution == "fixed":
+            base = self.mean_ms
+        elif self.distribution == "uniform":
+            base = random.uniform(0, 2 * self.mean_ms)
+        elif self.distribution == "exponential":
+            base = random.expovariate(1 / self.mean_ms) if self.mean_ms > 0 else 0.0
+        else:
+            # mu chosen so the lognormal's mean is mean_ms.
+            base = random.lognormvariate(math.log(max(self.mean_ms, 1e-3)) - self.sigma ** 2 / 2, self.sigma)
+        return (base + output_tokens * self.ms_per_output_token) / 1000
+
+
+class RateWindow:
+    """Requests and tokens admitted during the last minute."""
+
+    def __init__(self, rpm: int | None, tpm: int | None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()  # (time, tokens)
+        self._tokens = 0
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= 60:
+            self._tokens -= self._events.popleft()[1]
+
+    def admit(self, tokens: int) -> tuple[bool, float]:
+        """Admits a request, or returns (False, seconds until it would fit)."""
+        now = time.monotonic()
+        self._expire(now)
+        over_requests = self.rpm is not None and len(self._events) >= self.rpm
+        over_tokens = self.tpm is not None and self._events and self._tokens + tokens > self.tpm
+        if over_requests or over_tokens:
+            return False, max(0.0, 60 - (now - self._events[0][0]))
+        self._events.append((now, tokens))
+        self._tokens += tokens
+        return True, 0.0
+
+    def remaining(self) -> tuple:
+        return ((self.rpm - len(self._events)) if self.rpm else None,
+                (self.tpm - self._tokens) if self.tpm else None)
+
+
+@dataclass
+class ServerStats:
+    """What the mock server answered so far."""
+    requests: int = 0
+    completed: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    latencies: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def p(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {"requests": self.requests, "completed": self.completed, "rate_limited": self.rate_limited,
+                "errors": self.errors, "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens, "cost_USD": round(self.cost, 6),
+                "latency_p50_s": round(p(0.5), 3), "latency_p95_s": round(p(0.95), 3)}
+
+    def summary(self) -> str:
+        s = self.as_dict()
+        return (f"{s['completed']}/{s['requests']} requests answered ({s['rate_limited']} × 429, {s['errors']} errors) "
+                f"• {s['prompt_tokens']:,} in / {s['completion_tokens']:,} out tokens • ${s['cost_USD']:.4f} simulated "
+                f"• latency p50 {s['latency_p50_s']}s, p95 {s['latency_p95_s']}s")
+
+
+# ─────────────────── Responders ────────────────────────────────────────────────────
+# A responder maps the request's messages to the answer object (serialized as JSON).
+
+def _enrichment_answer(items: list) -> dict:
+    """Likes/dislikes for an ENRICH_PROMPT input: the first words of the review, by rating."""
+    content = []
+    for item in items:
+        phrase = " ".join(str(item.get("review_text") or "").split()[:4])
+        positive = (item.get("star_rating") or 0) >= 3
+        content.append({"id": item.get("id"), "likes": [phrase] if positive and phrase else [],
+                        "dislikes": [] if positive or not phrase else [phrase]})
+    return {"content": content}
+
+
+def derived_responder(messages: list[dict]) -> dict:
+    """
+    Answers from the request itself: an enrichment JSON array gets likes/dislikes,
+    review containers or listing tiles in the HTML are read with the local selectors.
+    """
+    text = "\n".join(str(m.get("content") or "") for m in messages)
+    for message in reversed(messages):
+        try:
+            items = json.loads(message.get("content") or "")
+        except (TypeError, ValueError):
+            continue
+        if isinstance(items, list) and all(isinstance(i, dict) and "review_text" in i for i in items):
+            return _enrichment_answer(items)
+    reviews = parse_reviews(text)
+    if reviews:
+        return {"content": [{**r, "likes": [], "dislikes": []} for r in reviews]}
+    return {"content": AUTONATION_TILE.extract(text)}
+
+
+def canned_responder(path: str) -> Callable[[list], dict]:
+    """Answers every request with the JSON in `path` (e.g. outputs/ca_autonation_reviews.json)."""
+    with open(path, "r", encoding="utf-8") as f:
+        answer = json.load(f)
+    return lambda messages: answer
+
+
+# ─────────────────── Server ────────────────────────────────────────────────────────
+
+class MockLLMServer:
+    """
+    OpenAI-compatible chat-completions stand-in.
+
+    Args:
+        responder (Callable[[list], dict]): Builds the answer object from the messages.
+        latency (LatencyModel): Response latency model.
+        rpm (int | None): Requests per minute before answering 429 (None: unlimited).
+        tpm (int | None): Tokens per minute before answering 429 (None: unlimited).
+        error_rate (float): Fraction of requests answered with a 500 or 503.
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free one).
+    """
+
+    def __init__(self, responder: Callable[[list], dict] = derived_responder, latency: LatencyModel | None = None,
+                 rpm: int | None = None, tpm: int | None = None, error_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.responder = responder
+        self.latency = latency or LatencyModel()
+        self.window = RateWindow(rpm, tpm)
+        self.error_rate = error_rate
+        self.host = host
+        self.port = port
+        self.stats = ServerStats()
+        self._ids = itertools.count(1)
+        self._runner = None
+        self._thread = None
+        self._loop = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_get("/v1/models", self._models)
+        app.router.add_get("/v1/mock/stats", self._stats)
+        return app
+
+    async def _models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": m, "object": "model"} for m in MODEL_PRICES]})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats.as_dict())
+
+    @staticmethod
+    def _error(status: int, message: str, kind: str, headers: dict | None = None) -> web.Response:
+        return web.json_response({"error": {"message": message, "type": kind, "code": None}},
+                                 status=status, headers=headers)
+
+    async def _chat_completions(self, request: web.Request) -> web.Response:
+        self.stats.requests += 1
+        try:
+            payload = await request.json()
+            messages = payload["messages"]
+        except (ValueError, KeyError):
+            return self._error(400, "Request body must be JSON with 'messages'.", "invalid_request_error")
+        if payload.get("stream"):
+            return self._error(400, "Streaming is not supported by the mock server.", "invalid_request_error")
+
+        model = str(payload.get("model") or DEFAULT_MODEL).split("/")[-1]
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+        admitted, wait = self.window.admit(prompt_tokens + int(payload.get("max_tokens") or 0))
+        if not admitted:
+            self.stats.rate_limited += 1
+            return self._error(429, "Rate limit reached (mock).", "requests", headers={
+                "retry-after-ms": str(int(wait * 1000)), "x-ratelimit-reset-requests": f"{wait:.3f}s"})
+        if self.error_rate and random.random() < self.error_rate:
+            self.stats.errors += 1
+            await asyncio.sleep(self.latency.sample(0))
+            return self._error(random.choice((500, 503)), "Injected server error (mock).", "server_error")
+
+        content = json.dumps(self.responder(messages), ensure_ascii=False)
+        completion_tokens = estimate_tokens(content)
+        finish_reason = "stop"
+        max_tokens = payload.get("max_tokens") or payload.get("max_completion_tokens")
+        if max_tokens and completion_tokens > max_tokens:
+            # Cut off like the real API: the answer stops mid-JSON at the limit.
+            content = content[:int(len(content) * max_tokens / completion_tokens)]
+            completion_tokens, finish_reason = max_tokens, "length"
+
+        seconds = self.latency.sample(completion_tokens)
+        await asyncio.sleep(seconds)
+        price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+        self.stats.completed += 1
+        self.stats.prompt_tokens += prompt_tokens
+        self.stats.completion_tokens += completion_tokens
+        self.stats.cost += (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+        self.stats.latencies.append(seconds)
+        remaining_requests, remaining_tokens = self.window.remaining()
+        headers = {k: str(v) for k, v in (("x-ratelimit-remaining-requests", remaining_requests),
+                                          ("x-ratelimit-remaining-tokens", remaining_tokens)) if v is not None}
+        return web.json_response({
+            "id": f"chatcmpl-mock-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }, headers=headers)
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────────
+
+    async def start(self) -> "MockLLMServer":
+        """Starts serving on the running event loop."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]  # the real port when port=0
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "MockLLMServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def start_in_thread(self) -> "MockLLMServer":
+        """Starts serving on a background event-loop thread, for synchronous callers."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+        return self
+
+    def stop_thread(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = self._thread = None
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start_in_thread()
+
+    def __exit__(self, *exc) -> None:
+        self.stop_thread()
+
+
+async def _serve(server: MockLLMServer) -> None:
+    await server.start()
+    print(f"Mock LLM server on {server.base_url}\n  export OPENAI_BASE_URL={server.base_url}")
+    try:
+        while True:
+            await asyncio.sleep(30)
+            if server.stats.requests:
+                print(server.stats.summary())
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat-completions mock.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-ms", type=float, default=600.0)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--ms-per-token", type=float, default=8.0)
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--tpm", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--canned", default=None, help="JSON file returned for every request")
+    args = parser.parse_args()
+
+    mock = MockLLMServer(
+        responder=canned_responder(args.canned) if args.canned else derived_responder,
+        latency=LatencyModel(args.latency, args.mean_ms, args.sigma, args.ms_per_token),
+        rpm=args.rpm, tpm=args.tpm, error_rate=args.error_rate, host=args.host, port=args.port,
+    )
+    try:
+        asyncio.run(_serve(mock))
+    except KeyboardInterrupt:
+        print(mock.stats.summary())
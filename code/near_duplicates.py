@@ -0,0 +1,267 @@
+import hashlib
+import re
+import struct
+from collections import defaultdict
+from typing import Callable
+
+import lxml.html
+
+from columnar_export import parse_int
+
+"""
+Near-duplicate detection for review and listing records.
+
+The same review shows up more than once on ConsumerAffairs (a truncated teaser
+ending in "... More" next to the full text, or again on a later "Load more" page),
+and AutoNation listings reappear across make filters with cosmetic differences.
+`NearDuplicateIndex` finds such repeats without comparing every pair:
+
+- MinHash signatures over word shingles of the normalized text, bucketed by an LSH
+  band index, so a lookup touches only the few records sharing a band;
+- a prefix index on the first words of the text, which catches truncated "More"
+  teasers whose shingle overlap with the full text is too small for MinHash.
+
+Of two near-duplicates the longer text survives, so a teaser seen before its full
+review is replaced by it rather than the other way round.
+
+`RecordDeduper` applies the index to records (e.g. review_text, or normalized
+listing fields guarded by VIN) and to raw HTML fragments before they are sent to
+the LLM.
+"""
+
+# Estimated Jaccard similarity above which two texts are duplicates.
+SIMILARITY_THRESHOLD = 0.8
+# 16 bands × 4 rows: texts with Jaccard ≥ ~0.5 share a band with high probability;
+# candidates are then verified against SIMILARITY_THRESHOLD.
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_WORDS = 3
+# A text that starts with the same words as a longer one is its truncated teaser.
+PREFIX_WORDS = 12
+
+# Each salted 64-byte blake2b digest yields 16 independent 32-bit hash values per shingle.
+_SALTS = [i.to_bytes(16, "little") for i in range(NUM_PERM // 16)]
+_UNPACK = struct.Struct("<16I").unpack
+
+# Truncation artifacts at the end of review teasers: "...", "… More", "Read more", "Show less".
+_ARTIFACT = re.compile(r"(?:\s*(?:\.{3}|…))?\s*(?:(?:read|show|see)\s+)?(?:more|less)?\s*$", re.I)
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> list[str]:
+    """Lowercase words of a text, with trailing "... More" style artifacts removed."""
+    return _WORD.findall(_ARTIFACT.sub("", str(text or "")).lower())
+
+
+def _shingles(words: list[str]) -> set[bytes]:
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words).encode("utf-8")} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8") for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(shingles: set[bytes]) -> tuple[int, ...]:
+    """MinHash signature of a shingle set (NUM_PERM values)."""
+    if not shingles:
+        return ()
+    rows = [sum((_UNPACK(hashlib.blake2b(g, digest_size=64, salt=salt).digest()) for salt in _SALTS), ())
+            for g in shingles]
+    return tuple(map(min, zip(*rows)))
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of MinHash signatures with a truncated-prefix side index.
+
+    Args:
+        threshold (float): Estimated Jaccard similarity that counts as a duplicate.
+        bands (int): LSH bands; NUM_PERM must be divisible by it.
+        prefix_words (int): Leading words compared for truncated texts (0 disables it).
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, bands: int = BANDS,
+                 prefix_words: int = PREFIX_WORDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.prefix_words = prefix_words
+        self._buckets = defaultdict(list)   # (guard, band, band hash) → item ids
+        self._prefixes = {}                 # (guard, first words) → item id
+        self._signatures = {}               # item id → signature
+        self._lengths = {}                  # item id → word count
+        self.replaced_by = {}               # superseded item id → the longer item that replaced it
+
+    def _band_keys(self, signature: tuple, guard) -> list:
+        return [(guard, i, hash(signature[i * self.rows:(i + 1) * self.rows])) for i in range(self.bands)]
+
+    def _prefix_key(self, words: list[str], guard):
+        if self.prefix_words and len(words) >= self.prefix_words:
+            return guard, " ".join(words[:self.prefix_words])
+        return None
+
+    def survivor(self, item_id):
+        """The item that currently stands for `item_id` (itself, or the longer item that replaced it)."""
+        while item_id in self.replaced_by:
+            item_id = self.replaced_by[item_id]
+        return item_id
+
+    def _find(self, words: list[str], signature: tuple, guard):
+        prefix = self._prefix_key(words, guard)
+        if prefix is not None and prefix in self._prefixes:
+            return self.survivor(self._prefixes[prefix])
+        for key in self._band_keys(signature, guard) if signature else ():
+            for item_id in self._buckets.get(key, ()):
+                if similarity(signature, self._signatures[item_id]) >= self.threshold:
+                    return self.survivor(item_id)
+        return None
+
+    def _add(self, item_id, words: list[str], signature: tuple, guard) -> None:
+        self._signatures[item_id] = signature
+        self._lengths[item_id] = len(words)
+        if signature:
+            for key in self._band_keys(signature, guard):
+                self._buckets[key].append(item_id)
+        prefix = self._prefix_key(words, guard)
+        if prefix is not None:
+            self._prefixes.setdefault(prefix, item_id)
+
+    def find(self, text: str, guard=None):
+        """
+        Returns the id of an indexed near-duplicate of `text`, or None.
+
+        Args:
+            text (str): The text to look up.
+            guard: Only items added with an equal guard match (e.g. the mileage of a listing).
+        """
+        words = normalize_text(text)
+        return self._find(words, minhash(_shingles(words)), guard)
+
+    def add(self, item_id, text: str, guard=None) -> None:
+        """Indexes `text` under `item_id`."""
+        words = normalize_text(text)
+        self._add(item_id, words, minhash(_shingles(words)), guard)
+
+    def add_if_new(self, item_id, text: str, guard=None):
+        """
+        Indexes `text` unless it nearly duplicates a longer (or equally long) item.
+
+        A text longer than the item it duplicates (the full review after its teaser)
+        is indexed and replaces that item: `replaced_by` maps the old id to `item_id`.
+
+        Returns:
+            The id of the item `text` duplicates, or None if it was indexed.
+        """
+        words = normalize_text(text)
+        signature = minhash(_shingles(words))
+        duplicate_of = self._find(words, signature, guard)
+        if duplicate_of is not None and len(words) <= self._lengths[duplicate_of]:
+            return duplicate_of
+        self._add(item_id, words, signature, guard)
+        if duplicate_of is not None:
+            self.replaced_by[duplicate_of] = item_id
+        return None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+def fragment_text(fragment: str) -> str:
+    """Visible text of an HTML fragment."""
+    return lxml.html.fragment_fromstring(fragment, create_parent="div").text_content()
+
+
+class RecordDeduper:
+    """
+    Skips records and HTML fragments that nearly duplicate earlier ones.
+
+    Of two near-duplicates the record with the longer text is kept: within one
+    `filter` call the longer one takes the shorter one's place; a shorter record
+    already returned by an earlier call (or an earlier streamed fragment) cannot be
+    recalled, so the longer one is returned as well.
+
+    Args:
+        text_fields (tuple): Record fields compared with MinHash (joined with spaces).
+        guard_fields (tuple): Record fields that must match exactly, after `normalize`.
+        normalize (Callable): Normalizes guard values (e.g. "53,390 miles" → 53390).
+        threshold (float): Estimated Jaccard similarity that counts as a duplicate.
+    """
+
+    def __init__(self, text_fields: tuple = ("review_text",), guard_fields: tuple = (),
+                 normalize: Callable = lambda v: v, threshold: float = SIMILARITY_THRESHOLD):
+        self.text_fields = text_fields
+        self.guard_fields = guard_fields
+        self.normalize = normalize
+        self.records = NearDuplicateIndex(threshold)
+        self.fragments = NearDuplicateIndex(threshold)
+        self.skipped = 0
+
+    def _check(self, index: NearDuplicateIndex, text: str, guard) -> bool:
+        if index.add_if_new(len(index), text, guard) is not None:
+            self.skipped += 1
+            return True
+        return False
+
+    def _record_text_and_guard(self, record: dict) -> tuple:
+        text = " ".join(str(record.get(f) or "") for f in self.text_fields)
+        return text, tuple(self.normalize(record.get(f)) for f in self.guard_fields)
+
+    def is_duplicate(self, record: dict) -> bool:
+        """True if `record` nearly duplicates an earlier, not shorter record; otherwise indexes it."""
+        return self._check(self.records, *self._record_text_and_guard(record))
+
+    def filter(self, records: list) -> list:
+        """Returns the records that are not near-duplicates of earlier ones, longest version kept."""
+        kept = []
+        slot = {}   # item id → position in `kept`
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            item_id = len(self.records)
+            n_replaced = len(self.records.replaced_by)
+            if self._check(self.records, *self._record_text_and_guard(record)):
+                continue
+            replaced = None
+            if len(self.records.replaced_by) > n_replaced:
+                replaced = next(reversed(self.records.replaced_by))
+            if replaced in slot:
+                # The longer version takes the shorter one's place in the output.
+                slot[item_id] = slot.pop(replaced)
+                kept[slot[item_id]] = record
+                self.skipped += 1
+            else:
+                slot[item_id] = len(kept)
+                kept.append(record)
+        return kept
+
+    def filter_fragments(self, fragments: list[str]) -> list[str]:
+        """Returns the HTML fragments whose text is not a near-duplicate of an earlier fragment."""
+        return [f for f in fragments if not self._check(self.fragments, fragment_text(f), None)]
+
+
+def review_deduper() -> RecordDeduper:
+    """Deduper for reviews: near-identical review_text (teasers included) is a repeat."""
+    return RecordDeduper(text_fields=("review_text",))
+
+
+def _listing_guard(value):
+    # Mileages are compared as numbers ("53,390 miles" == "53390 mi"); VINs as text.
+    number = parse_int(value)
+    return number if number is not None else (str(value).strip().upper() if value else None)
+
+
+def listing_deduper() -> RecordDeduper:
+    """
+    Deduper for listings: near-identical names of the same vehicle are one car.
+
+    Listings are guarded by VIN (tile id "vehicle_<VIN>"), so two new cars of the same
+    trim at "5 miles" stay apart; mileage is part of the guard as well, for listings
+    extracted without a VIN.
+    """
+    return RecordDeduper(text_fields=("car_name", "car_status"), guard_fields=("vin", "car_mileage"),
+                         normalize=_listing_guard)
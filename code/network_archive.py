@@ -0,0 +1,205 @@
+import hashlib
+import os
+import re
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+from readiness import count, wait_until_ready
+from resource_blocking import DEFAULT_PROFILE, BlockingProfile
+
+"""
+HAR record/replay for the Playwright renderers.
+
+Renders can only be exercised against the live sites, so render times and readiness
+regressions are never measured on the same input twice. A `NetworkArchive` makes a
+render reproducible:
+
+- record: the browser context writes every response it receives (HTML, scripts,
+  XHR/fetch answers of "Load more", ...) to a HAR archive while the page renders;
+- replay: `route_from_har` serves those responses from local disk and aborts any
+  request that is not in the archive, so the page renders without network access.
+
+Requests aborted by the resource-blocking profile are never recorded, so the profile
+used while recording should match the one used in replay. Playwright runs the most
+recently registered route first, so in replay the archive answers (or, strict, aborts)
+every request before the blocking profile sees it: the profile's BlockStats stay at
+zero and the scripts do not report them in replay mode.
+
+The scripts pick the mode from the NETWORK_ARCHIVE environment variable
+("live" by default, "record" or "replay"); archives live in outputs/har/.
+
+    archive = NetworkArchive.for_url(url)
+    page = browser.new_page(**archive.context_options())
+    DEFAULT_PROFILE.apply(page)
+    archive.attach(page)          # after the blocking profile, so it handles requests first
+    ...
+    archive.finish(page)          # record: closes the context, which writes the HAR
+
+    python network_archive.py record <url> [wait_selector]
+    python network_archive.py replay <url> [wait_selector] [runs]
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+HAR_DIR = os.path.join(OUTPUT_DIR, "har")
+
+MODES = ("live", "record", "replay")
+MODE_ENV = "NETWORK_ARCHIVE"
+
+
+def archive_path(url: str, directory: str = HAR_DIR) -> str:
+    """Archive file of a URL: readable host/path slug plus a short hash of the full URL."""
+    parts = urlsplit(url)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", f"{parts.hostname or ''}{parts.path}").strip("_")[:80]
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:10]
+    # .zip keeps response bodies as separate compressed entries instead of base64 in the JSON.
+    return os.path.join(directory, f"{slug}_{digest}.har.zip")
+
+
+class NetworkArchive:
+    """
+    Records a render's network traffic to a HAR archive, or replays it from disk.
+
+    Args:
+        path (str): The HAR archive (.har or .har.zip).
+        mode (str): "live" (no-op), "record" or "replay".
+        strict (bool): In replay, abort requests missing from the archive instead of
+            letting them reach the network.
+    """
+
+    def __init__(self, path: str, mode: str = "live", strict: bool = True):
+        if mode not in MODES:
+            raise ValueError(f"Unknown network archive mode {mode!r}; expected one of {MODES}.")
+        if mode == "replay" and not os.path.exists(path):
+            raise FileNotFoundError(f"No network archive at {path}; record it first ({MODE_ENV}=record).")
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+
+    @classmethod
+    def for_url(cls, url: str, mode: str | None = None, directory: str = HAR_DIR) -> "NetworkArchive":
+        """The archive of `url`, in `mode` or the NETWORK_ARCHIVE environment mode."""
+        return cls(archive_path(url, directory), mode or os.getenv(MODE_ENV, "live"))
+
+    def context_options(self) -> dict:
+        """Options for browser.new_context() / browser.new_page() (recording is set up here)."""
+        if self.mode != "record":
+            return {}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        return {"record_har_path": self.path, "record_har_mode": "full", "record_har_content": "attach"}
+
+    def _not_found(self) -> str:
+        return "abort" if self.strict else "fallback"
+
+    def attach(self, page) -> None:
+        """
+        Serves a sync-API page from the archive in replay mode (before page.goto).
+
+        Call it after the blocking profile: the archive's route then takes precedence,
+        so the profile's handler (and its BlockStats) only sees requests that the
+        archive lets fall back, i.e. none in strict mode.
+        """
+        if self.mode == "replay":
+            page.route_from_har(self.path, not_found=self._not_found())
+
+    async def attach_async(self, page) -> None:
+        """Serves an async-API page from the archive in replay mode (before page.goto)."""
+        if self.mode == "replay":
+            await page.route_from_har(self.path, not_found=self._not_found())
+
+    def finish(self, page) -> None:
+        """Closes the page's context in record mode, which writes the archive to disk."""
+        if self.mode == "record":
+            page.context.close()
+            print(f"Network archive recorded → {self.path} ({os.path.getsize(self.path):,} bytes)")
+
+    async def finish_async(self, page) -> None:
+        if self.mode == "record":
+            await page.context.close()
+            print(f"Network archive recorded → {self.path} ({os.path.getsize(self.path):,} bytes)")
+
+
+def record(url: str, wait_selector: str | None = None, profile: BlockingProfile = DEFAULT_PROFILE,
+           headless: bool = True, path: str | None = None) -> str:
+    """
+    Renders a URL once and records its network traffic.
+
+    Returns:
+        str: The archive path.
+    """
+    from playwright.sync_api import sync_playwright
+
+    archive = NetworkArchive(path or archive_path(url), "record")
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        page = browser.new_page(**archive.context_options())
+        profile.apply(page)
+        page.goto(url, timeout=60_000)
+        wait_until_ready(page, selector=wait_selector, quiet_ms=1000, timeout_ms=30_000)
+        archive.finish(page)
+        browser.close()
+    return archive.path
+
+
+def benchmark_replay(url: str, wait_selector: str | None = None, runs: int = 5,
+                     profile: BlockingProfile = DEFAULT_PROFILE, extract=None, headless: bool = True,
+                     path: str | None = None) -> dict:
+    """
+    Renders a URL `runs` times from its archive (no network) and times each render.
+
+    Args:
+        url (str): The recorded URL.
+        wait_selector (str | None): Selector the readiness wait counts.
+        runs (int): Renders to time; each uses a fresh context, so none is served
+            from an earlier run's browser cache.
+        profile (BlockingProfile): Blocking profile, as used while recording.
+        extract: Optional callable (html) -> list of records, timed on every render.
+        headless (bool): Launch Chromium without a window.
+        path (str | None): Archive path (default: archive_path(url)).
+
+    Returns:
+        dict: Per-run measurements ("runs") and their medians ("median").
+    """
+    from playwright.sync_api import sync_playwright
+
+    archive = NetworkArchive(path or archive_path(url), "replay")
+    results = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        for _ in range(runs):
+            context = browser.new_context()
+            page = context.new_page()
+            profile.apply(page)
+            archive.attach(page)
+            start = time.perf_counter()
+            page.goto(url, timeout=60_000)
+            loaded = time.perf_counter()
+            ready = wait_until_ready(page, selector=wait_selector, quiet_ms=1000, timeout_ms=30_000)
+            html = page.content()
+            run = {"load_s": loaded - start, "ready_s": time.perf_counter() - loaded, "ready": ready.ready,
+                   "elements": count(page, wait_selector) if wait_selector else None, "html_bytes": len(html)}
+            context.close()
+            if extract is not None:
+                start = time.perf_counter()
+                run["records"] = len(extract(html))
+                run["extract_s"] = time.perf_counter() - start
+            results.append(run)
+        browser.close()
+
+    numeric = [k for k, v in results[0].items() if isinstance(v, float)]
+    median = {k: statistics.median(r[k] for r in results) for k in numeric}
+    stable = len({(r["elements"], r.get("records")) for r in results}) == 1
+    print(f"Replay benchmark • {runs} renders of {url} • load {median['load_s']:.2f}s, "
+          f"ready {median['ready_s']:.2f}s (median) • {'stable' if stable else 'UNSTABLE'} element/record counts")
+    return {"url": url, "archive": archive.path, "runs": results, "median": median, "stable": stable}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "replay"
+    target = sys.argv[2] if len(sys.argv) > 2 else "https://www.autonation.com/cars-for-sale?mk=chrysler"
+    selector = sys.argv[3] if len(sys.argv) > 3 else "ansrp-srp-tile-v3"
+    if command == "record":
+        record(target, selector)
+    else:
+        benchmark_replay(target, selector, runs=int(sys.argv[4]) if len(sys.argv) > 4 else 5)
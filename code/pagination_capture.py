@@ -0,0 +1,384 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+from lxml.etree import ParserError
+
+from readiness import NetworkTracker, wait_until_ready
+from resource_blocking import DEFAULT_PROFILE
+from segmentation import segment_records
+
+"""
+Direct pagination-API capture instead of clicking "Load more".
+
+`render_full_page` clicks "Load more", waits, and repeats, so loading N pages of
+reviews costs N round trips through a full browser. This module clicks the
+button only twice, records the XHR/fetch request each click triggers, and works
+out which query or body parameter is the page counter (page=2 → page=3, offset=10
+→ offset=20, ...). The remaining pages are then requested directly with a pooled
+aiohttp client, several at a time, using the browser's headers and cookies. The
+returned HTML fragments (or HTML embedded in JSON) go straight into
+segmentation/extraction; JSON pages without HTML contribute their record list as
+structured records instead.
+"""
+
+LOAD_MORE_SELECTOR = 'button:has-text("Load more")'
+
+# Parameter names that usually carry the page counter, used when only one request was captured.
+PAGE_PARAM_NAMES = ("page", "p", "pg", "pageNumber", "page_number", "offset", "start", "from", "skip")
+
+# Request headers that must not be replayed verbatim.
+_DROP_HEADERS = {"content-length", "host", "cookie", "connection", "accept-encoding"}
+
+
+@dataclass
+class CapturedEndpoint:
+    """
+    The pagination request behind a "Load more" button.
+
+    Attributes:
+        method (str): HTTP method ("GET" or "POST").
+        url (str): URL of the last captured request.
+        headers (dict): Request headers to replay (cookies excluded).
+        post_data (str | None): Request body of the last captured request.
+        param (str | None): Name of the page-counter parameter.
+        location (str): Where `param` lives: "query", "json" or "form".
+        last_value (int): Counter value of the last captured request.
+        step (int): Counter increment per page (1 for page numbers, page size for offsets).
+        cookies (dict): Cookies for the endpoint host, copied from the browser context.
+    """
+    method: str
+    url: str
+    headers: dict
+    post_data: str | None
+    param: str | None = None
+    location: str = "query"
+    last_value: int = 0
+    step: int = 1
+    cookies: dict = field(default_factory=dict)
+
+    def request_for(self, value: int) -> tuple[str, str, str | None]:
+        """Returns (method, url, body) for the page whose counter is `value`."""
+        url, body = self.url, self.post_data
+        if self.location == "query":
+            parts = urlsplit(url)
+            query = dict(parse_qsl(parts.query, keep_blank_values=True))
+            query[self.param] = str(value)
+            url = urlunsplit(parts._replace(query=urlencode(query)))
+        elif self.location == "json":
+            data = json.loads(body)
+            data[self.param] = value
+            body = json.dumps(data)
+        else:
+            form = dict(parse_qsl(body or "", keep_blank_values=True))
+            form[self.param] = str(value)
+            body = urlencode(form)
+        return self.method, url, body
+
+
+def _params(request) -> dict[tuple[str, str], str]:
+    """All (location, name) → value pairs of a captured request."""
+    params = {("query", k): v for k, v in parse_qsl(urlsplit(request["url"]).query, keep_blank_values=True)}
+    body = request.get("post_data")
+    if body:
+        try:
+            data = json.loads(body)
+            if isinstance(data, dict):
+                params.update({("json", k): v for k, v in data.items() if not isinstance(v, (dict, list))})
+        except ValueError:
+            params.update({("form", k): v for k, v in parse_qsl(body, keep_blank_values=True)})
+    return params
+
+
+def _as_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def infer_page_param(requests: list[dict]) -> tuple[str, str, int, int] | None:
+    """
+    Finds the page counter by diffing consecutive captured requests.
+
+    Args:
+        requests (list[dict]): Captured requests ({"url", "post_data"}), oldest first.
+
+    Returns:
+        tuple | None: (location, name, last_value, step), or None if no counter was found.
+    """
+    if len(requests) >= 2:
+        before, after = _params(requests[-2]), _params(requests[-1])
+        for key, value in after.items():
+            a, b = _as_int(before.get(key)), _as_int(value)
+            if a is not None and b is not None and b > a:
+                return key[0], key[1], b, b - a
+    # Single capture: fall back to well-known counter names.
+    last = _params(requests[-1]) if requests else {}
+    for (location, name), value in last.items():
+        if name in PAGE_PARAM_NAMES and _as_int(value) is not None:
+            return location, name, int(value), 1
+    return None
+
+
+def capture_pagination_endpoint(page, button_selector: str = LOAD_MORE_SELECTOR, clicks: int = 2,
+                                timeout_ms: int = 15_000) -> CapturedEndpoint | None:
+    """
+    Clicks "Load more" a few times on a sync-API page and records the request it triggers.
+
+    Every XHR/fetch response with a JSON or HTML body seen during a click is a
+    candidate; the largest one (the page of records, not a tracking beacon) is kept.
+
+    Args:
+        page: A Playwright sync-API page, already navigated to the listing.
+        button_selector (str): Selector of the "Load more" button.
+        clicks (int): Number of clicks to record (2 lets the counter step be measured).
+        timeout_ms (int): Upper bound for each click's readiness wait.
+
+    Returns:
+        CapturedEndpoint | None: The endpoint, or None if no usable request was seen.
+    """
+    captured = []
+    for _ in range(clicks):
+        button = page.query_selector(button_selector)
+        if not button:
+            break
+        responses = []
+
+        def on_response(response):
+            request = response.request
+            content_type = response.headers.get("content-type", "")
+            if (request.resource_type in ("xhr", "fetch") and response.ok
+                    and ("json" in content_type or "html" in content_type)
+                    and not DEFAULT_PROFILE.decide(request.url, request.resource_type)):
+                responses.append(response)
+
+        page.on("response", on_response)
+        network = NetworkTracker(page)   # before the click, so the request it triggers is counted
+        button.click()
+        wait_until_ready(page, quiet_ms=300, timeout_ms=timeout_ms, network=network)
+        network.detach()
+        page.remove_listener("response", on_response)
+
+        sized = []
+        for response in responses:
+            try:
+                sized.append((len(response.body()), response))
+            except Exception:
+                continue  # Body no longer available (redirect, navigation).
+        if not sized:
+            continue
+        best = max(sized, key=lambda pair: pair[0])[1].request
+        captured.append({"method": best.method, "url": best.url,
+                         "headers": best.headers, "post_data": best.post_data})
+
+    if not captured:
+        return None
+    last = captured[-1]
+    endpoint = CapturedEndpoint(
+        method=last["method"], url=last["url"], post_data=last["post_data"],
+        headers={k: v for k, v in last["headers"].items() if k.lower() not in _DROP_HEADERS},
+    )
+    inferred = infer_page_param(captured)
+    if inferred:
+        endpoint.location, endpoint.param, endpoint.last_value, endpoint.step = inferred
+    host = urlsplit(endpoint.url).hostname or ""
+    endpoint.cookies = {c["name"]: c["value"] for c in page.context.cookies()
+                        if host.endswith(c["domain"].lstrip("."))}
+    return endpoint
+
+
+def _largest_list(body) -> list | None:
+    """The longest list anywhere in a JSON body (its record collection), or None if it has none."""
+    largest, stack = None, [body]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            if largest is None or len(obj) > len(largest):
+                largest = obj
+            stack.extend(obj)
+    return largest
+
+
+def _segment(html: str, record_selector: str | None, prune: bool = True) -> list[str]:
+    """segment_records() for response bodies: a blank or comment-only page has no records."""
+    if not html.strip():
+        return []
+    try:
+        return segment_records(html, container_selector=record_selector, prune=prune)
+    except ParserError:  # "Document is empty"
+        return []
+
+
+def _is_empty(body, record_selector: str | None) -> bool:
+    """
+    Whether a page holds no records. End pages still carry metadata (e.g.
+    {"items": [], "total": 0, "page": 51}), so only the records are looked at: the
+    record containers in the HTML it carries, else its largest list.
+    """
+    if isinstance(body, (list, dict)):
+        html = html_from_body(body)
+        if record_selector and html.strip():
+            return not _segment(html, record_selector, prune=False)
+        records = _largest_list(body)
+        if records is not None:
+            return not records
+        return len(html.strip()) < 50
+    if not body.strip():
+        return True
+    if record_selector:
+        return not _segment(body, record_selector, prune=False)
+    return len(body.strip()) < 50
+
+
+async def fetch_pages(endpoint: CapturedEndpoint, concurrency: int = 8, max_pages: int = 1_000,
+                      record_selector: str | None = None) -> list:
+    """
+    Requests the pages after the captured ones directly, `concurrency` at a time.
+
+    Pages are fetched in windows of `concurrency` consecutive counter values; the
+    crawl stops after the window in which the first empty or failed page appears.
+
+    Args:
+        endpoint (CapturedEndpoint): The endpoint from capture_pagination_endpoint.
+        concurrency (int): Connection-pool size and number of pages in flight.
+        max_pages (int): Safety limit on the number of pages requested.
+        record_selector (str | None): For HTML bodies, a page without a match is empty.
+
+    Returns:
+        list: Response bodies in page order (parsed JSON or HTML text).
+    """
+    if endpoint.param is None:
+        raise ValueError("No page-counter parameter was inferred for this endpoint.")
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    bodies = []
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers=endpoint.headers, cookies=endpoint.cookies) as session:
+
+        async def fetch(value):
+            method, url, body = endpoint.request_for(value)
+            async with session.request(method, url, data=body) as response:
+                if response.status != 200:
+                    return None
+                if "json" in response.headers.get("content-type", ""):
+                    return await response.json()
+                return await response.text()
+
+        value = endpoint.last_value
+        while len(bodies) < max_pages:
+            window = [value + endpoint.step * i for i in range(1, concurrency + 1)]
+            results = await asyncio.gather(*(fetch(v) for v in window), return_exceptions=True)
+            done = False
+            for result in results:
+                if result is None or isinstance(result, Exception) or _is_empty(result, record_selector):
+                    done = True
+                    break
+                bodies.append(result)
+            if done:
+                break
+            value = window[-1]
+    return bodies
+
+
+def html_from_body(body) -> str:
+    """HTML carried by a pagination response: the text itself, or HTML strings inside JSON."""
+    if isinstance(body, str):
+        return body
+    parts, stack = [], [body]
+    while stack:
+        obj = stack.pop(0)
+        if isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+        elif isinstance(obj, str) and "<" in obj and ">" in obj:
+            parts.append(obj)
+    return "\n".join(parts)
+
+
+def records_from_bodies(bodies: list, record_selector: str) -> tuple[list[str], list[dict]]:
+    """
+    Splits fetched pages into record fragments and structured records.
+
+    Pages carrying HTML (as text or inside JSON) are segmented; JSON pages without any
+    HTML contribute the items of their record list (e.g. {"items": [{...}]}) as they are.
+
+    Returns:
+        tuple: (HTML fragments, JSON records).
+    """
+    fragments, records = [], []
+    for body in bodies:
+        html = html_from_body(body)
+        if html.strip():
+            fragments.extend(_segment(html, record_selector))
+        elif isinstance(body, (list, dict)):
+            records.extend(item for item in _largest_list(body) or [] if isinstance(item, dict))
+    return fragments, records
+
+
+def render_via_api(url: str, record_selector: str, concurrency: int = 8,
+                   headless: bool = True) -> tuple[list[str], list[dict]]:
+    """
+    Renders the first page, captures the "Load more" endpoint, fetches the rest directly.
+
+    Args:
+        url (str): The listing/review page.
+        record_selector (str): CSS selector matching one record (e.g. "div.js-rvw").
+        concurrency (int): Pages fetched in parallel.
+        headless (bool): Launch Chromium without a window.
+
+    Returns:
+        tuple: (one pruned HTML fragment per record, ready for extraction; structured
+        records of JSON pages that carry no HTML).
+    """
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        page = browser.new_page()
+        DEFAULT_PROFILE.apply(page)
+        page.goto(url, timeout=60_000)
+        wait_until_ready(page, selector=record_selector, quiet_ms=500, timeout_ms=15_000)
+        endpoint = capture_pagination_endpoint(page)
+        first_html = page.content()
+        browser.close()
+
+    fragments = _segment(first_html, record_selector)
+    if endpoint is None or endpoint.param is None:
+        print("No pagination endpoint captured; only the rendered records are returned.")
+        return fragments, []
+
+    print(f"Captured {endpoint.method} {endpoint.url} • counter {endpoint.location}:{endpoint.param} "
+          f"= {endpoint.last_value} (+{endpoint.step})")
+    start = time.perf_counter()
+    bodies = asyncio.run(fetch_pages(endpoint, concurrency=concurrency, record_selector=record_selector))
+    more_fragments, records = records_from_bodies(bodies, record_selector)
+    fragments.extend(more_fragments)
+    print(f"Fetched {len(bodies)} more pages in {time.perf_counter() - start:.1f}s • "
+          f"{len(fragments)} HTML records, {len(records)} JSON records")
+    return fragments, records
+
+
+if __name__ == "__main__":
+    # Usage: python pagination_capture.py [url] [record_selector]
+    target = sys.argv[1] if len(sys.argv) > 1 else "https://www.consumeraffairs.com/automotive/autonation.htm"
+    selector = sys.argv[2] if len(sys.argv) > 2 else "div.js-rvw"
+    fragments, records = render_via_api(target, selector)
+    out_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "api_paged_records.html"), "w", encoding="utf-8") as f:
+        f.write("<div>\n" + "\n".join(fragments) + "\n</div>")
+    print(f"Saved {len(fragments)} record fragments → {os.path.join(out_dir, 'api_paged_records.html')}")
+    if records:
+        with open(os.path.join(out_dir, "api_paged_records.json"), "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        print(f"Saved {len(records)} JSON records → {os.path.join(out_dir, 'api_paged_records.json')}")
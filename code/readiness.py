@@ -0,0 +1,193 @@
+import time
+from dataclasses import dataclass
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+"""
+Event-driven page readiness detection, replacing fixed sleeps.
+
+Instead of `time.sleep(10)` or `page.wait_for_timeout(1500)`, `wait_until_ready`
+returns as soon as the page has settled, bounded by `timeout_ms`:
+
+- DOM quiescence: no nodes added/removed and no text changed for `quiet_ms`
+  (tracked by a MutationObserver injected into the page);
+- record-count stabilisation: `selector` matches at least `min_count` elements
+  and the count has not changed for `quiet_ms`;
+- network idle (optional): no requests in flight for 500 ms, counted from the page's
+  request events by a `NetworkTracker` (Playwright's "networkidle" load state only
+  covers the initial load, so after a click it returns at once). Attach the tracker
+  before the action that triggers the traffic and pass it as `network`;
+- a custom JavaScript predicate (optional), e.g. "() => !document.querySelector('.spinner')".
+
+Timeouts are not errors: the call reports whether the page became ready and
+how long it waited, and the caller carries on with what has rendered so far.
+"""
+
+# Polled inside the page. The observer is installed once per document and
+# remembers when the DOM and the selector count last changed.
+_SETTLED_JS = """
+({selector, minCount, quietMs}) => {
+  const st = window.__readiness || (window.__readiness = (() => {
+    const s = {lastMutation: performance.now(), lastCount: -1, countChangedAt: performance.now()};
+    new MutationObserver(() => { s.lastMutation = performance.now(); })
+      .observe(document, {childList: true, subtree: true, characterData: true});
+    return s;
+  })());
+  const now = performance.now();
+  if (selector) {
+    const n = document.querySelectorAll(selector).length;
+    if (n !== st.lastCount) { st.lastCount = n; st.countChangedAt = now; }
+    if (n < minCount || now - st.countChangedAt < quietMs) return false;
+  }
+  return now - st.lastMutation >= quietMs;
+}
+"""
+
+_COUNT_JS = "(selector) => document.querySelectorAll(selector).length"
+
+POLL_MS = 100
+NETWORK_QUIET_MS = 500
+
+
+class NetworkTracker:
+    """
+    Counts a page's in-flight requests from its request/requestfinished/requestfailed events.
+
+    Args:
+        page: A Playwright page (sync or async API).
+    """
+
+    _EVENTS = ("request", "requestfinished", "requestfailed")
+
+    def __init__(self, page):
+        self.page = page
+        self.in_flight = set()
+        self.last_change = time.perf_counter()
+        self._handlers = (self._started, self._ended, self._ended)
+        for event, handler in zip(self._EVENTS, self._handlers):
+            page.on(event, handler)
+
+    def _started(self, request) -> None:
+        self.in_flight.add(request)
+        self.last_change = time.perf_counter()
+
+    def _ended(self, request) -> None:
+        self.in_flight.discard(request)
+        self.last_change = time.perf_counter()
+
+    def idle_ms(self) -> float:
+        """How long no request has been in flight (0 while one is)."""
+        return 0.0 if self.in_flight else (time.perf_counter() - self.last_change) * 1000
+
+    def detach(self) -> None:
+        for event, handler in zip(self._EVENTS, self._handlers):
+            self.page.remove_listener(event, handler)
+
+
+@dataclass
+class Readiness:
+    """Outcome of one readiness wait."""
+    ready: bool
+    waited_ms: float
+    # Which condition was still pending when the timeout hit (None when ready).
+    pending: str | None = None
+
+    def summary(self) -> str:
+        state = "ready" if self.ready else f"timed out waiting for {self.pending}"
+        return f"Page {state} after {self.waited_ms:,.0f} ms"
+
+
+def count(page, selector: str) -> int:
+    """Number of elements matching a selector (sync API)."""
+    return page.evaluate(_COUNT_JS, selector)
+
+
+def wait_until_ready(page, selector: str | None = None, min_count: int = 1, quiet_ms: int = 500,
+                     network_idle: bool = False, predicate: str | None = None,
+                     timeout_ms: int = 10_000, network: NetworkTracker | None = None) -> Readiness:
+    """
+    Waits until the page has settled, or until `timeout_ms` has passed (sync API).
+
+    Args:
+        page: A Playwright sync-API page.
+        selector (str | None): Record selector whose count must reach `min_count`
+            and stop changing.
+        min_count (int): Minimum number of `selector` matches.
+        quiet_ms (int): How long the DOM and the count must stay unchanged.
+        network_idle (bool): Also wait until no request has been in flight for
+            NETWORK_QUIET_MS.
+        predicate (str | None): JavaScript function that must return true.
+        timeout_ms (int): Upper bound for the whole wait.
+        network (NetworkTracker | None): Tracker attached before the action that
+            triggers the traffic (implies `network_idle`). Without one, a tracker is
+            attached here and only sees requests started from now on.
+
+    Returns:
+        Readiness: Whether the page became ready and how long it took.
+    """
+    start = time.perf_counter()
+
+    def remaining() -> float:
+        return max(1.0, timeout_ms - (time.perf_counter() - start) * 1000)
+
+    def network_quiet() -> None:
+        while tracker.idle_ms() < NETWORK_QUIET_MS:
+            if (time.perf_counter() - start) * 1000 >= timeout_ms:
+                raise PlaywrightTimeoutError(f"{len(tracker.in_flight)} requests still in flight")
+            page.wait_for_timeout(min(POLL_MS, remaining()))  # lets Playwright dispatch the events
+
+    tracker = network or (NetworkTracker(page) if network_idle else None)
+    steps = [("DOM quiescence", lambda: page.wait_for_function(
+        _SETTLED_JS, arg={"selector": selector, "minCount": min_count, "quietMs": quiet_ms},
+        polling=POLL_MS, timeout=remaining()))]
+    if tracker is not None:
+        steps.append(("network idle", network_quiet))
+    if predicate:
+        steps.append(("predicate", lambda: page.wait_for_function(predicate, polling=POLL_MS, timeout=remaining())))
+
+    try:
+        for name, step in steps:
+            try:
+                step()
+            except PlaywrightTimeoutError:
+                return Readiness(False, (time.perf_counter() - start) * 1000, name)
+        return Readiness(True, (time.perf_counter() - start) * 1000)
+    finally:
+        if tracker is not None and network is None:
+            tracker.detach()
+
+
+async def wait_until_ready_async(page, selector: str | None = None, min_count: int = 1, quiet_ms: int = 500,
+                                 network_idle: bool = False, predicate: str | None = None,
+                                 timeout_ms: int = 10_000, network: NetworkTracker | None = None) -> Readiness:
+    """Async-API version of wait_until_ready (same arguments)."""
+    start = time.perf_counter()
+
+    def remaining() -> float:
+        return max(1.0, timeout_ms - (time.perf_counter() - start) * 1000)
+
+    async def network_quiet() -> None:
+        while tracker.idle_ms() < NETWORK_QUIET_MS:
+            if (time.perf_counter() - start) * 1000 >= timeout_ms:
+                raise PlaywrightTimeoutError(f"{len(tracker.in_flight)} requests still in flight")
+            await page.wait_for_timeout(min(POLL_MS, remaining()))
+
+    tracker = network or (NetworkTracker(page) if network_idle else None)
+    steps = [("DOM quiescence", lambda: page.wait_for_function(
+        _SETTLED_JS, arg={"selector": selector, "minCount": min_count, "quietMs": quiet_ms},
+        polling=POLL_MS, timeout=remaining()))]
+    if tracker is not None:
+        steps.append(("network idle", network_quiet))
+    if predicate:
+        steps.append(("predicate", lambda: page.wait_for_function(predicate, polling=POLL_MS, timeout=remaining())))
+
+    try:
+        for name, step in steps:
+            try:
+                await step()
+            except PlaywrightTimeoutError:
+                return Readiness(False, (time.perf_counter() - start) * 1000, name)
+        return Readiness(True, (time.perf_counter() - start) * 1000)
+    finally:
+        if tracker is not None and network is None:
+            tracker.detach()
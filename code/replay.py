@@ -0,0 +1,243 @@
+import argparse
+import glob
+import hashlib
+import importlib
+import inspect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator
+
+from jsonl_sink import JsonlWriter
+from llm_cache import LLMCache, cache_key
+from llm_scheduler import ScheduledExtractor
+from review_enrichment import ENRICH_PROMPT, enrich_reviews, parse_reviews
+from selector_extraction import AUTONATION_TILE
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+
+"""
+Offline replay: re-extract stored pages without re-rendering anything.
+
+After a prompt, selector or schema change, `replay` walks the snapshot store (the
+latest render of every URL, or every render) or a directory of saved HTML files and
+runs an extraction pipeline over each page in a process pool.
+
+- Pipelines are plain `html -> list[dict]` functions named by "module:function"
+  (or one of the PIPELINES shortcuts). Their fingerprint hashes the source of the
+  defining module and of the local modules it uses, so editing a prompt, a selector
+  or a parser invalidates old results.
+- Per-page results are cached under (page hash, pipeline fingerprint) in
+  `outputs/replay_cache.sqlite`; unchanged pages are never extracted twice.
+- Results stream to a JSONL file keyed by (page, fingerprint), which doubles as the
+  progress cursor: an interrupted backfill resumes where it stopped.
+- A page whose pipeline raises (e.g. an empty or truncated HTML file) is counted as
+  failed and reported; it is neither cached nor written, so the next run retries it.
+
+    python replay.py reviews --store --workers 8
+    python replay.py listings --dir outputs --pattern "autonation_*.html"
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+REPLAY_CACHE_PATH = os.path.join(OUTPUT_DIR, "replay_cache.sqlite")
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PIPELINES = {
+    "listings": "replay:extract_listings",
+    "reviews": "replay:extract_reviews",
+    "reviews-enriched": "replay:extract_enriched_reviews",
+}
+
+
+# ─────────────────── Pipelines ─────────────────────────────────────────────────────
+# Top-level functions, so worker processes can import them by name.
+
+def extract_listings(html: str) -> list[dict]:
+    """AutoNation listing tiles, read with the compiled selectors."""
+    return AUTONATION_TILE.extract(html)
+
+
+def extract_reviews(html: str) -> list[dict]:
+    """The structural review fields (no LLM)."""
+    return parse_reviews(html)
+
+
+_enricher = None
+
+
+def extract_enriched_reviews(html: str) -> list[dict]:
+    """
+    Structural review fields plus LLM likes/dislikes.
+
+    Each worker process gets its own scheduler, so the rate limits apply per process;
+    the scheduler's concurrency already keeps requests in flight, so run this one
+    with few workers.
+    """
+    global _enricher
+    if _enricher is None:
+        _enricher = ScheduledExtractor(ENRICH_PROMPT, cache=LLMCache())
+    reviews = parse_reviews(html)
+    enrich_reviews(reviews, _enricher)
+    return reviews
+
+
+@dataclass(frozen=True)
+class Page:
+    """A stored page to replay: a snapshot-store body or an HTML file."""
+    url: str
+    sha256: str | None = None   # snapshot-store body
+    path: str | None = None     # file on disk
+
+    def load(self, store_root: str = SNAPSHOT_DIR) -> str:
+        if self.path is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return f.read()
+        return SnapshotStore(store_root).read(self.sha256)
+
+
+def iter_store_pages(store: SnapshotStore, latest_only: bool = True) -> Iterator[Page]:
+    """The latest render of every stored URL, or every render (deduplicated by body)."""
+    seen = set()
+    for url in store.urls():
+        snapshots = [store.latest(url)] if latest_only else store.history(url)
+        for snap in snapshots:
+            if snap is not None and snap.sha256 not in seen:
+                seen.add(snap.sha256)
+                yield Page(url=url, sha256=snap.sha256)
+
+
+def iter_directory_pages(directory: str, pattern: str = "*.html") -> Iterator[Page]:
+    """Every HTML file under `directory` matching `pattern` (recursively)."""
+    for path in sorted(glob.glob(os.path.join(directory, "**", pattern), recursive=True)):
+        yield Page(url="file://" + os.path.abspath(path), path=path)
+
+
+def resolve_pipeline(spec: str):
+    """Imports a pipeline from a PIPELINES name or a "module:function" spec."""
+    module_name, _, func_name = PIPELINES.get(spec, spec).partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _local_modules(module) -> list:
+    """The module and every module of this directory it imports names from, transitively."""
+    found = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in found:
+            continue
+        found[current.__name__] = current
+        for value in vars(current).values():
+            dependency = value if inspect.ismodule(value) else inspect.getmodule(value)
+            path = getattr(dependency, "__file__", None)
+            if path and os.path.dirname(os.path.abspath(path)) == CODE_DIR and dependency.__name__ not in found:
+                pending.append(dependency)
+    return [found[name] for name in sorted(found)]
+
+
+def pipeline_fingerprint(spec: str) -> str:
+    """Hash of the pipeline's name and the source it depends on (prompts, selectors, parsers)."""
+    parts = [PIPELINES.get(spec, spec)]
+    parts.extend(inspect.getsource(m) for m in _local_modules(inspect.getmodule(resolve_pipeline(spec))))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _page_hash(page: Page, html: str) -> str:
+    return page.sha256 or hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def _replay_page(args: tuple) -> dict:
+    """
+    Worker: loads one page, returns its cached or freshly extracted records.
+
+    Any exception is caught here and returned as an "error" string with no records:
+    one bad page must not abort the batch, and lxml's exceptions do not pickle back
+    to the parent process.
+    """
+    page, spec, fingerprint, store_root, cache_path = args
+    started = time.perf_counter()
+    result = {"url": page.url, "page": page.sha256, "pipeline": spec, "fingerprint": fingerprint,
+              "records": [], "cache_hit": False}
+    try:
+        html = page.load(store_root)
+        result["page"] = _page_hash(page, html)
+        cache = LLMCache(cache_path)
+        key = cache_key(fingerprint, result["page"], "replay")
+        cached = cache.get(key)
+        if cached is not None:
+            result["records"], result["cache_hit"] = cached[0], True
+        else:
+            result["records"] = resolve_pipeline(spec)(html)
+            cache.put(key, "replay", result["records"], [])
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def replay(pages: list[Page], spec: str, out_path: str, workers: int | None = None,
+           store_root: str = SNAPSHOT_DIR, cache_path: str = REPLAY_CACHE_PATH) -> dict:
+    """
+    Runs a pipeline over stored pages in a process pool and streams results to JSONL.
+
+    Args:
+        pages (list[Page]): Pages to replay.
+        spec (str): PIPELINES name or "module:function" of an `html -> list[dict]` function.
+        out_path (str): JSONL output; one line per page. Pages already in it for the
+            same pipeline fingerprint are skipped (resumable).
+        workers (int | None): Worker processes (default: CPU count).
+        store_root (str): Snapshot store holding the pages' bodies.
+        cache_path (str): Per-page result cache.
+
+    Returns:
+        dict: Counters (pages, skipped, cache hits, failed, records, seconds).
+    """
+    fingerprint = pipeline_fingerprint(spec)
+    started = time.perf_counter()
+    counts = {"pages": 0, "skipped": 0, "cache_hits": 0, "failed": 0, "records": 0}
+    with JsonlWriter(out_path, key=lambda r: f"{r['page']}:{r['fingerprint']}") as sink:
+        # Pages are identified by body hash; for files it is only known after reading,
+        # so only snapshot-store pages can be skipped before they reach a worker.
+        todo = [p for p in pages if p.sha256 is None or f"{p.sha256}:{fingerprint}" not in sink]
+        counts["skipped"] = len(pages) - len(todo)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = ((page, spec, fingerprint, store_root, cache_path) for page in todo)
+            for result in pool.map(_replay_page, jobs, chunksize=4):
+                if "error" in result:
+                    # Not written, so a resumed run retries the page.
+                    counts["failed"] += 1
+                    print(f"Failed {result['url']}: {result['error']}")
+                    continue
+                if not sink.write(result):
+                    counts["skipped"] += 1
+                    continue
+                counts["pages"] += 1
+                counts["cache_hits"] += result["cache_hit"]
+                counts["records"] += len(result["records"])
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    rate = counts["pages"] / counts["seconds"] if counts["seconds"] else 0.0
+    print(f"Replayed {counts['pages']} pages ({counts['cache_hits']} cached, {counts['skipped']} already done, "
+          f"{counts['failed']} failed) "
+          f"• {counts['records']} records • {counts['seconds']}s ({rate:.1f} pages/s) → {out_path}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-extract stored pages with an extraction pipeline.")
+    parser.add_argument("pipeline", help=f"one of {', '.join(PIPELINES)} or module:function")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--store", action="store_true", help="replay the snapshot store (default)")
+    source.add_argument("--dir", help="replay HTML files under this directory")
+    parser.add_argument("--pattern", default="*.html", help="file pattern for --dir")
+    parser.add_argument("--all-renders", action="store_true", help="every stored render, not only the latest per URL")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="JSONL output (default outputs/replay_<pipeline>.jsonl)")
+    args = parser.parse_args()
+
+    if args.dir:
+        page_list = list(iter_directory_pages(args.dir, args.pattern))
+    else:
+        page_list = list(iter_store_pages(SnapshotStore(), latest_only=not args.all_renders))
+    out = args.out or os.path.join(OUTPUT_DIR, f"replay_{args.pipeline.replace(':', '_')}.jsonl")
+    replay(page_list, args.pipeline, out, workers=args.workers)
@@ -0,0 +1,233 @@
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+"""
+Network resource blocking for the Playwright renderers.
+
+The LLM only needs the DOM, yet Chromium downloads every image, font, video, ad
+and analytics script on the page. A `BlockingProfile` installs a route handler on
+a Playwright page that aborts requests by resource type and by domain before they
+leave the browser, and records what was blocked and how many bytes were still
+downloaded. `measure_savings` renders the same URL with and without a profile to
+report the bytes saved and the render-time reduction.
+
+By default the downloaded bytes are summed from Content-Length headers, which cost
+nothing but are missing on chunked or compressed responses, so the figure is a lower
+bound. With `measure_bytes=True` (used by `measure_savings`) every finished request's
+encoded body size is read from Playwright (`request.sizes()`), which is exact but
+costs one round trip per request.
+
+Works with both the sync API (our scripts) and the async API (browser_pool):
+
+    stats = DEFAULT_PROFILE.apply(page)            # sync
+    stats = await DEFAULT_PROFILE.apply_async(page)  # async
+"""
+
+# Analytics, ad and session-recording hosts seen on the AutoNation and ConsumerAffairs pages.
+TRACKING_DOMAINS = (
+    "googletagmanager.com", "google-analytics.com", "doubleclick.net", "googleadservices.com",
+    "connect.facebook.net", "facebook.com", "analytics.tiktok.com", "bat.bing.com",
+    "cdn.amplitude.com", "heap-api.com", "hotjar.com", "posthog.com", "tiqcdn.com",
+    "adroll.com", "dotomi.com", "redditstatic.com", "linkedin.com", "activengage.com",
+    "bouncepilot.com", "adasitecompliancetools.com", "clarity.ms", "newrelic.com",
+    "nr-data.net", "dynamicyield.com", "criteo.com", "taboola.com", "outbrain.com",
+    "scorecardresearch.com", "quantserve.com", "youtube.com", "maps.googleapis.com",
+)
+
+
+@dataclass
+class BlockingStats:
+    """What a profile blocked on one page and what was still downloaded."""
+    blocked_by_type: Counter = field(default_factory=Counter)
+    blocked_by_domain: Counter = field(default_factory=Counter)
+    allowed_requests: int = 0
+    # Bytes on the wire of allowed responses: encoded body sizes when `exact_bytes`,
+    # otherwise the sum of the Content-Length headers present (a lower bound).
+    bytes_downloaded: int = 0
+    exact_bytes: bool = False
+
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked_by_type.values())
+
+    def summary(self) -> str:
+        top = ", ".join(f"{t}={n}" for t, n in self.blocked_by_type.most_common())
+        downloaded = f"{self.bytes_downloaded:,}" if self.exact_bytes else f"≥{self.bytes_downloaded:,}"
+        return (f"Blocked {self.blocked_requests} requests ({top or 'none'}) • "
+                f"allowed {self.allowed_requests} • downloaded {downloaded} bytes")
+
+
+@dataclass(frozen=True)
+class BlockingProfile:
+    """
+    Which requests to abort while rendering.
+
+    Attributes:
+        resource_types (frozenset[str]): Playwright resource types to block
+            ("image", "media", "font", "stylesheet", ...).
+        domains (tuple[str, ...]): Hosts to block, including their subdomains.
+        allow_domains (tuple[str, ...]): Hosts never blocked, even if they match
+            a blocked resource type (e.g. an API host serving JSON as "fetch").
+    """
+    resource_types: frozenset = frozenset({"image", "media", "font"})
+    domains: tuple = TRACKING_DOMAINS
+    allow_domains: tuple = ()
+
+    @staticmethod
+    def _matches(host: str, domains) -> str | None:
+        for domain in domains:
+            if host == domain or host.endswith("." + domain):
+                return domain
+        return None
+
+    def decide(self, url: str, resource_type: str) -> str | None:
+        """Returns why a request should be blocked ("type:..." / "domain:..."), or None to allow it."""
+        host = (urlsplit(url).hostname or "").lower()
+        if self._matches(host, self.allow_domains):
+            return None
+        domain = self._matches(host, self.domains)
+        if domain:
+            return f"domain:{domain}"
+        if resource_type in self.resource_types:
+            return f"type:{resource_type}"
+        return None
+
+    def _record(self, stats: BlockingStats, request, reason: str | None) -> None:
+        if reason is None:
+            stats.allowed_requests += 1
+            return
+        stats.blocked_by_type[request.resource_type] += 1
+        if reason.startswith("domain:"):
+            stats.blocked_by_domain[reason[7:]] += 1
+
+    @staticmethod
+    def _on_response(stats: BlockingStats):
+        def handler(response):
+            try:
+                stats.bytes_downloaded += int(response.headers.get("content-length", 0))
+            except ValueError:
+                pass
+        return handler
+
+    @staticmethod
+    def _on_request_finished(stats: BlockingStats):
+        def handler(request):
+            try:
+                stats.bytes_downloaded += max(request.sizes().get("responseBodySize", 0), 0)
+            except Exception:
+                pass  # Page or context already closed.
+        return handler
+
+    @staticmethod
+    def _on_request_finished_async(stats: BlockingStats):
+        async def handler(request):
+            try:
+                stats.bytes_downloaded += max((await request.sizes()).get("responseBodySize", 0), 0)
+            except Exception:
+                pass
+        return handler
+
+    def apply(self, page, measure_bytes: bool = False) -> BlockingStats:
+        """
+        Installs the profile on a sync-API page (before page.goto).
+
+        Args:
+            page: A Playwright sync-API page.
+            measure_bytes (bool): Count exact encoded body sizes instead of Content-Length.
+        """
+        stats = BlockingStats(exact_bytes=measure_bytes)
+
+        def handle(route):
+            reason = self.decide(route.request.url, route.request.resource_type)
+            self._record(stats, route.request, reason)
+            if reason:
+                route.abort()
+            else:
+                route.continue_()
+
+        page.route("**/*", handle)
+        if measure_bytes:
+            page.on("requestfinished", self._on_request_finished(stats))
+        else:
+            page.on("response", self._on_response(stats))
+        return stats
+
+    async def apply_async(self, page, measure_bytes: bool = False) -> BlockingStats:
+        """Installs the profile on an async-API page (before page.goto); see apply()."""
+        stats = BlockingStats(exact_bytes=measure_bytes)
+
+        async def handle(route):
+            reason = self.decide(route.request.url, route.request.resource_type)
+            self._record(stats, route.request, reason)
+            if reason:
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route("**/*", handle)
+        if measure_bytes:
+            page.on("requestfinished", self._on_request_finished_async(stats))
+        else:
+            page.on("response", self._on_response(stats))
+        return stats
+
+
+# Blocks images, video/audio, fonts and tracking hosts; keeps CSS so layout-driven
+# lazy loading and the "Load more" button still behave as in a normal browser.
+DEFAULT_PROFILE = BlockingProfile()
+
+# Also drops stylesheets, for pages that render their data without relying on CSS.
+AGGRESSIVE_PROFILE = BlockingProfile(resource_types=frozenset({"image", "media", "font", "stylesheet", "other"}))
+
+
+def measure_savings(url: str, profile: BlockingProfile = DEFAULT_PROFILE, wait_selector: str | None = None,
+                    headless: bool = True) -> dict:
+    """
+    Renders a URL twice, unblocked and with `profile`, and compares the two runs.
+
+    Args:
+        url (str): The page to render.
+        profile (BlockingProfile): The profile to evaluate.
+        wait_selector (str | None): Selector that marks the page as rendered.
+        headless (bool): Launch Chromium without a window.
+
+    Returns:
+        dict: bytes (encoded response bodies, measured per request) and seconds per
+        run plus "bytes_saved" and "time_saved_pct".
+    """
+    from playwright.sync_api import sync_playwright
+
+    runs = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        for name, active in (("baseline", None), ("blocked", profile)):
+            # Fresh context per run so the second render cannot use the first one's cache.
+            context = browser.new_context()
+            page = context.new_page()
+            stats = (active or BlockingProfile(frozenset(), ())).apply(page, measure_bytes=True)
+            start = time.perf_counter()
+            page.goto(url, timeout=60_000, wait_until="load")
+            if wait_selector:
+                page.wait_for_selector(wait_selector, timeout=30_000)
+            runs[name] = {"seconds": time.perf_counter() - start, "bytes": stats.bytes_downloaded,
+                          "requests": stats.allowed_requests, "blocked": stats.blocked_requests}
+            context.close()
+        browser.close()
+
+    base, blocked = runs["baseline"], runs["blocked"]
+    runs["bytes_saved"] = base["bytes"] - blocked["bytes"]
+    runs["time_saved_pct"] = 100 * (1 - blocked["seconds"] / base["seconds"]) if base["seconds"] else 0.0
+    print(f"Resource blocking • {base['bytes']:,} → {blocked['bytes']:,} bytes "
+          f"• {base['seconds']:.1f}s → {blocked['seconds']:.1f}s ({runs['time_saved_pct']:.0f}% faster)")
+    return runs
+
+
+if __name__ == "__main__":
+    # Usage: python resource_blocking.py [url] [wait_selector]
+    import sys
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "https://www.autonation.com/cars-for-sale?mk=chrysler"
+    selector = sys.argv[2] if len(sys.argv) > 2 else "ansrp-srp-tile-v3"
+    measure_savings(target, wait_selector=selector)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable
+
+from chunking import record_key
+from columnar_export import parse_int, parse_number
+
+"""
+SQLite result store for listings and reviews.
+
+Re-scraping used to overwrite `autonation_results.json` / `ca_autonation_reviews.json`
+wholesale. `ResultStore` keeps one row per record instead, keyed by a stable natural
+key (a hash of the record's source identifier: the VIN of a listing, the container
+id of a review), and upserts every crawl into it:
+unseen records are inserted with a `first_seen` timestamp, records seen again only
+get their `last_seen` bumped, and records whose content changed (a price drop, an
+edited review) are rewritten with a new `last_changed`. Timestamps are indexed, so
+"new reviews since yesterday" or "listings gone since the last crawl" are index
+range queries rather than JSON rescans.
+
+    python result_store.py reviews 24     # reviews first seen in the last 24 hours
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+RESULT_STORE_PATH = os.path.join(OUTPUT_DIR, "results.sqlite")
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """
+    Layout of one record table.
+
+    Attributes:
+        key_fields (tuple): Fields forming the record's natural key: identifiers the
+            source page assigns, which survive rewording and re-extraction.
+        columns (dict): Indexed column name → (SQL type, parser from the raw value).
+        fallback_key_fields (tuple): Key for records without those identifiers (e.g.
+            answers of an LLM fallback that did not copy them).
+    """
+    key_fields: tuple
+    columns: dict
+    fallback_key_fields: tuple = ()
+
+
+TABLES = {
+    # A listing is its VIN (tile id "vehicle_<VIN>"): two cars of the same trim and
+    # mileage stay apart, and a listing keeps its identity when its price changes.
+    "listings": TableSpec(
+        key_fields=("vin",),
+        fallback_key_fields=("car_name", "car_mileage"),
+        columns={
+            "vin": ("TEXT", lambda v: v),
+            "car_name": ("TEXT", lambda v: v),
+            "car_status": ("TEXT", lambda v: v),
+            "car_price": ("REAL", parse_number),
+            "car_mileage": ("INTEGER", parse_int),
+        },
+    ),
+    # A review is its container id ("review-<id>"), so a reworded or re-spaced
+    # extraction of the same review updates its row instead of adding one.
+    "reviews": TableSpec(
+        key_fields=("review_id",),
+        fallback_key_fields=("reviewer_name", "review_date", "review_text"),
+        columns={
+            "review_id": ("TEXT", lambda v: v),
+            "reviewer_name": ("TEXT", lambda v: v),
+            "review_date": ("TEXT", lambda v: v),
+            "star_rating": ("INTEGER", parse_int),
+        },
+    ),
+}
+
+
+@dataclass
+class UpsertStats:
+    """Outcome of one upsert batch."""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def summary(self) -> str:
+        return f"{self.inserted} new • {self.updated} changed • {self.unchanged} unchanged"
+
+
+def natural_key(record: dict, spec: TableSpec) -> str:
+    """Stable identity of a record: the hash of its key fields, or of the fallback fields if any is empty."""
+    fields = spec.key_fields
+    if spec.fallback_key_fields and not all(record.get(f) for f in fields):
+        fields = spec.fallback_key_fields
+    return hashlib.sha256(record_key(record, fields).encode("utf-8")).hexdigest()
+
+
+def _content_hash(record: dict) -> str:
+    return hashlib.sha256(record_key(record).encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """
+    Upserting SQLite store of extracted listings and reviews.
+
+    Args:
+        path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, path: str = RESULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            for table, spec in TABLES.items():
+                columns = "".join(f", {name} {sql_type}" for name, (sql_type, _) in spec.columns.items())
+                db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    f" key TEXT PRIMARY KEY{columns}, record TEXT, content_hash TEXT,"
+                    f" first_seen REAL, last_seen REAL, last_changed REAL)"
+                )
+                # Stores created before a column was added get it now.
+                existing = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+                for name, (sql_type, _) in spec.columns.items():
+                    if name not in existing:
+                        db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+                for name in ("first_seen", "last_seen", *spec.columns):
+                    db.execute(f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({name})")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the store usable from threads.
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def upsert(self, table: str, records: Iterable[dict], seen_at: float | None = None) -> UpsertStats:
+        """
+        Inserts new records, refreshes `last_seen` of known ones and rewrites changed ones.
+
+        Args:
+            table (str): "listings" or "reviews".
+            records (Iterable[dict]): Extracted records.
+            seen_at (float | None): Crawl timestamp (epoch seconds); defaults to now.
+
+        Returns:
+            UpsertStats: How many records were new, changed or unchanged.
+        """
+        spec = TABLES[table]
+        now = time.time() if seen_at is None else seen_at
+        names = list(spec.columns)
+        stats = UpsertStats()
+        with self._connect() as db:
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                key = natural_key(record, spec)
+                digest = _content_hash(record)
+                row = db.execute(f"SELECT content_hash FROM {table} WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[0] == digest:
+                    db.execute(f"UPDATE {table} SET last_seen = ? WHERE key = ?", (now, key))
+                    stats.unchanged += 1
+                    continue
+                values = [parse(record.get(name)) for name, (_, parse) in spec.columns.items()]
+                record_json = json.dumps(record, ensure_ascii=False, default=str)
+                if row is None:
+                    db.execute(
+                        f"INSERT INTO {table} (key, {', '.join(names)}, record, content_hash,"
+                        f" first_seen, last_seen, last_changed) VALUES ({', '.join('?' * (len(names) + 6))})",
+                        (key, *values, record_json, digest, now, now, now),
+                    )
+                    stats.inserted += 1
+                else:
+                    db.execute(
+                        f"UPDATE {table} SET {''.join(f'{n} = ?, ' for n in names)}record = ?,"
+                        f" content_hash = ?, last_seen = ?, last_changed = ? WHERE key = ?",
+                        (*values, record_json, digest, now, now, key),
+                    )
+                    stats.updated += 1
+        return stats
+
+    def _records(self, sql: str, params: tuple) -> list[dict]:
+        with self._connect() as db:
+            return [json.loads(row[0]) for row in db.execute(sql, params).fetchall()]
+
+    def new_since(self, table: str, since: float) -> list[dict]:
+        """Records first seen at or after `since` (epoch seconds), oldest first."""
+        return self._records(f"SELECT record FROM {table} WHERE first_seen >= ? ORDER BY first_seen", (since,))
+
+    def changed_since(self, table: str, since: float) -> list[dict]:
+        """Records inserted or rewritten at or after `since` (epoch seconds)."""
+        return self._records(f"SELECT record FROM {table} WHERE last_changed >= ? ORDER BY last_changed", (since,))
+
+    def not_seen_since(self, table: str, since: float) -> list[dict]:
+        """Records missing from every crawl since `since`, e.g. listings that were sold."""
+        return self._records(f"SELECT record FROM {table} WHERE last_seen < ? ORDER BY last_seen", (since,))
+
+    def count(self, table: str) -> int:
+        with self._connect() as db:
+            return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # Usage: python result_store.py {reviews|listings} [hours]
+    table = sys.argv[1] if len(sys.argv) > 1 else "reviews"
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 24
+    store = ResultStore()
+    fresh = store.new_since(table, time.time() - hours * 3600)
+    print(f"{len(fresh)} of {store.count(table)} {table} first seen in the last {hours:g}h")
+    print(json.dumps(fresh[:5], indent=2, ensure_ascii=False))
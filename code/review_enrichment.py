@@ -0,0 +1,95 @@
+import json
+from typing import Callable
+
+from columnar_export import parse_date, parse_int
+from selector_extraction import CONSUMERAFFAIRS_REVIEW, SelectorExtractor
+
+"""
+Two-stage review extraction: a local structural pass, then LLM enrichment.
+
+Name, location, date, rating, tags and text are plain DOM reads, so stage one
+reads them with compiled selectors (`CONSUMERAFFAIRS_REVIEW`) in milliseconds.
+Only the inferred `likes`/`dislikes` need a model: stage two sends each review's
+`star_rating` and `review_text` as a compact JSON array, so the input per review is
+a few sentences instead of its share of the page HTML.
+"""
+
+LIKES_GUIDELINES = """
+Guidelines for deriving 'likes' and 'dislikes':
+- Consider the 'star_rating':
+    - 4 or 5 stars: Focus primarily on extracting 'likes'. 'Dislikes' should likely be empty unless explicitly negative points are made.
+    - 1 or 2 stars: Focus primarily on extracting 'dislikes'. 'Likes' should likely be empty unless explicitly positive points are made.
+    - 3 stars: Both 'likes' and 'dislikes' might be present; extract relevant brief phrases for both if applicable.
+- Keep the phrases very short and directly related to the review content.
+"""
+
+ENRICH_PROMPT = """
+You are given customer reviews of AutoNation as a JSON array of objects with the keys
+"id", "star_rating" and "review_text".
+
+For every review, return up to 3 very brief positive points ("likes") and up to 3 very
+brief negative points ("dislikes") mentioned by the reviewer, as lists of strings.
+Use an empty list [] when there are none.
+""" + LIKES_GUIDELINES + """
+Return a JSON object of the form
+{"content": [{"id": <id>, "likes": [...], "dislikes": [...]}, ...]}
+with exactly one entry per input review, using the input "id". Only JSON.
+"""
+
+
+def _normalize(record: dict) -> dict:
+    date = parse_date(record.get("review_date"))
+    text = record.get("review_text")
+    return {
+        **record,
+        "review_date": date.isoformat() if date else record.get("review_date"),
+        "star_rating": parse_int(record.get("star_rating")),
+        "review_text": " ".join(text) if isinstance(text, list) else text,
+    }
+
+
+def parse_reviews(html: str, extractor: SelectorExtractor = CONSUMERAFFAIRS_REVIEW) -> list[dict]:
+    """
+    Stage one: reads the structural review fields from the DOM.
+
+    Args:
+        html (str): Rendered HTML (full page or a batch of review containers).
+        extractor (SelectorExtractor): The review layout's field rules.
+
+    Returns:
+        list[dict]: One review per container, with an ISO date, an integer rating and
+        the full review text; likes/dislikes are not set yet.
+    """
+    return [_normalize(record) for record in extractor.extract(html)]
+
+
+def enrichment_source(reviews: list[dict]) -> str:
+    """The stage-two LLM input: rating and text of each review, keyed by position."""
+    items = [{"id": i, "star_rating": r.get("star_rating"), "review_text": r.get("review_text")}
+             for i, r in enumerate(reviews)]
+    return json.dumps(items, ensure_ascii=False)
+
+
+def enrich_reviews(reviews: list[dict], llm_extract: Callable[[str], tuple]) -> list:
+    """
+    Stage two: adds `likes` and `dislikes` to the reviews in place.
+
+    Args:
+        reviews (list[dict]): Reviews from parse_reviews (or any source with
+            star_rating and review_text).
+        llm_extract (Callable[[str], tuple]): Runs ENRICH_PROMPT over a source and
+            returns (records, exec_info), e.g. llm_scheduler.ScheduledExtractor.
+
+    Returns:
+        list: The execution info of the LLM call. Reviews the model skipped keep
+        likes/dislikes set to None.
+    """
+    if not reviews:
+        return []
+    answers, exec_info = llm_extract(enrichment_source(reviews))
+    by_id = {parse_int(a.get("id")): a for a in answers or [] if isinstance(a, dict)}
+    for i, review in enumerate(reviews):
+        answer = by_id.get(i, {})
+        review["likes"] = answer.get("likes")
+        review["dislikes"] = answer.get("dislikes")
+    return exec_info
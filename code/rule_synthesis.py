@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import lxml.html
+
+from html_pruning import prune_html, prune_tree
+from llm_cache import CachedSmartScraperGraph
+from segmentation import node_signature
+from selector_extraction import FieldRule, SelectorExtractor
+
+"""
+LLM-synthesized extraction rules, cached per site layout.
+
+Instead of asking the LLM to extract every page, the model is asked once per
+site/layout to write a CSS extraction plan for a sample page, together with the
+records it extracts from that sample. The plan is replayed locally with
+selector_extraction and kept only if it reproduces the LLM's own records.
+Accepted plans are stored in a JSON rule cache keyed by a structural fingerprint
+of the DOM, so later pages with the same layout never reach the LLM. A new plan is
+synthesized only when the layout drifts or the cached plan stops validating.
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+RULE_CACHE_PATH = os.path.join(OUTPUT_DIR, "rule_cache.json")
+
+# Minimum share of sample records a plan must reproduce, per field.
+MIN_AGREEMENT = 0.9
+# Minimum Jaccard similarity for a page to reuse a plan synthesized on another page.
+MIN_LAYOUT_SIMILARITY = 0.85
+
+# ─────────────────── Layout Fingerprint ────────────────────────────────────────────
+
+
+def layout_features(html: str) -> set[str]:
+    """
+    Returns the set of parent→child structural edges of the pruned document.
+
+    Each edge is "tag.classes>tag.classes" with framework-generated class names
+    removed, so pages that share a template but differ in content (other cars,
+    other reviews, more or fewer records) produce nearly the same set.
+    """
+    root = lxml.html.document_fromstring(html)
+    prune_tree(root)
+    features = set()
+    for el in root.iter():
+        parent = el.getparent()
+        if not isinstance(el.tag, str) or parent is None:
+            continue
+        p_tag, p_cls = node_signature(parent)
+        c_tag, c_cls = node_signature(el)
+        features.add(f"{p_tag}.{'.'.join(p_cls)}>{c_tag}.{'.'.join(c_cls)}")
+    return features
+
+
+def layout_fingerprint(features: set[str]) -> str:
+    """Stable short hash of a layout feature set."""
+    return hashlib.sha1("\n".join(sorted(features)).encode("utf-8")).hexdigest()[:16]
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+# ─────────────────── Extraction Plans ──────────────────────────────────────────────
+
+
+def plan_to_extractor(plan: dict) -> SelectorExtractor:
+    """Builds a SelectorExtractor from a plan dict ({"container": ..., "fields": [...]})."""
+    fields = [
+        FieldRule(
+            name=f["name"],
+            selector=f["selector"],
+            attr=f.get("attr") or None,
+            required=bool(f.get("required", True)),
+            default=f.get("default"),
+            multiple=bool(f.get("multiple", False)),
+        )
+        for f in plan["fields"]
+    ]
+    return SelectorExtractor(plan["container"], fields)
+
+
+def _norm(value) -> str:
+    if isinstance(value, list):
+        return "|".join(sorted(_norm(v) for v in value))
+    return " ".join(str(value if value is not None else "").split()).lower()
+
+
+def _values_agree(local, expected) -> bool:
+    a, b = _norm(local), _norm(expected)
+    # Tolerate the LLM trimming labels ("Reviewed May 3, 2025" vs "May 3, 2025").
+    return a == b or bool(a and b and (a in b or b in a))
+
+
+def validate_plan(plan: dict, html: str, expected: list[dict],
+                  min_agreement: float = MIN_AGREEMENT) -> tuple[bool, dict]:
+    """
+    Replays a plan on a page and compares it with reference records.
+
+    Args:
+        plan (dict): The extraction plan.
+        html (str): The page the reference records were extracted from.
+        expected (list[dict]): Reference records (the LLM's own extraction).
+        min_agreement (float): Minimum share of records each field must match.
+
+    Returns:
+        tuple[bool, dict]: Whether the plan passed, and the agreement per field
+        (plus "_count" with the local/expected record counts).
+    """
+    try:
+        local = plan_to_extractor(plan).extract(html)
+    except Exception as e:  # Invalid selector syntax from the model.
+        return False, {"_error": str(e)}
+
+    report = {"_count": [len(local), len(expected)]}
+    if not expected or len(local) != len(expected):
+        return False, report
+    ok = True
+    for field in plan["fields"]:
+        name = field["name"]
+        hits = sum(_values_agree(l.get(name), e.get(name)) for l, e in zip(local, expected))
+        report[name] = hits / len(expected)
+        ok = ok and report[name] >= min_agreement
+    return ok, report
+
+
+# ─────────────────── Rule Cache ────────────────────────────────────────────────────
+
+
+class RuleCache:
+    """
+    JSON-file store of validated extraction plans, keyed by site and layout fingerprint.
+
+    Args:
+        path (str): Location of the cache file (created on first save).
+    """
+
+    def __init__(self, path: str = RULE_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(tmp, self.path)
+
+    def lookup(self, site: str, features: set[str],
+               min_similarity: float = MIN_LAYOUT_SIMILARITY) -> dict | None:
+        """
+        Returns the cache entry for this layout, or the most similar layout of the
+        same site if it is above `min_similarity`; None when the layout has drifted.
+        """
+        key = f"{site}:{layout_fingerprint(features)}"
+        if key in self.entries:
+            return self.entries[key]
+        best, best_sim = None, min_similarity
+        for entry in self.entries.values():
+            if entry["site"] != site:
+                continue
+            sim = _jaccard(features, set(entry["features"]))
+            if sim >= best_sim:
+                best, best_sim = entry, sim
+        return best
+
+    def store(self, site: str, features: set[str], plan: dict, report: dict) -> dict:
+        """Saves a validated plan for this site and layout."""
+        entry = {
+            "site": site,
+            "fingerprint": layout_fingerprint(features),
+            "features": sorted(features),
+            "plan": plan,
+            "validation": report,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.entries[f"{site}:{entry['fingerprint']}"] = entry
+        self._save()
+        return entry
+
+    def invalidate(self, entry: dict) -> None:
+        """Removes a plan that no longer validates."""
+        self.entries.pop(f"{entry['site']}:{entry['fingerprint']}", None)
+        self._save()
+
+
+# ─────────────────── Synthesis ─────────────────────────────────────────────────────
+
+SYNTHESIS_PROMPT = """
+You are an expert web-scraping engineer. The HTML is a sample page of a website whose
+other pages share the same layout.
+
+1. Write a CSS-selector extraction plan for these fields:
+{fields}
+2. Extract every record from this sample page, copying each value VERBATIM from the page text.
+
+Plan rules:
+- "container" is a CSS selector matching exactly one element per record.
+- Each field selector is evaluated relative to the container.
+- Set "attr" to an attribute name when the value lives in an attribute (e.g. "content" of a
+  <meta itemprop=...>), otherwise null to use the element text.
+- Set "multiple" to true for list fields, "required" to false for fields that may be absent.
+
+Return ONLY valid JSON of the form:
+{{
+  "plan": {{
+    "container": "...",
+    "fields": [{{"name": "...", "selector": "...", "attr": null, "multiple": false, "required": true}}]
+  }},
+  "records": [{{...one object per record, keys = field names...}}]
+}}
+"""
+
+
+def _field_list(fields: dict[str, str]) -> str:
+    return "\n".join(f"- {name}: {desc}" for name, desc in fields.items())
+
+
+def synthesize_plan(html: str, fields: dict[str, str], llm_json, attempts: int = 2) -> tuple[dict, dict]:
+    """
+    Asks the LLM for an extraction plan and validates it against the LLM's own records.
+
+    Args:
+        html (str): The sample page.
+        fields (dict[str, str]): Output field names and their descriptions.
+        llm_json: Callable (prompt, source) -> dict that runs one LLM extraction,
+            e.g. run_smart_scraper below.
+        attempts (int): How many times to ask for a plan before giving up.
+
+    Returns:
+        tuple[dict, dict]: The validated plan and its validation report.
+
+    Raises:
+        ValueError: If no attempt produced a plan that validates.
+    """
+    pruned, _ = prune_html(html)
+    prompt = SYNTHESIS_PROMPT.format(fields=_field_list(fields))
+    report = {}
+    for attempt in range(1, attempts + 1):
+        if attempt > 1:
+            # Feed the failure back; this also keeps the retry from hitting the LLM cache.
+            prompt += f"\nA previous plan failed validation with per-field agreement {report}. Fix the selectors.\n"
+        answer = llm_json(prompt, pruned)
+        plan, records = answer.get("plan"), answer.get("records", [])
+        if plan and plan.get("container") and plan.get("fields"):
+            ok, report = validate_plan(plan, html, records)
+            print(f"Plan synthesis attempt {attempt} • valid={ok} • {report}")
+            if ok:
+                return plan, report
+    raise ValueError(f"LLM did not produce a valid extraction plan: {report}")
+
+
+def extract_with_cached_rules(html: str, site: str, fields: dict[str, str], llm_json,
+                              cache: RuleCache | None = None) -> list[dict]:
+    """
+    Extracts records with a cached plan, synthesizing a new one only when needed.
+
+    A cached plan is used when the page's layout matches; if replaying it leaves
+    required fields empty on any record, a new plan is synthesized from this page.
+    The failing plan is dropped only if it was stored for this exact layout; a
+    near-match from a similar layout is kept for the pages it was made for.
+
+    Args:
+        html (str): The rendered page.
+        site (str): Cache namespace, e.g. "consumeraffairs" or "autonation".
+        fields (dict[str, str]): Output field names and their descriptions.
+        llm_json: Callable (prompt, source) -> dict used for synthesis.
+        cache (RuleCache | None): The rule cache (defaults to RULE_CACHE_PATH).
+
+    Returns:
+        list[dict]: The extracted records.
+    """
+    cache = cache or RuleCache()
+    features = layout_features(html)
+    fingerprint = layout_fingerprint(features)
+    entry = cache.lookup(site, features)
+    if entry is not None:
+        extractor = plan_to_extractor(entry["plan"])
+        records = extractor.extract(html)
+        if records and not any(extractor.missing_fields(r) for r in records):
+            print(f"Rule cache hit • {site}:{entry['fingerprint']} • {len(records)} records, 0 LLM calls")
+            return records
+        print(f"Cached plan {site}:{entry['fingerprint']} failed validation, re-synthesizing...")
+        # A near-match belongs to another layout and may still be valid there; only
+        # this layout's own plan is stale.
+        if entry["fingerprint"] == fingerprint:
+            cache.invalidate(entry)
+    else:
+        print(f"No cached plan for {site}:{fingerprint}, synthesizing...")
+
+    plan, report = synthesize_plan(html, fields, llm_json)
+    cache.store(site, features, plan, report)
+    return plan_to_extractor(plan).extract(html)
+
+
+def run_smart_scraper(prompt: str, source: str, config: dict) -> dict:
+    """Runs one (cached) SmartScraperGraph extraction and returns its JSON answer."""
+    result = CachedSmartScraperGraph(prompt=prompt, source=source, config=config).run()
+    # ScrapeGraphAI wraps non-dict answers as {"content": ...}.
+    content = result.get("content", result) if isinstance(result, dict) else result
+    if isinstance(content, str):
+        content = json.loads(re.sub(r"^```(json)?|```$", "", content.strip()))
+    return content if isinstance(content, dict) else {}
+
+
+# ─────────────────── Saved-Page Demo ───────────────────────────────────────────────
+# Field descriptions for the structural ConsumerAffairs review fields.
+REVIEW_FIELDS = {
+    "reviewer_name": "The name of the person who wrote the review.",
+    "reviewer_location": "The city and state (or country) of the reviewer.",
+    "review_date": "The date the review was posted.",
+    "star_rating": "The star rating given by the reviewer (1-5).",
+    "tags": "The short descriptive tags (chips) attached to the review; a list.",
+    "review_text": "The full text of the review.",
+}
+
+if __name__ == "__main__":
+    # Usage: python rule_synthesis.py [saved_page.html]
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    page_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(OUTPUT_DIR, "ca_autonation_rendered.html")
+    with open(page_path, "r", encoding="utf-8") as f:
+        page_html = f.read()
+
+    graph_config = {
+        "llm": {
+            "api_key": os.getenv("OPENAI_API_KEY"),
+            "model": "openai/gpt-4o-mini",
+        },
+        "verbose": False,
+        "headless": True,
+    }
+    reviews = extract_with_cached_rules(
+        page_html, "consumeraffairs", REVIEW_FIELDS,
+        llm_json=lambda prompt, source: run_smart_scraper(prompt, source, graph_config),
+    )
+    print(json.dumps(reviews[:2], indent=2))
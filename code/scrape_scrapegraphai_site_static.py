@@ -1,8 +1,9 @@
 import os
 import json
 from dotenv import load_dotenv
-from scrapegraphai.graphs import SmartScraperGraph
+from llm_cache import CachedSmartScraperGraph
 from scrapegraphai.utils import prettify_exec_info
+from html_pruning import prune_html
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +15,10 @@ html_file_path = "/Users/crees/PycharmProjects/dsproject_web_scrape/outputs/auto
 with open(html_file_path, "r", encoding="utf-8") as f:
     html_content = f.read()
 
+# Strip scripts, styles, SVGs and tracking markup before extraction
+pruned_html, prune_stats = prune_html(html_content)
+print(prune_stats.summary())
+
 # Config to use OpenAI GPT-4o-mini
 graph_config = {
     "llm": {
@@ -45,10 +50,10 @@ Only return a JSON array like this:
 Only return valid JSON. No explanation, no markdown.
 """
 
-# Run SmartScraperGraph with the HTML content
-smart_scraper_graph = SmartScraperGraph(
+# Run SmartScraperGraph with the HTML content (answers are cached per source/prompt/model)
+smart_scraper_graph = CachedSmartScraperGraph(
     prompt=prompt,
-    source=html_content,
+    source=pruned_html,
     config=graph_config
 )
 
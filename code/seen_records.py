@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import time
+
+"""
+"Since last run" crawling: remember which records were already extracted.
+
+Every run of the reviews script used to click "Load more" until the button
+disappeared and extract the full review history again. `SeenRecords` keeps the
+ids of the reviews extracted by earlier runs (ConsumerAffairs exposes them as
+`id="review-13735777"`, `data-id="13735777"`, `review-read-more-13735777`, ...).
+While paginating, already known reviews are dropped before extraction, and once
+`stop_after` known reviews appear in a row the crawl has reached the previous run's
+position and stops. Daily runs then cost O(new reviews) instead of O(all reviews).
+
+A streak (rather than the first known id) is required because the first page can
+mix pinned or featured older reviews in with the new ones.
+
+Only the ids of records that were actually saved are committed: a review whose
+extraction failed is not remembered, so the next run does not stop at it and
+extracts it again.
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+SEEN_STATE_PATH = os.path.join(OUTPUT_DIR, "seen_records.json")
+
+# Consecutive known records after which pagination stops (about one "Load more" page).
+STOP_AFTER_KNOWN = 5
+# Ids remembered per URL, newest first; older ones are never reached before stopping.
+MAX_IDS = 10_000
+
+# Numeric record id on a fragment's opening tag, e.g. data-id="13735777" or
+# id="review-13735777" / "review-entry-13735777" / "review-read-more-13735777".
+_ID_ATTR = re.compile(r'\b(?:data-id|id)="(?:[a-z]+-)*(\d+)"')
+
+
+def record_id(fragment: str) -> str | None:
+    """The numeric id of a record fragment (from its opening tag), or None."""
+    match = _ID_ATTR.search(fragment[:fragment.find(">") + 1])
+    return match.group(1) if match else None
+
+
+def numeric_id(value) -> str | None:
+    """The numeric id in an extracted id value (e.g. "review-13735777" → "13735777"), or None."""
+    match = re.search(r"(\d+)$", str(value or "").strip())
+    return match.group(1) if match else None
+
+
+class SeenRecords:
+    """
+    Record ids extracted by earlier runs of one URL, and the stop rule for this run.
+
+    Args:
+        url (str): The crawled page; ids are remembered per URL.
+        path (str): JSON state file.
+        stop_after (int): Stop paginating after this many known records in a row.
+
+    Attributes:
+        known (set): Ids extracted by earlier runs.
+        new_ids (list): Ids first seen in this run, in page order.
+        streak (int): Known records seen in a row, most recently.
+    """
+
+    def __init__(self, url: str, path: str = SEEN_STATE_PATH, stop_after: int = STOP_AFTER_KNOWN):
+        self.url = url
+        self.path = path
+        self.stop_after = stop_after
+        self._state = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        self._history = self._state.get(url, {}).get("ids", [])
+        self.known = set(self._history)
+        self.new_ids = []
+        self.streak = 0
+        self._observed = set()
+
+    @property
+    def done(self) -> bool:
+        """True once the crawl has reached records extracted by an earlier run."""
+        return bool(self.known) and self.streak >= self.stop_after
+
+    def observe(self, ids: list) -> list[bool]:
+        """
+        Registers record ids in page order and updates the known-record streak.
+
+        Ids observed earlier in this run are ignored, so the same records can be
+        passed more than once (e.g. by the renderer and again before extraction).
+
+        Returns:
+            list[bool]: For each id, whether it is new (not extracted by an earlier run).
+        """
+        is_new = []
+        for rid in ids:
+            new = rid is None or rid not in self.known
+            is_new.append(new)
+            if rid is not None and rid in self._observed:
+                continue
+            if rid is not None:
+                self._observed.add(rid)
+            if new:
+                self.streak = 0
+                if rid is not None:
+                    self.new_ids.append(rid)
+            else:
+                self.streak += 1
+        return is_new
+
+    def filter(self, fragments: list[str]) -> list[str]:
+        """Returns the fragments of records not extracted by an earlier run."""
+        is_new = self.observe([record_id(fragment) for fragment in fragments])
+        return [fragment for fragment, new in zip(fragments, is_new) if new]
+
+    def commit(self, saved_ids=None) -> None:
+        """
+        Remembers this run's new ids. Call once their records have been saved.
+
+        Args:
+            saved_ids (Iterable | None): Ids of the records that were saved. Only
+                these are remembered, in page order; new ids of records that were not
+                saved (failed extraction) stay unknown and are extracted again next
+                run. None remembers every new id.
+        """
+        if saved_ids is None:
+            committed = list(self.new_ids)
+        else:
+            saved = set(saved_ids) - {None}
+            committed = [rid for rid in self.new_ids if rid in saved]
+            committed += sorted(saved - set(committed) - self.known)   # saved without being observed
+        fresh = set(committed)
+        history = (committed + [rid for rid in self._history if rid not in fresh])[:MAX_IDS]
+        self._state[self.url] = {"ids": history, "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp, self.path)
+        self._history = history
+        self.known.update(committed)
+
+    def summary(self) -> str:
+        status = "stopped at known records" if self.done else "no known records reached"
+        return f"{len(self.new_ids)} new records • {len(self.known)} known from earlier runs • {status}"
@@ -0,0 +1,126 @@
+import re
+from collections import defaultdict
+
+import lxml.html
+
+from html_pruning import estimate_tokens, prune_tree
+
+"""
+Record segmentation: turns a rendered page into one compact HTML fragment per record.
+
+Listing and review pages repeat the same container for every record
+(`<ansrp-srp-tile-v3>` on AutoNation, `div.js-rvw` on ConsumerAffairs). Instead of
+shipping the whole page to the LLM and asking it to find the records, we cut out
+only those containers, prune each one, and group the fragments into batches that
+fit a token budget. Everything outside the records is never tokenized.
+"""
+
+# Class tokens generated by front-end frameworks differ between otherwise identical
+# siblings (e.g. Angular's "ng-tns-c214-0"), so they are ignored when comparing.
+_FRAMEWORK_CLASS = re.compile(r"^(ng-|_ng|css-|sc-|jsx-)|\d{3,}")
+
+# A repeated structure needs at least this many siblings to count as a record list.
+MIN_REPEATS = 3
+
+
+def node_signature(el) -> tuple:
+    classes = sorted(c for c in (el.get("class") or "").split() if not _FRAMEWORK_CLASS.search(c))
+    return (el.tag, tuple(classes))
+
+
+def _text_len(el) -> int:
+    return len(" ".join(el.text_content().split()))
+
+
+def detect_record_nodes(root, min_repeats: int = MIN_REPEATS) -> list:
+    """
+    Finds the largest group of structurally identical siblings in the document.
+
+    Every element's children are grouped by tag and (framework-noise-free) class
+    list. Groups are scored by the total amount of text they hold, so a results
+    list beats the navigation menu even when the menu has more entries.
+
+    Args:
+        root: The lxml document root.
+        min_repeats (int): Minimum number of siblings for a group to qualify.
+
+    Returns:
+        list: The record elements, in document order (empty if none found).
+    """
+    best, best_score = [], 0
+    for parent in root.iter():
+        if not isinstance(parent.tag, str) or len(parent) < min_repeats:
+            continue
+        groups = defaultdict(list)
+        for child in parent:
+            if isinstance(child.tag, str):
+                groups[node_signature(child)].append(child)
+        for members in groups.values():
+            if len(members) < min_repeats:
+                continue
+            lengths = [_text_len(m) for m in members]
+            # Records carry text in (nearly) every member; menus of icons do not.
+            if sum(1 for n in lengths if n) < len(members) * 0.8:
+                continue
+            score = sum(lengths)
+            if score > best_score:
+                best, best_score = members, score
+    return best
+
+
+def segment_records(html: str, container_selector: str | None = None, prune: bool = True) -> list[str]:
+    """
+    Splits a rendered page into one HTML fragment per record.
+
+    Args:
+        html (str): The rendered HTML content.
+        container_selector (str | None): CSS selector matching one record container
+            (e.g. "ansrp-srp-tile-v3"). If None, repeated sibling structures are
+            detected automatically.
+        prune (bool): Prune the document with html_pruning before segmenting. The
+            selector then only sees attributes listed in html_pruning.KEEP_ATTRS.
+
+    Returns:
+        list[str]: One HTML fragment per record, in document order.
+    """
+    root = lxml.html.document_fromstring(html)
+    if prune:
+        # Prune first so script/style text cannot make boilerplate look like records.
+        prune_tree(root)
+    if container_selector:
+        nodes = root.cssselect(container_selector)
+        # Drop containers nested inside another match so no record is emitted twice.
+        matched = set(nodes)
+        nodes = [n for n in nodes if not any(a in matched for a in n.iterancestors())]
+    else:
+        nodes = detect_record_nodes(root)
+
+    return [lxml.html.tostring(node, encoding="unicode", with_tail=False) for node in nodes]
+
+
+def batch_fragments(fragments: list[str], max_tokens: int = 8_000) -> list[str]:
+    """
+    Packs record fragments into batches whose estimated size fits a token budget.
+
+    A fragment larger than the budget is placed in a batch on its own rather than
+    being split, so a record is never cut in half.
+
+    Args:
+        fragments (list[str]): Record fragments from segment_records.
+        max_tokens (int): Estimated input-token budget per batch.
+
+    Returns:
+        list[str]: HTML sources, each wrapping one or more fragments in a <div>.
+    """
+    batches, current, current_tokens = [], [], 0
+    for fragment in fragments:
+        tokens = estimate_tokens(fragment)
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(fragment)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return ["<div>\n" + "\n".join(batch) + "\n</div>" for batch in batches]
+
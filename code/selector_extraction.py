@@ -0,0 +1,175 @@
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+from html_pruning import prune_tree
+from segmentation import batch_fragments
+
+"""
+Deterministic extraction for layouts whose selectors are already known.
+
+Our AutoNation prompts spell out the exact CSS selectors for every field, so the
+LLM is only evaluating selectors we could run ourselves. `SelectorExtractor`
+compiles those rules once with lxml and applies them to every record container in
+milliseconds. Records where a required field comes back empty (layout change,
+A/B test variant, ...) are the only ones sent on to SmartScraperGraph.
+"""
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """
+    How to read one output field from a record container.
+
+    Attributes:
+        name (str): Output key (e.g. "car_price").
+        selector (str): CSS selector evaluated relative to the record container.
+        attr (str | None): Read this attribute instead of the element text.
+        required (bool): An empty value sends the record to the LLM fallback.
+        default: Value used when an optional field is empty.
+        multiple (bool): Return a list with one entry per matching element.
+        pattern (str | None): Regex applied to the value; its first group is kept
+            (e.g. the VIN in id="vehicle_<VIN>").
+    """
+    name: str
+    selector: str
+    attr: str | None = None
+    required: bool = True
+    default: object = None
+    multiple: bool = False
+    pattern: str | None = None
+
+
+def _clean(text: str | None) -> str:
+    # Collapses whitespace, including the non-breaking spaces used in "53,390 miles".
+    return " ".join((text or "").split())
+
+
+class SelectorExtractor:
+    """
+    Compiled CSS-selector extraction rules for one page layout.
+
+    Args:
+        container (str): CSS selector matching one record (e.g. "ansrp-srp-tile-v3").
+        fields (list[FieldRule]): The rules for each output field.
+    """
+
+    def __init__(self, container: str, fields: list[FieldRule]):
+        self.container = container
+        self.fields = list(fields)
+        self._container = CSSSelector(container)
+        self._compiled = [(rule, CSSSelector(rule.selector)) for rule in self.fields]
+
+    def _read(self, node, rule: FieldRule, selector: CSSSelector):
+        values = []
+        for el in selector(node):
+            value = _clean(el.get(rule.attr) if rule.attr else el.text_content())
+            if value and rule.pattern:
+                match = re.search(rule.pattern, value)
+                value = match.group(1) if match else ""
+            if value:
+                values.append(value)
+                if not rule.multiple:
+                    break
+        if rule.multiple:
+            return values
+        return values[0] if values else None
+
+    def extract_node(self, node) -> dict:
+        """Applies every field rule to one record container element."""
+        record = {}
+        for rule, selector in self._compiled:
+            value = self._read(node, rule, selector)
+            if not value and not rule.required:
+                value = rule.default
+            record[rule.name] = value
+        return record
+
+    def missing_fields(self, record: dict) -> list[str]:
+        """Names of required fields that came back empty."""
+        return [rule.name for rule in self.fields if rule.required and not record.get(rule.name)]
+
+    def _nodes(self, html: str) -> list:
+        root = lxml.html.document_fromstring(html)
+        return self._container(root)
+
+    def extract(self, html: str) -> list[dict]:
+        """
+        Extracts one record per container from an HTML document.
+
+        Args:
+            html (str): The rendered HTML content (full page or fragment).
+
+        Returns:
+            list[dict]: One dict per record container, in document order.
+        """
+        return [self.extract_node(node) for node in self._nodes(html)]
+
+    def extract_with_fallback(self, html: str, llm_extract: Callable[[str], list[dict]],
+                              max_tokens: int = 8_000) -> list[dict]:
+        """
+        Extracts records locally and sends only incomplete ones to the LLM.
+
+        Containers with an empty required field are pruned, batched with
+        segmentation.batch_fragments and passed to `llm_extract`, whose records
+        replace the incomplete ones at the end of the result.
+
+        Args:
+            html (str): The rendered HTML content.
+            llm_extract (Callable[[str], list[dict]]): Extracts records from an HTML
+                source, typically a wrapper around SmartScraperGraph.run().
+            max_tokens (int): Estimated input-token budget per fallback batch.
+
+        Returns:
+            list[dict]: Complete records followed by the LLM-extracted records.
+        """
+        start = time.perf_counter()
+        complete, incomplete = [], []
+        for node in self._nodes(html):
+            record = self.extract_node(node)
+            if self.missing_fields(record):
+                prune_tree(node)
+                incomplete.append(lxml.html.tostring(node, encoding="unicode", with_tail=False))
+            else:
+                complete.append(record)
+        print(f"Selector extraction • {len(complete)} complete, {len(incomplete)} sent to LLM "
+              f"• {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        results = complete
+        for batch_html in batch_fragments(incomplete, max_tokens=max_tokens):
+            results.extend(llm_extract(batch_html))
+        return results
+
+
+# ─────────────────── Known Layouts ─────────────────────────────────────────────────
+# AutoNation search results: the same selectors the scraping prompts describe.
+AUTONATION_TILE = SelectorExtractor(
+    container="ansrp-srp-tile-v3",
+    fields=[
+        # The tile id is "vehicle_<VIN>": the listing's stable identity.
+        FieldRule("vin", "ansrp-srp-tile-v3", attr="id", required=False, pattern=r"vehicle_(\w+)"),
+        FieldRule("car_name", ".tile-info h3"),
+        FieldRule("car_status", "span.tile-status"),
+        FieldRule("car_price", "div.price-Value", required=False, default="N/A"),
+        FieldRule("car_mileage", "span.vehicle-mileage"),
+    ],
+)
+
+# ConsumerAffairs reviews: every structural field is a plain DOM read. The review body
+# is split between the teaser and the collapsed remainder; both paragraphs are read.
+CONSUMERAFFAIRS_REVIEW = SelectorExtractor(
+    container="div.js-rvw",
+    fields=[
+        FieldRule("review_id", "div.js-rvw", attr="id"),
+        FieldRule("reviewer_name", "span.rvw__inf-nm"),
+        FieldRule("reviewer_location", "span.rvw__inf-lctn", required=False),
+        FieldRule("review_date", "p.rvw__rvd-dt"),
+        FieldRule("star_rating", 'meta[itemprop="ratingValue"]', attr="content"),
+        FieldRule("tags", "span.rvw__tag", required=False, default=[], multiple=True),
+        FieldRule("review_text", ".rvw__top-text p, .rvw__all-text p", multiple=True),
+    ],
+)
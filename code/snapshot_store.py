@@ -0,0 +1,230 @@
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import zstandard
+
+"""
+Content-addressed, zstd-compressed store of rendered HTML snapshots.
+
+The scripts overwrite `outputs/*_rendered.html` on every run, so earlier renders are
+lost for re-extraction or audits. `SnapshotStore` keeps every render instead:
+
+- each page body is stored once under its SHA-256 (identical re-renders cost one
+  index row, not another copy);
+- bodies are zstd-compressed, optionally with a dictionary trained on earlier
+  snapshots, since these pages share most of their markup (headers, scripts,
+  styles) and small pages compress far better with it;
+- an SQLite index maps (url, timestamp) → body hash, so the latest render of a URL,
+  its history, or the render as of a given time are one indexed lookup.
+
+Layout: outputs/snapshots/index.sqlite and outputs/snapshots/objects/ab/abcdef….zst
+
+    python snapshot_store.py add <url> <file.html>
+    python snapshot_store.py train
+    python snapshot_store.py stats
+"""
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs")
+SNAPSHOT_DIR = os.path.join(OUTPUT_DIR, "snapshots")
+
+COMPRESSION_LEVEL = 12
+DICTIONARY_BYTES = 112_640
+DICTIONARY_SAMPLES = 200
+# Bodies are cut into pieces of this size for training; zstd needs many small samples.
+TRAINING_PIECE_BYTES = 16_384
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One render of a URL."""
+    id: int
+    url: str
+    taken: float
+    sha256: str
+    raw_bytes: int
+    stored_bytes: int
+
+
+class SnapshotStore:
+    """
+    Content-addressed HTML snapshot store.
+
+    Args:
+        root (str): Directory holding index.sqlite and the objects/ tree.
+        level (int): zstd compression level.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR, level: int = COMPRESSION_LEVEL):
+        self.root = root
+        self.level = level
+        self.index_path = os.path.join(root, "index.sqlite")
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                " sha256 TEXT PRIMARY KEY, raw_bytes INTEGER, stored_bytes INTEGER, dict_id INTEGER)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, taken REAL, sha256 TEXT)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS dictionaries (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                       " data BLOB, created REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS snapshots_url_taken ON snapshots (url, taken)")
+            db.execute("CREATE INDEX IF NOT EXISTS snapshots_sha256 ON snapshots (sha256)")
+        self._dicts = {}
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the store usable from threads.
+        db = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256 + ".zst")
+
+    def _dictionary(self, dict_id: int | None) -> zstandard.ZstdCompressionDict | None:
+        if dict_id is None:
+            return None
+        if dict_id not in self._dicts:
+            with self._connect() as db:
+                row = db.execute("SELECT data FROM dictionaries WHERE id = ?", (dict_id,)).fetchone()
+            self._dicts[dict_id] = zstandard.ZstdCompressionDict(row[0])
+        return self._dicts[dict_id]
+
+    def _current_dict_id(self) -> int | None:
+        with self._connect() as db:
+            row = db.execute("SELECT MAX(id) FROM dictionaries").fetchone()
+        return row[0]
+
+    # ── Writing ───────────────────────────────────────────────────────────────────
+
+    def put(self, url: str, html: str, taken: float | None = None) -> Snapshot:
+        """
+        Stores one render of `url`. An identical body already in the store is not written again.
+
+        Returns:
+            Snapshot: The new index entry.
+        """
+        raw = html.encode("utf-8")
+        sha256 = hashlib.sha256(raw).hexdigest()
+        taken = time.time() if taken is None else taken
+        with self._connect() as db:
+            row = db.execute("SELECT raw_bytes, stored_bytes FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            dict_id = self._current_dict_id()
+            dictionary = self._dictionary(dict_id)
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+            data = compressor.compress(raw)
+            path = self._object_path(sha256)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            row = (len(raw), len(data))
+            with self._connect() as db:
+                db.execute("INSERT OR IGNORE INTO objects (sha256, raw_bytes, stored_bytes, dict_id)"
+                           " VALUES (?, ?, ?, ?)", (sha256, len(raw), len(data), dict_id))
+        with self._connect() as db:
+            cursor = db.execute("INSERT INTO snapshots (url, taken, sha256) VALUES (?, ?, ?)", (url, taken, sha256))
+        return Snapshot(cursor.lastrowid, url, taken, sha256, row[0], row[1])
+
+    def train_dictionary(self, samples: int = DICTIONARY_SAMPLES, size: int = DICTIONARY_BYTES) -> int:
+        """
+        Trains a zstd dictionary on up to `samples` stored bodies; later snapshots use it.
+
+        Existing objects keep the dictionary they were written with.
+
+        Returns:
+            int: The new dictionary id.
+        """
+        with self._connect() as db:
+            hashes = [r[0] for r in db.execute("SELECT sha256 FROM objects").fetchall()]
+        if len(hashes) < 2:
+            raise ValueError("At least two stored snapshots are needed to train a dictionary.")
+        pieces = []
+        for h in random.sample(hashes, min(samples, len(hashes))):
+            body = self.read(h).encode("utf-8")
+            pieces.extend(body[i:i + TRAINING_PIECE_BYTES] for i in range(0, len(body), TRAINING_PIECE_BYTES))
+        try:
+            dictionary = zstandard.train_dictionary(size, pieces)
+        except zstandard.ZstdError as exc:
+            raise ValueError(f"Dictionary training failed on {len(pieces)} samples: {exc}") from exc
+        with self._connect() as db:
+            cursor = db.execute("INSERT INTO dictionaries (data, created) VALUES (?, ?)",
+                                (dictionary.as_bytes(), time.time()))
+        return cursor.lastrowid
+
+    # ── Reading ───────────────────────────────────────────────────────────────────
+
+    def read(self, sha256: str) -> str:
+        """The HTML body stored under a hash."""
+        with self._connect() as db:
+            row = db.execute("SELECT dict_id FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            raise KeyError(sha256)
+        decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionary(row[0]))
+        with open(self._object_path(sha256), "rb") as f:
+            return decompressor.decompress(f.read()).decode("utf-8")
+
+    def _snapshots(self, where: str, params: tuple) -> list[Snapshot]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT s.id, s.url, s.taken, s.sha256, o.raw_bytes, o.stored_bytes"
+                f" FROM snapshots s JOIN objects o ON o.sha256 = s.sha256 WHERE {where}", params
+            ).fetchall()
+        return [Snapshot(*row) for row in rows]
+
+    def history(self, url: str) -> list[Snapshot]:
+        """Every snapshot of `url`, oldest first."""
+        return self._snapshots("s.url = ? ORDER BY s.taken", (url,))
+
+    def latest(self, url: str, before: float | None = None) -> Snapshot | None:
+        """The newest snapshot of `url` (taken at or before `before`, if given)."""
+        found = self._snapshots("s.url = ? AND s.taken <= ? ORDER BY s.taken DESC LIMIT 1",
+                                (url, time.time() if before is None else before))
+        return found[0] if found else None
+
+    def urls(self) -> list[str]:
+        with self._connect() as db:
+            return [r[0] for r in db.execute("SELECT DISTINCT url FROM snapshots ORDER BY url").fetchall()]
+
+    def stats(self) -> dict:
+        with self._connect() as db:
+            n_snapshots, logical = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(o.raw_bytes), 0) FROM snapshots s JOIN objects o ON o.sha256 = s.sha256"
+            ).fetchone()
+            n_objects, raw, stored = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(stored_bytes), 0) FROM objects"
+            ).fetchone()
+        return {"snapshots": n_snapshots, "objects": n_objects, "logical_bytes": logical,
+                "unique_bytes": raw, "stored_bytes": stored}
+
+    def summary(self) -> str:
+        s = self.stats()
+        ratio = s["logical_bytes"] / s["stored_bytes"] if s["stored_bytes"] else 0.0
+        return (f"{s['snapshots']} snapshots • {s['objects']} unique bodies • "
+                f"{s['logical_bytes'] / 1e6:.1f} MB rendered → {s['stored_bytes'] / 1e6:.2f} MB on disk ({ratio:.0f}×)")
+
+
+if __name__ == "__main__":
+    store = SnapshotStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "add":
+        with open(sys.argv[3], "r", encoding="utf-8") as f:
+            snap = store.put(sys.argv[2], f.read())
+        print(f"Stored {snap.url} • {snap.sha256[:12]} • {snap.raw_bytes:,} → {snap.stored_bytes:,} bytes")
+    elif command == "train":
+        print(f"Trained dictionary {store.train_dictionary()}")
+    print(store.summary())
@@ -0,0 +1,170 @@
+import json
+
+import lxml.html
+
+"""
+Fast pre-extraction pass over schema.org structured data.
+
+Review sites often describe their reviews with JSON-LD (`<script type="application/ld+json">`)
+or microdata (`itemscope`/`itemprop` attributes). Those values can be read with
+lxml in milliseconds, so only the fields the structured data lacks (location,
+tags, the inferred likes/dislikes, ...) have to be requested from the LLM.
+"""
+
+# Review fields produced by our scripts and the schema.org properties they map to.
+SCHEMA_REVIEW_FIELDS = {
+    "reviewer_name": ("author", "name"),
+    "review_date": ("datePublished",),
+    "star_rating": ("reviewRating", "ratingValue"),
+    "review_text": ("reviewBody",),
+}
+
+
+def _types(item: dict) -> set[str]:
+    raw = item.get("@type") or []
+    raw = raw if isinstance(raw, list) else [raw]
+    # "http://schema.org/Review" and "Review" are the same type.
+    return {str(t).rstrip("/").rsplit("/", 1)[-1] for t in raw}
+
+
+# ─────────────────── JSON-LD ───────────────────────────────────────────────────────
+
+
+def harvest_json_ld(root) -> list[dict]:
+    """
+    Returns every JSON-LD object on the page, with @graph containers flattened.
+
+    Malformed blocks are skipped rather than failing the whole page.
+    """
+    items = []
+    for script in root.xpath('//script[@type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text or "")
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            obj = stack.pop(0)
+            if not isinstance(obj, dict):
+                continue
+            if "@graph" in obj:
+                stack.extend(obj["@graph"])
+                continue
+            items.append(obj)
+    return items
+
+
+# ─────────────────── Microdata ─────────────────────────────────────────────────────
+
+
+def _prop_value(el):
+    if el.get("itemscope") is not None:
+        return _read_item(el)
+    tag = el.tag
+    if tag == "meta":
+        return el.get("content", "")
+    if tag in ("a", "link", "area"):
+        return el.get("href", "")
+    if tag in ("img", "audio", "video", "source", "iframe", "embed"):
+        return el.get("src", "")
+    if tag in ("time", "data", "meter") and (el.get("datetime") or el.get("value")):
+        return el.get("datetime") or el.get("value")
+    return " ".join(el.text_content().split())
+
+
+def _read_item(scope) -> dict:
+    item = {"@type": scope.get("itemtype", "")}
+    if scope.get("id"):
+        item["@element_id"] = scope.get("id")
+    # Properties belong to the nearest enclosing itemscope, so stop at nested scopes.
+    stack = list(scope)
+    while stack:
+        el = stack.pop(0)
+        if not isinstance(el.tag, str):
+            continue
+        names = (el.get("itemprop") or "").split()
+        for name in names:
+            value = _prop_value(el)
+            if name in item:
+                existing = item[name]
+                item[name] = (existing if isinstance(existing, list) else [existing]) + [value]
+            else:
+                item[name] = value
+        if el.get("itemscope") is None:
+            stack[0:0] = list(el)
+    return item
+
+
+def harvest_microdata(root) -> list[dict]:
+    """Returns every top-level microdata item on the page as a nested dict."""
+    return [
+        _read_item(scope)
+        for scope in root.xpath("//*[@itemscope][not(ancestor::*[@itemscope])]")
+    ]
+
+
+# ─────────────────── Reviews ───────────────────────────────────────────────────────
+
+
+def _walk(items):
+    """Yields every item and nested item, in document order."""
+    stack = list(items)
+    while stack:
+        obj = stack.pop(0)
+        if isinstance(obj, dict):
+            yield obj
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+
+
+def _get_path(obj, path):
+    for key in path:
+        if isinstance(obj, list):
+            obj = obj[0] if obj else None
+        if isinstance(obj, str) and key == "name":
+            # author is sometimes given as a plain string.
+            return obj
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    if isinstance(obj, list):
+        obj = obj[0] if obj else None
+    return obj
+
+
+def _review_record(item: dict) -> dict:
+    record = {"review_id": item.get("@element_id") or item.get("@id") or item.get("url")}
+    for field, path in SCHEMA_REVIEW_FIELDS.items():
+        value = _get_path(item, path)
+        if value in (None, ""):
+            continue
+        if field == "star_rating":
+            try:
+                value = int(round(float(value)))
+            except (TypeError, ValueError):
+                continue
+        record[field] = value.strip() if isinstance(value, str) else value
+    return record
+
+
+def harvest_reviews(html: str) -> list[dict]:
+    """
+    Reads schema.org Review objects from JSON-LD and microdata.
+
+    Args:
+        html (str): The rendered HTML content.
+
+    Returns:
+        list[dict]: One dict per review with "review_id" (the element id for
+        microdata, @id/url for JSON-LD, else None) and whichever of
+        SCHEMA_REVIEW_FIELDS the page provides.
+    """
+    root = lxml.html.document_fromstring(html)
+    items = harvest_microdata(root) + harvest_json_ld(root)
+    return [_review_record(item) for item in _walk(items) if "Review" in _types(item)]
+
+
+def missing_fields(records: list[dict], fields: list[str]) -> list[str]:
+    """Fields from `fields` that at least one record does not provide."""
+    return [f for f in fields if any(r.get(f) in (None, "", []) for r in records)]